@@ -8,6 +8,7 @@ from pydantic import BaseModel
 from pathlib import Path
 import json
 
+from ..services.item_bank import publish_item_bank, snapshot_version
 from ..services.leetcode_scraper import LeetCodeScraper
 from ..utils.api import envelope
 
@@ -36,6 +37,35 @@ async def scrape_leetcode(request: ScrapeRequest):
         raise HTTPException(status_code=500, detail=f"Scraping failed: {str(e)}")
 
 
+class RescoreRequest(BaseModel):
+    dryRun: bool = False
+    restart: bool = False
+
+
+@router.post("/rescore-reports", status_code=202)
+async def rescore_reports(request: RescoreRequest):
+    """
+    Regenerate score reports from submitted sessions after scoring rules change
+    R-SCOR-01: Resumes from the last checkpoint unless restart is set; dryRun only returns the diffs
+    Runs in the background; poll GET /rescore-reports/{jobId} for the summary
+    """
+    from ..services.rescoring import running_rescore, start_rescore
+    if running_rescore():
+        raise HTTPException(status_code=409, detail=f"Re-scoring run {running_rescore()} is still in progress")
+    job_id = await start_rescore(dry_run=request.dryRun, restart=request.restart)
+    return envelope({"status": "accepted", "jobId": job_id})
+
+
+@router.get("/rescore-reports/{job_id}")
+async def rescore_status(job_id: str):
+    """Status of a re-scoring run: running, done (with its summary) or failed (with the error)"""
+    from ..services.rescoring import get_rescore_job
+    job = await get_rescore_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Re-scoring run not found")
+    return envelope(job)
+
+
 @router.get("/item-bank-stats")
 async def item_bank_stats():
     """Get statistics about the item bank"""
@@ -57,6 +87,7 @@ async def item_bank_stats():
     
     return envelope({
         "total": total_count,
+        "snapshotVersion": snapshot_version(),
         "byTrack": {
             "python_core_v1": python_count,
             "sql_core_v1": sql_count,
@@ -75,6 +106,8 @@ async def populate_demo_data():
     """Populate demo data (employers, candidates with scores) for testing"""
     from ..services.candidate_service import create_candidate, share_with_employer
     from ..services.employer_service import create_employer
+    from ..services.eligibility_index import on_report_upserted
+    from ..services.percentiles import PERCENTILES
     from ..models.domain import CandidateProfile, SkillTrack, CandidateScoreReport, ScoreBreakdown, Employer
     from ..database import get_score_reports_collection, get_employers_collection
     from ..utils.time import utc_now_iso
@@ -130,18 +163,6 @@ async def populate_demo_data():
         code_quality = max(0, min(100, base + (hash(str(base + 2)) % 10) - 5))
         return ScoreBreakdown(algorithms=algorithms, data_structures=data_structures, code_quality=code_quality)
     
-    def _calculate_percentile(score: int) -> int:
-        if score >= 90:
-            return int(85 + (score - 90))
-        elif score >= 80:
-            return int(70 + ((score - 80) * 1.5))
-        elif score >= 70:
-            return int(50 + ((score - 70) * 2))
-        elif score >= 60:
-            return int(30 + ((score - 60) * 2))
-        else:
-            return max(5, int(30 - ((60 - score) * 2)))
-    
     def _get_strengths_weaknesses(score: int, track: str) -> tuple[list[str], list[str]]:
         strengths = []
         weaknesses = []
@@ -212,7 +233,11 @@ async def populate_demo_data():
                 if score > 0:
                     subscores = _calculate_subscores(score)
                     strengths, weaknesses = _get_strengths_weaknesses(score, track.value.split('_')[0])
-                    percentile = _calculate_percentile(score)
+                    previous = await reports_collection.find_one(
+                        {"candidateId": candidate.id, "trackId": track.value}, {"_id": 0, "overallScore": 1}
+                    )
+                    PERCENTILES.record(track, score, previous["overallScore"] if previous else None)
+                    percentile = PERCENTILES.percentile(track, score)
                     
                     report = CandidateScoreReport(
                         candidateId=candidate.id,
@@ -230,6 +255,7 @@ async def populate_demo_data():
                         {"$set": report.model_dump()},
                         upsert=True
                     )
+            await on_report_upserted(candidate.id)
             
             created_count += 1
         except Exception as e:
@@ -297,9 +323,10 @@ async def load_questions():
                     question = QuestionMetadata(**q_data)
                     
                     # Insert or update (upsert based on questionId)
+                    # Keep calibrated IRT parameters unless the file provides its own
                     await collection.update_one(
                         {"questionId": question.questionId},
-                        {"$set": question.model_dump()},
+                        {"$set": question.model_dump(exclude={"adaptiveStats"} if question.adaptiveStats is None else None)},
                         upsert=True
                     )
                     total_loaded += 1
@@ -311,10 +338,13 @@ async def load_questions():
             errors.append(f"Error reading file {json_file}: {str(e)}")
             continue
     
+    snapshot = await publish_item_bank()
+    
     return envelope({
         "status": "success",
         "questionsLoaded": total_loaded,
         "filesProcessed": len(json_files),
+        "snapshotVersion": snapshot.version,
         "errors": errors if errors else None
     })
 
@@ -4,7 +4,9 @@ R-PRIV-01: Privacy-compliant candidate access
 R-LOG-01: All operations logged
 """
 
-from fastapi import APIRouter
+from typing import Optional
+
+from fastapi import APIRouter, Query
 from pydantic import BaseModel
 
 from ..models.domain import JobRequirement
@@ -33,9 +35,15 @@ async def upsert_job(employer_id: str, requirement: JobRequirement):
 
 
 @router.get("/{employer_id}/jobs/{job_id}/eligible")
-async def eligible(employer_id: str, job_id: str):
-    """Get eligible candidates for a job (R-PRIV-01: only shared candidates)"""
-    data = await employer_service.eligible_candidates(employer_id, job_id)
+async def eligible(
+    employer_id: str,
+    job_id: str,
+    limit: int = Query(employer_service.DEFAULT_PAGE_SIZE, ge=1, le=500),
+    minMatchScore: int = Query(0, ge=0, le=100),
+    cursor: Optional[str] = None,
+):
+    """Get eligible candidates for a job, best match first (R-PRIV-01: only shared candidates)"""
+    data = await employer_service.eligible_candidates(employer_id, job_id, limit, minMatchScore, cursor)
     return envelope(data.model_dump())
 
 
@@ -1,18 +1,63 @@
-import json
-from pathlib import Path
+from typing import Dict, List, Optional
 
-from fastapi import APIRouter
+from fastapi import APIRouter, Query
+from starlette.concurrency import run_in_threadpool
 
+from ..database import get_trace_events_collection
 from ..utils.api import envelope
+from ..utils.trace_logger import TRACE_LOG, flush_events, shared_sink_attached
+from ..utils.trace_sink import query_trace_collection
 
 router = APIRouter(prefix="/api/trace", tags=["trace"])
-TRACE_PATH = Path(__file__).resolve().parents[2] / "logs" / "trace.jsonl"
+
+
+async def _find_events(
+    filters: Dict[str, Optional[str]], limit: int, before: Optional[str], after: Optional[str], fresh: bool = False
+) -> List[Dict]:
+    """
+    Read from trace_events when MongoDB is the shared sink, else from the local segmented log.
+    Events still buffered by the writer (at most TRACE_FLUSH_INTERVAL_SECONDS old) are only
+    waited for when fresh is set, so reads do not force a write each time.
+    """
+    if fresh:
+        await run_in_threadpool(flush_events)
+    if shared_sink_attached():
+        return await query_trace_collection(get_trace_events_collection(), filters, limit, before, after)
+    return await run_in_threadpool(TRACE_LOG.query, filters, limit, before, after)
 
 
 @router.get("")
-def list_events(limit: int = 20):
-    if not TRACE_PATH.exists():
-        return envelope([])
-    lines = TRACE_PATH.read_text(encoding="utf-8").strip().splitlines()
-    data = [json.loads(line) for line in lines[-limit:]]
-    return envelope(data)
+async def list_events(
+    limit: int = Query(20, ge=1, le=1000),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    fresh: bool = Query(False, description="Include events this worker logged but has not written yet"),
+):
+    """
+    Most recent trace events, oldest first.
+    Page backwards by passing the first returned timestamp as `before`;
+    poll for new events by passing the last returned timestamp as `after`.
+    """
+    return envelope(await _find_events({}, limit, before, after, fresh))
+
+
+@router.get("/query")
+async def query_events(
+    actorId: Optional[str] = None,
+    eventType: Optional[str] = None,
+    sessionId: Optional[str] = None,
+    stream: Optional[str] = Query(None, description="Named view, e.g. 'prompt' for the prompt trace"),
+    limit: int = Query(100, ge=1, le=1000),
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+    fresh: bool = Query(False, description="Include events this worker logged but has not written yet"),
+):
+    """
+    R-LOG-01: Audit trail lookup, e.g. every event for one candidate or session.
+    Filters combine with AND and are answered from the per-segment sidecar indexes
+    (or the trace_events indexes when MongoDB is connected), so only matching events
+    are read. Returns the most recent matches, oldest first; page with `before`/`after`
+    as for the unfiltered listing.
+    """
+    filters = {"actorId": actorId, "eventType": eventType, "sessionId": sessionId, "stream": stream}
+    return envelope(await _find_events(filters, limit, before, after, fresh))
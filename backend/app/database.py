@@ -19,6 +19,63 @@ DATABASE_NAME = "vgp_platform"
 USE_FALLBACK = False
 
 
+async def _create_indexes(db) -> None:
+    """
+    Create indexes for efficient queries (R-PERF-01).
+    Shared by MongoDB and the in-memory fallback, which builds hash indexes from the
+    same definitions.
+    """
+    # Use sparse index for email to allow multiple null values
+    await db.candidates.create_index([("email", ASCENDING)], unique=True, sparse=True)
+    await db.candidates.create_index([("id", ASCENDING)], unique=True)
+    # Multikey: consent lookups by employer (R-PRIV-01)
+    await db.candidates.create_index([("sharedEmployers", ASCENDING)])
+    
+    await db.employers.create_index([("id", ASCENDING)], unique=True)
+    await db.employers.create_index([("name", ASCENDING)])
+    
+    await db.score_reports.create_index([("candidateId", ASCENDING)])
+    await db.score_reports.create_index([("candidateId", ASCENDING), ("trackId", ASCENDING)])
+    await db.score_reports.create_index([("trackId", ASCENDING)])
+    await db.score_reports.create_index([("overallScore", DESCENDING)])
+    await db.score_reports.create_index([("percentile", DESCENDING)])
+    
+    await db.test_sessions.create_index([("sessionId", ASCENDING)], unique=True)
+    await db.test_sessions.create_index([("candidateId", ASCENDING)])
+    # Covers the session cache's version probe
+    await db.test_sessions.create_index([("sessionId", ASCENDING), ("version", ASCENDING)])
+    
+    await db.jobs.create_index([("jobId", ASCENDING)], unique=True)
+    await db.jobs.create_index([("employerId", ASCENDING)])
+    
+    await db.job_eligibility.create_index([("jobId", ASCENDING), ("candidateId", ASCENDING)], unique=True)
+    # Serves eligible-candidate pages in order: keyset queries on (matchScore desc, candidateId asc)
+    await db.job_eligibility.create_index(
+        [("jobId", ASCENDING), ("matchScore", DESCENDING), ("candidateId", ASCENDING)]
+    )
+    # A candidate's matches, best first; its candidateId prefix serves per-candidate updates
+    await db.job_eligibility.create_index(
+        [("candidateId", ASCENDING), ("matchScore", DESCENDING), ("jobId", ASCENDING)]
+    )
+    
+    await db.item_bank.create_index([("questionId", ASCENDING)], unique=True)
+    await db.item_bank.create_index([("trackId", ASCENDING)])
+    await db.item_bank.create_index([("difficulty", ASCENDING)])
+    
+    await db.calibration_stats.create_index([("questionId", ASCENDING)], unique=True)
+    await db.calibration_state.create_index([("name", ASCENDING)], unique=True)
+    await db.item_exposure.create_index([("questionId", ASCENDING)], unique=True)
+    await db.test_sessions.create_index([("status", ASCENDING), ("sessionId", ASCENDING)])
+    await db.rescore_state.create_index([("name", ASCENDING)], unique=True)
+    await db.item_bank_state.create_index([("name", ASCENDING)], unique=True)
+    await db.percentile_sketches.create_index([("trackId", ASCENDING), ("score", ASCENDING)], unique=True)
+    await db.test_sessions.create_index([("startedAt", ASCENDING)])
+    
+    # R-LOG-01: shared audit log; TTL retention and per-actor/event-type lookups
+    from .utils.trace_sink import create_trace_indexes
+    await create_trace_indexes(db)
+
+
 class MongoDB:
     """MongoDB connection manager"""
     client: Optional[AsyncIOMotorClient] = None
@@ -39,38 +96,18 @@ class MongoDB:
             except asyncio.TimeoutError:
                 raise ServerSelectionTimeoutError("Connection timeout")
             
-            # Create indexes for efficient queries (R-PERF-01)
-            # Use sparse index for email to allow multiple null values
-            await db.candidates.create_index([("email", ASCENDING)], unique=True, sparse=True)
-            await db.candidates.create_index([("id", ASCENDING)], unique=True)
-            
-            await db.employers.create_index([("id", ASCENDING)], unique=True)
-            await db.employers.create_index([("name", ASCENDING)])
-            
-            await db.score_reports.create_index([("candidateId", ASCENDING)])
-            await db.score_reports.create_index([("trackId", ASCENDING)])
-            await db.score_reports.create_index([("overallScore", DESCENDING)])
-            await db.score_reports.create_index([("percentile", DESCENDING)])
-            
-            await db.test_sessions.create_index([("sessionId", ASCENDING)], unique=True)
-            await db.test_sessions.create_index([("candidateId", ASCENDING)])
-            
-            await db.jobs.create_index([("jobId", ASCENDING)], unique=True)
-            await db.jobs.create_index([("employerId", ASCENDING)])
-            
-            await db.item_bank.create_index([("questionId", ASCENDING)], unique=True)
-            await db.item_bank.create_index([("trackId", ASCENDING)])
-            await db.item_bank.create_index([("difficulty", ASCENDING)])
+            await _create_indexes(db)
             
             print(f"✅ Connected to MongoDB at {MONGODB_URL}")
             USE_FALLBACK = False
         except (ServerSelectionTimeoutError, asyncio.TimeoutError, Exception) as e:
             print(f"⚠️  MongoDB connection failed: {type(e).__name__}")
-            print("⚠️  Using in-memory fallback database (data will not persist)")
+            print("⚠️  Using in-memory fallback database")
             USE_FALLBACK = True
             # Import and use fallback
             from .database_fallback import FallbackMongoDB
             await FallbackMongoDB.connect_db()
+            await _create_indexes(FallbackMongoDB.get_database())
             cls.client = FallbackMongoDB
     
     @classmethod
@@ -116,9 +153,37 @@ def get_jobs_collection():
     return MongoDB.get_database().jobs
 
 
+def get_job_eligibility_collection():
+    return MongoDB.get_database().job_eligibility
+
+
 def get_item_bank_collection():
     return MongoDB.get_database().item_bank
 
 
+def get_item_bank_state_collection():
+    return MongoDB.get_database().item_bank_state
+
+
+def get_calibration_stats_collection():
+    return MongoDB.get_database().calibration_stats
+
+
+def get_calibration_state_collection():
+    return MongoDB.get_database().calibration_state
+
+
+def get_item_exposure_collection():
+    return MongoDB.get_database().item_exposure
+
+
+def get_percentile_sketches_collection():
+    return MongoDB.get_database().percentile_sketches
+
+
+def get_rescore_state_collection():
+    return MongoDB.get_database().rescore_state
+
+
 def get_trace_events_collection():
     return MongoDB.get_database().trace_events
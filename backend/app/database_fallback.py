@@ -1,171 +1,770 @@
 """
 In-memory fallback database for demo purposes when MongoDB is not available
+Set FALLBACK_DATA_DIR to keep the data across restarts (see database_wal).
 """
 
-from typing import Dict, List, Any
+import bisect
+import copy
+import itertools
+import operator
+import os
+from enum import Enum
+from typing import TYPE_CHECKING, Any, Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Set, Tuple
+
+from pymongo.errors import DuplicateKeyError, InvalidOperation
+
+if TYPE_CHECKING:
+    # msgpack is only needed in durable mode
+    from .database_wal import DurableStore
+
+# Range operators supported in field queries, e.g. {"score": {"$gte": 70}}
+COMPARISON_OPERATORS = {
+    '$gt': operator.gt,
+    '$gte': operator.ge,
+    '$lt': operator.lt,
+    '$lte': operator.le,
+    '$ne': operator.ne,
+}
+
+
+def _compare(field_value: Any, condition: Dict) -> bool:
+    """
+    Apply every range operator in condition to a scalar field value (_MISSING if absent).
+    As in MongoDB, a missing or null field fails range operators other than $gte / $lte
+    null and satisfies $ne unless it is $ne: null; values of unlike types never match.
+    """
+    for op, bound in condition.items():
+        if op not in COMPARISON_OPERATORS:
+            continue
+        if field_value is None or field_value is _MISSING:
+            matched = bound is not None if op == '$ne' else bound is None and op in ('$gte', '$lte')
+        else:
+            try:
+                matched = COMPARISON_OPERATORS[op](field_value, bound)
+            except TypeError:
+                matched = op == '$ne'
+        if not matched:
+            return False
+    return True
+
+
+def _each(value: Any) -> List:
+    """Values an array operator appends: {"$each": [...]} or a plain list spreads, anything else is one value"""
+    if isinstance(value, dict) and '$each' in value:
+        return list(value['$each'])
+    if isinstance(value, list):
+        return value
+    return [value]
+
+
+def _apply_update(doc: Dict, update: Dict, inserting: bool = False) -> None:
+    """Apply $set / $inc / $addToSet / $push (and, when an upsert inserts, $setOnInsert) to a document in place"""
+    if inserting and '$setOnInsert' in update:
+        doc.update(update['$setOnInsert'])
+    if '$set' in update:
+        doc.update(update['$set'])
+    for key, amount in update.get('$inc', {}).items():
+        doc[key] = doc.get(key, 0) + amount
+    for key, value in update.get('$addToSet', {}).items():
+        values = doc.setdefault(key, [])
+        for v in _each(value):
+            if v not in values:
+                values.append(v)
+    for key, value in update.get('$push', {}).items():
+        doc.setdefault(key, []).extend(_each(value))
+
+
+def _project(doc: Dict, projection: Dict = None) -> Dict:
+    """
+    Deep copy of doc limited by a top-level inclusion ({"a": 1}) or exclusion ({"a": 0})
+    projection. Only the selected fields are copied, and callers can never mutate stored
+    documents through the result.
+    """
+    if not projection:
+        return copy.deepcopy(doc)
+    included = [key for key, flag in projection.items() if flag and key != '_id']
+    if included:
+        return {key: _copy(doc[key]) for key in included if key in doc}
+    return {key: _copy(value) for key, value in doc.items() if projection.get(key, 1)}
+
+
+_IMMUTABLE = (str, int, float, bool, type(None))
+
+
+def _copy(value: Any) -> Any:
+    """deepcopy, skipped for plain scalars, which are immutable and by far the most common projected value"""
+    return value if type(value) in _IMMUTABLE else copy.deepcopy(value)
+
+
+def _freeze(value: Any) -> Hashable:
+    """Hashable form of a field value for index keys (enums compare as their values)"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, dict):
+        return tuple(sorted((k, _freeze(v)) for k, v in value.items()))
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _field(doc: Dict, path: str) -> Any:
+    """Value at a dotted path, or _MISSING"""
+    value: Any = doc
+    for part in path.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+_MISSING = object()
+
+
+def _condition(key: str, value: Any) -> Callable[[Dict], bool]:
+    """Predicate for one field condition of a query"""
+    if isinstance(value, dict):
+        if '$in' in value:
+            # Frozen once per query, so each document costs set lookups rather than a list scan
+            allowed = {_freeze(v) for v in value['$in']}
+            
+            def test_in(doc: Dict) -> bool:
+                if key not in doc:
+                    # As in MongoDB, null inside $in also matches a missing field
+                    return None in allowed
+                field = doc[key]
+                # A list field matches if any element is listed (multikey semantics)
+                values = field if isinstance(field, list) else (field,)
+                return any(_freeze(v) in allowed for v in values) and _compare(field, value)
+            return test_in
+        if '$nin' in value:
+            excluded = {_freeze(v) for v in value['$nin']}
+
+            def test_nin(doc: Dict) -> bool:
+                # A missing field is null, so it matches unless null is excluded
+                field = doc.get(key)
+                values = field if isinstance(field, list) else (field,)
+                return not any(_freeze(v) in excluded for v in values) and _compare(doc.get(key, _MISSING), value)
+            return test_nin
+        if not any(op in COMPARISON_OPERATORS for op in value):
+            return lambda doc: False
+        return lambda doc: _compare(doc.get(key, _MISSING), value)
+    if value is None:
+        # As in MongoDB, null also matches a missing field
+        return lambda doc: doc.get(key) is None
+    
+    def test_equal(doc: Dict) -> bool:
+        if key not in doc:
+            return False
+        field = doc[key]
+        # If field is a list, check if value is in the list
+        return value in field if isinstance(field, list) else field == value
+    return test_equal
+
+
+def _compile(query: Dict, answered: Iterable[str] = ()) -> Callable[[Dict], bool]:
+    """
+    Predicate for query, built once per query instead of re-reading the query for every
+    document. Fields in answered were resolved exactly by an index lookup and are skipped.
+    """
+    conditions: List[Callable[[Dict], bool]] = []
+    for key, value in query.items():
+        if key == '$or':
+            branches = [_compile(branch) for branch in value]
+            conditions.append(lambda doc: any(branch(doc) for branch in branches))
+        elif key == '$and':
+            conditions.extend(_compile(branch) for branch in value)
+        elif not key.startswith('$') and key not in answered:
+            conditions.append(_condition(key, value))
+    if not conditions:
+        return lambda doc: True
+    if len(conditions) == 1:
+        return conditions[0]
+    return lambda doc: all(condition(doc) for condition in conditions)
+
+
+class _Reversed:
+    """Inverts the ordering of a value, for descending index fields that cannot be negated"""
+    __slots__ = ("value",)
+
+    def __init__(self, value: Any):
+        self.value = value
+
+    def __eq__(self, other: "_Reversed") -> bool:
+        return self.value == other.value
+
+    def __lt__(self, other: "_Reversed") -> bool:
+        return self.value > other.value
+
+
+def _sort_value(value: Hashable, direction: int) -> Tuple:
+    """Orderable form of an index value: null, then numbers, then strings, then anything else; reversed for descending fields"""
+    if value is None:
+        rank, plain = 0, 0
+    elif isinstance(value, (int, float)):
+        rank, plain = 1, value
+    elif isinstance(value, str):
+        rank, plain = 2, value
+    else:
+        rank, plain = 3, repr(value)
+    if direction > 0:
+        return (rank, plain)
+    return (-rank, -plain if rank == 1 else _Reversed(plain))
+
+
+# Sorts after every sort value, to seek past all keys that share a prefix
+_PAST = (4,)
+
+# Range operators that bound where an ascending scan may start, and where it may stop
+_LOWER_BOUNDS = ('$gt', '$gte')
+_UPPER_BOUNDS = ('$lt', '$lte')
+
+
+def _discard(table: Dict[Tuple, Set[str]], key: Tuple, doc_id: str) -> None:
+    ids = table.get(key)
+    if ids is not None:
+        ids.discard(doc_id)
+        if not ids:
+            del table[key]
+
+
+class HashIndex:
+    """
+    Hash index over one or more fields: key tuple -> ids of the documents holding it,
+    plus the same for each leading prefix of the fields, so a query binding only the
+    first fields can use it too. Multikey like MongoDB's: a list value contributes one
+    key per element. A missing field is keyed as None, unless the index is sparse and
+    every field is missing.
+    Like a B-tree, it can also return ids in key order (see ordered); the sorted key list
+    behind that is built on the first ordered read and kept in order by later writes.
+    """
+
+    def __init__(
+        self,
+        fields: Tuple[str, ...],
+        unique: bool = False,
+        sparse: bool = False,
+        directions: Optional[Tuple[int, ...]] = None,
+    ):
+        self.fields = fields
+        self.unique = unique
+        self.sparse = sparse
+        self.directions = directions or (1,) * len(fields)
+        self.entries: Dict[Tuple, Set[str]] = {}
+        # prefixes[n - 1]: the first n fields' values -> ids, for n < len(fields)
+        self.prefixes: List[Dict[Tuple, Set[str]]] = [{} for _ in fields[1:]]
+        self._sorted_keys: Optional[List[Tuple]] = None
+        self._sort_values: List[Tuple] = []
+
+    def keys(self, doc: Dict) -> Set[Tuple]:
+        values = [_field(doc, f) for f in self.fields]
+        if self.sparse and all(v is _MISSING for v in values):
+            return set()
+        options = [
+            [_freeze(e) for e in v] or [None] if isinstance(v, list) else [None if v is _MISSING else _freeze(v)]
+            for v in values
+        ]
+        return set(itertools.product(*options))
+
+    def conflict(self, doc_id: str, keys: Set[Tuple]) -> Optional[Tuple]:
+        """A key of a unique index already held by another document"""
+        if self.unique:
+            for key in keys:
+                if self.entries.get(key, set()) - {doc_id}:
+                    return key
+        return None
+
+    def add(self, doc_id: str, keys: Set[Tuple]) -> None:
+        for key in keys:
+            if key not in self.entries and self._sorted_keys is not None:
+                position = bisect.bisect_left(self._sort_values, self._sort_key(key))
+                self._sort_values.insert(position, self._sort_key(key))
+                self._sorted_keys.insert(position, key)
+            self.entries.setdefault(key, set()).add(doc_id)
+            for length, prefix in enumerate(self.prefixes, 1):
+                prefix.setdefault(key[:length], set()).add(doc_id)
+
+    def remove(self, doc_id: str, keys: Set[Tuple]) -> None:
+        for key in keys:
+            _discard(self.entries, key, doc_id)
+            if key not in self.entries and self._sorted_keys is not None:
+                position = bisect.bisect_left(self._sort_values, self._sort_key(key))
+                if position < len(self._sorted_keys) and self._sorted_keys[position] == key:
+                    del self._sort_values[position]
+                    del self._sorted_keys[position]
+            for length, prefix in enumerate(self.prefixes, 1):
+                _discard(prefix, key[:length], doc_id)
+
+    def _values(self, query: Dict, field: str) -> Optional[List]:
+        """Values an equality / $in condition on field allows, or None if the index cannot use it"""
+        if field not in query:
+            return None
+        condition = query[field]
+        if isinstance(condition, dict):
+            if set(condition) != {'$in'}:
+                return None
+            values = list(condition['$in'])
+        elif isinstance(condition, list):
+            return None
+        else:
+            values = [condition]
+        if self.sparse and None in values:
+            return None
+        return values
+
+    def bound(self, query: Dict) -> int:
+        """How many leading fields query binds with equality / $in conditions"""
+        count = 0
+        for f in self.fields:
+            if self._values(query, f) is None:
+                break
+            count += 1
+        return count
+
+    def exact(self, query: Dict, bound: int) -> bool:
+        """
+        Whether lookup(query, bound) returns exactly the matches for those fields, so they
+        need no re-check. Not for null, which the index cannot tell apart from an empty list.
+        """
+        return all(None not in self._values(query, f) for f in self.fields[:bound])
+
+    def lookup(self, query: Dict, bound: Optional[int] = None) -> Optional[Set[str]]:
+        """
+        Ids of candidate documents for the conditions on the first bound fields (by default
+        all that query binds), or None if query binds no leading field
+        """
+        if bound is None:
+            bound = self.bound(query)
+        if not bound:
+            return None
+        options = [[_freeze(v) for v in self._values(query, f)] for f in self.fields[:bound]]
+        table = self.entries if bound == len(self.fields) else self.prefixes[bound - 1]
+        ids: Set[str] = set()
+        for key in itertools.product(*options):
+            ids |= table.get(key, set())
+        return ids
+
+    def _sort_key(self, key: Tuple) -> Tuple:
+        return tuple(_sort_value(v, d) for v, d in zip(key, self.directions))
+
+    def _sorted(self) -> List[Tuple]:
+        if self._sorted_keys is None:
+            ordered = sorted((self._sort_key(key), key) for key in self.entries)
+            self._sort_values = [sort_value for sort_value, _ in ordered]
+            self._sorted_keys = [key for _, key in ordered]
+        return self._sorted_keys
+
+    def ordered(self, query: Dict, sort: List[Tuple[str, int]]) -> Optional[Iterator[str]]:
+        """
+        Ids in sort order, for a query that binds the fields before the sort keys by plain
+        equality when the index holds the sort keys next, in the same directions. The scan
+        starts at the lowest key any branch of query (top level, or each $or branch) allows
+        and stops past the top level's bound on the first sort key, so a keyset page costs
+        O(log n + page) rather than a sort of every match. None if the index does not fit.
+        """
+        prefix = 0
+        while prefix < len(self.fields) and self.fields[prefix] in query and not isinstance(query[self.fields[prefix]], (dict, list)):
+            prefix += 1
+        if [f for f, _ in sort] != list(self.fields[prefix:prefix + len(sort)]):
+            return None
+        if [1 if d > 0 else -1 for _, d in sort] != [1 if d > 0 else -1 for d in self.directions[prefix:prefix + len(sort)]]:
+            return None
+
+        start = tuple(
+            _sort_value(_freeze(query[f]), d) for f, d in zip(self.fields[:prefix], self.directions)
+        )
+        top = {k: v for k, v in query.items() if k != '$or'}
+        branches = [{**top, **branch} for branch in query['$or']] if '$or' in query else [top]
+        lowest = min(self._seek(branch, prefix) for branch in branches)
+        stop = self._stop(top, prefix)
+        keys = self._sorted()
+        sort_values = self._sort_values
+
+        def ids() -> Iterator[str]:
+            # Resumes from the last key read rather than a position, so writes made while
+            # a lazy reader iterates cannot shift it onto keys it already passed
+            seen: Set[str] = set()
+            after, inclusive = start + lowest, True
+            while True:
+                search = bisect.bisect_left if inclusive else bisect.bisect_right
+                position = search(sort_values, after)
+                if position >= len(keys):
+                    return
+                sort_value = sort_values[position]
+                if sort_value[:prefix] != start:
+                    return
+                if stop is not None and sort_value[prefix] > stop:
+                    return
+                for doc_id in sorted(self.entries.get(keys[position], ()), key=int):
+                    if doc_id not in seen:
+                        seen.add(doc_id)
+                        yield doc_id
+                after, inclusive = sort_value, False
+        return ids()
+
+    def _seek(self, query: Dict, prefix: int) -> Tuple:
+        """Lowest sort values (after the bound prefix) a document matching query can have"""
+        lowest: List[Tuple] = []
+        for f, d in zip(self.fields[prefix:], self.directions[prefix:]):
+            condition = query.get(f, _MISSING)
+            if condition is _MISSING or isinstance(condition, list):
+                break
+            if not isinstance(condition, dict):
+                lowest.append(_sort_value(_freeze(condition), d))
+                continue
+            for op in (_LOWER_BOUNDS if d > 0 else _UPPER_BOUNDS):
+                if op in condition:
+                    lowest.append(_sort_value(_freeze(condition[op]), d))
+                    if op in ('$gt', '$lt'):
+                        # Exclusive: start past every key holding the bound itself
+                        lowest.append(_PAST)
+                    break
+            break
+        return tuple(lowest)
+
+    def _stop(self, query: Dict, prefix: int) -> Optional[Tuple]:
+        """Highest sort value of the first field after the prefix that query allows, or None if unbounded"""
+        if prefix >= len(self.fields):
+            return None
+        condition = query.get(self.fields[prefix])
+        direction = self.directions[prefix]
+        if isinstance(condition, dict):
+            for op in (_UPPER_BOUNDS if direction > 0 else _LOWER_BOUNDS):
+                if op in condition:
+                    return _sort_value(_freeze(condition[op]), direction)
+        elif condition is not None and not isinstance(condition, list):
+            return _sort_value(_freeze(condition), direction)
+        return None
 
 
 class InMemoryCollection:
     """Simulates MongoDB collection with in-memory storage"""
     
-    def __init__(self):
+    def __init__(self, name: str = "", store: Optional["DurableStore"] = None):
+        self.name = name
         self.data: Dict[str, Any] = {}
         self.counter = 0
+        self.indexes: Dict[Tuple[str, ...], HashIndex] = {}
+        # Durable mode: every mutation is appended to the store's write-ahead log
+        self.store = store
     
-    async def insert_one(self, document: Dict):
-        """Insert a document"""
+    def _index(self, doc_id: str, doc: Dict) -> None:
+        """Add a document to every index, rejecting it if a unique key is taken"""
+        keyed = [(index, index.keys(doc)) for index in self.indexes.values()]
+        for index, keys in keyed:
+            key = index.conflict(doc_id, keys)
+            if key is not None:
+                raise DuplicateKeyError(f"E11000 duplicate key error: {dict(zip(index.fields, key))}")
+        for index, keys in keyed:
+            index.add(doc_id, keys)
+    
+    def _unindex(self, doc_id: str, doc: Dict) -> None:
+        for index in self.indexes.values():
+            index.remove(doc_id, index.keys(doc))
+    
+    def _scan(self, query: Dict) -> Iterator[Tuple[str, Dict]]:
+        """
+        (id, document) pairs matching query, in insertion order.
+        Uses the index whose leading fields cover the most equality / $in fields of the
+        query, if any, and a full scan otherwise.
+        """
+        candidates: Optional[Set[str]] = None
+        answered: Tuple[str, ...] = ()
+        best, bound = None, 0
+        for index in self.indexes.values():
+            covered = index.bound(query)
+            if covered > bound:
+                best, bound = index, covered
+        if best is not None:
+            candidates = best.lookup(query, bound)
+            answered = best.fields[:bound] if best.exact(query, bound) else ()
+        matches = _compile(query, answered)
+        # Ids are snapshotted so a lazy reader survives writes made while it iterates
+        ids = list(self.data) if candidates is None else sorted(candidates, key=int)
+        for doc_id in ids:
+            doc = self.data.get(doc_id)
+            if doc is not None and matches(doc):
+                yield doc_id, doc
+    
+    def _log_put(self, doc_id: str, doc: Dict) -> None:
+        if self.store is not None:
+            self.store.log(('put', self.name, doc_id, doc))
+    
+    def _log_delete(self, doc_id: str) -> None:
+        if self.store is not None:
+            self.store.log(('del', self.name, doc_id))
+    
+    async def _commit(self) -> None:
+        """Durable mode: wait until this operation's WAL records are on disk"""
+        if self.store is not None:
+            await self.store.commit()
+    
+    def _insert(self, document: Dict) -> str:
         doc_id = str(self.counter)
+        self._index(doc_id, document)
         self.counter += 1
         self.data[doc_id] = document
+        self._log_put(doc_id, document)
+        return doc_id
+    
+    def _update(self, query: Dict, update: Dict, return_document: bool, upsert: bool) -> Tuple[Optional[Dict], bool]:
+        """(document before / after, whether an existing document matched)"""
+        for doc_id, doc in self._scan(query):
+            before = copy.deepcopy(doc)
+            self._unindex(doc_id, doc)
+            _apply_update(doc, update)
+            try:
+                self._index(doc_id, doc)
+            except DuplicateKeyError:
+                # Leave the document and its index entries as they were
+                doc.clear()
+                doc.update(before)
+                self._index(doc_id, doc)
+                raise
+            self._log_put(doc_id, doc)
+            return (copy.deepcopy(doc) if return_document else before), True
+        
+        if upsert:
+            # Insert new document built from the query's plain fields plus the update
+            new_doc = {}
+            for key, value in query.items():
+                if not key.startswith('$') and not isinstance(value, dict):
+                    new_doc[key] = value
+            _apply_update(new_doc, update, inserting=True)
+            self._insert(new_doc)
+            return (copy.deepcopy(new_doc) if return_document else None), False
+        return None, False
+    
+    def _delete(self, query: Dict, many: bool) -> int:
+        doomed = list(self._scan(query)) if many else list(itertools.islice(self._scan(query), 1))
+        for doc_id, doc in doomed:
+            self._unindex(doc_id, doc)
+            del self.data[doc_id]
+            self._log_delete(doc_id)
+        return len(doomed)
+    
+    async def insert_one(self, document: Dict):
+        """Insert a document"""
+        doc_id = self._insert(document)
+        await self._commit()
         return type('InsertResult', (), {'inserted_id': doc_id})()
     
-    async def find_one(self, query: Dict):
+    async def insert_many(self, documents: List[Dict], ordered: bool = True):
+        """Insert several documents"""
+        ids = [self._insert(document) for document in documents]
+        await self._commit()
+        return type('InsertManyResult', (), {'inserted_ids': ids})()
+    
+    async def find_one(self, query: Dict, projection: Dict = None):
         """Find one document matching query"""
-        for doc in self.data.values():
-            if self._matches(doc, query):
-                return dict(doc)
+        for _, doc in self._scan(query):
+            return _project(doc, projection)
         return None
     
-    def find(self, query: Dict = None):
-        """Find all documents matching query"""
-        return InMemoryCursor(self.data, query or {})
+    def find(self, query: Dict = None, projection: Dict = None, sort=None, skip: int = 0, limit: int = 0):
+        """Lazy cursor over the documents matching query, like Motor's find()"""
+        cursor = InMemoryCursor(self, query or {}, projection)
+        if sort:
+            cursor.sort(sort)
+        return cursor.skip(skip).limit(limit)
     
     async def update_one(self, query: Dict, update: Dict, upsert: bool = False):
         """Update one document"""
-        # Try to find existing document
-        for doc_id, doc in self.data.items():
-            if self._matches(doc, query):
-                if '$set' in update:
-                    doc.update(update['$set'])
-                if '$addToSet' in update:
-                    for key, value in update['$addToSet'].items():
-                        if key not in doc:
-                            doc[key] = []
-                        # Handle both single values and lists
-                        if isinstance(value, list):
-                            for v in value:
-                                if v not in doc[key]:
-                                    doc[key].append(v)
-                        elif value not in doc[key]:
-                            doc[key].append(value)
-                return
-        
-        if upsert:
-            # Insert new document with $set values
-            new_doc = {}
-            # Include query fields that are not operators
-            for key, value in query.items():
-                if not key.startswith('$'):
-                    new_doc[key] = value
-            if '$set' in update:
-                new_doc.update(update['$set'])
-            if '$addToSet' in update:
-                for key, value in update['$addToSet'].items():
-                    if isinstance(value, list):
-                        new_doc[key] = value
-                    else:
-                        new_doc[key] = [value]
-            await self.insert_one(new_doc)
+        await self.find_one_and_update(query, update, upsert=upsert)
+    
+    async def find_one_and_update(
+        self, query: Dict, update: Dict, projection: Dict = None, return_document: bool = False, upsert: bool = False
+    ):
+        """
+        Atomically update the first matching document and return it as it was before
+        the update, or after it with return_document=ReturnDocument.AFTER; None if nothing
+        matched. Atomic because there is no await between the match and the write.
+        """
+        result, _ = self._update(query, update, return_document, upsert)
+        await self._commit()
+        return result if result is None or not projection else _project(result, projection)
+    
+    async def bulk_write(self, operations: List[Any], ordered: bool = True):
+        """Apply pymongo InsertOne / UpdateOne / DeleteOne operations in order, with one commit"""
+        inserted = matched = upserted = deleted = 0
+        for op in operations:
+            kind = type(op).__name__
+            if kind == 'InsertOne':
+                self._insert(op._doc)
+                inserted += 1
+            elif kind == 'UpdateOne':
+                _, found = self._update(op._filter, op._doc, False, op._upsert)
+                if found:
+                    matched += 1
+                elif op._upsert:
+                    upserted += 1
+            elif kind == 'DeleteOne':
+                deleted += self._delete(op._filter, many=False)
+            else:
+                raise NotImplementedError(f"bulk_write does not support {kind}")
+        await self._commit()
+        return type('BulkWriteResult', (), {
+            'inserted_count': inserted,
+            'matched_count': matched,
+            'modified_count': matched,
+            'upserted_count': upserted,
+            'deleted_count': deleted,
+        })()
+    
+    async def delete_one(self, query: Dict):
+        """Delete the first document matching query"""
+        deleted = self._delete(query, many=False)
+        await self._commit()
+        return type('DeleteResult', (), {'deleted_count': deleted})()
+    
+    async def delete_many(self, query: Dict):
+        """Delete all documents matching query"""
+        deleted = self._delete(query, many=True)
+        await self._commit()
+        return type('DeleteResult', (), {'deleted_count': deleted})()
     
     async def count_documents(self, query: Dict):
         """Count documents matching query"""
-        count = 0
-        for doc in self.data.values():
-            if self._matches(doc, query):
-                count += 1
-        return count
+        return sum(1 for _ in self._scan(query))
     
-    async def create_index(self, *args, **kwargs):
-        """No-op for in-memory"""
-        pass
-    
-    def _matches(self, doc: Dict, query: Dict) -> bool:
-        """Check if document matches query"""
-        for key, value in query.items():
-            if key.startswith('$'):
-                # Handle special operators
-                if key == '$in':
-                    continue
-                return True
-            
-            if key not in doc:
-                return False
-            
-            if isinstance(value, dict):
-                # Handle nested queries
-                if '$in' in value:
-                    if doc[key] not in value['$in']:
-                        return False
-                else:
-                    return False
-            elif isinstance(doc[key], list):
-                # If field is a list, check if value is in the list
-                if value not in doc[key]:
-                    return False
-            elif doc[key] != value:
-                return False
-        
-        return True
+    async def create_index(self, keys, unique: bool = False, sparse: bool = False, **kwargs):
+        """
+        Build an index (used for equality, $in and prefix lookups, and for sorts in its key
+        order) over the existing documents. Options such as TTL are accepted and ignored.
+        """
+        pairs = [(keys, 1)] if isinstance(keys, str) else list(keys)
+        fields = tuple(field for field, _ in pairs)
+        directions = tuple(-1 if direction == -1 else 1 for _, direction in pairs)
+        name = "_".join(fields)
+        if fields in self.indexes:
+            return name
+        self._build_index(fields, unique, sparse, directions)
+        if self.store is not None:
+            self.store.log(('index', self.name, list(fields), unique, sparse, list(directions)))
+            await self._commit()
+        return name
+    
+    def _build_index(
+        self, fields: Tuple[str, ...], unique: bool, sparse: bool, directions: Optional[Tuple[int, ...]] = None
+    ) -> None:
+        index = HashIndex(fields, unique=unique, sparse=sparse, directions=directions)
+        for doc_id, doc in self.data.items():
+            doc_keys = index.keys(doc)
+            key = index.conflict(doc_id, doc_keys)
+            if key is not None:
+                raise DuplicateKeyError(f"E11000 duplicate key error: {dict(zip(fields, key))}")
+            index.add(doc_id, doc_keys)
+        self.indexes[fields] = index
+    
+    def _ordered_scan(self, query: Dict, sort: List[Tuple[str, int]]) -> Optional[Iterator[Dict]]:
+        """Matching documents read in sort order from an index, or None if no index has that order"""
+        for index in self.indexes.values():
+            ids = index.ordered(query, sort)
+            if ids is not None:
+                matches = _compile(query)
+                return (
+                    doc for doc in (self.data.get(doc_id) for doc_id in ids)
+                    if doc is not None and matches(doc)
+                )
+        return None
 
 
 class InMemoryCursor:
-    """Simulates MongoDB cursor"""
+    """
+    Lazy cursor with Motor's API: find() only records the query, and documents are
+    matched, projected and copied one at a time as the caller iterates, so streaming a
+    large collection never holds more than one copied document. sort has to see every
+    match first; it collects references (not copies), as MongoDB does for an
+    unindexed sort.
+    """
     
-    def __init__(self, data: Dict, query: Dict):
-        self.results = [
-            doc for doc in data.values()
-            if self._matches(doc, query)
-        ]
-        self.index = 0
+    def __init__(self, collection: InMemoryCollection, query: Dict, projection: Dict = None):
+        self.collection = collection
+        self.query = query
+        self.projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._batch_size = 0
+        self._results: Optional[Iterator[Dict]] = None
     
-    def _matches(self, doc: Dict, query: Dict) -> bool:
-        """Check if document matches query"""
-        for key, value in query.items():
-            if key.startswith('$'):
-                continue
-            
-            if key not in doc:
-                return False
-            
-            if isinstance(value, dict) and '$in' in value:
-                if not isinstance(doc[key], list):
-                    if doc[key] not in value['$in']:
-                        return False
-                else:
-                    # Check if any value in doc[key] is in the $in list
-                    if not any(v in value['$in'] for v in doc[key]):
-                        return False
-            elif isinstance(doc[key], list):
-                # If field is a list, check if query value is in the list
-                if value not in doc[key]:
-                    return False
-            elif doc[key] != value:
-                return False
-        
-        return True
+    def _check_unstarted(self) -> None:
+        if self._results is not None:
+            raise InvalidOperation("cannot set options after executing query")
+    
+    def sort(self, key_or_list, direction: int = 1):
+        """Order results like pymongo's cursor.sort: a key and direction, or a list of (key, direction)"""
+        self._check_unstarted()
+        self._sort = [(key_or_list, direction)] if isinstance(key_or_list, str) else list(key_or_list)
+        return self
+    
+    def skip(self, count: int):
+        self._check_unstarted()
+        self._skip = count
+        return self
+    
+    def limit(self, count: int):
+        """Return at most count documents; 0 means no limit"""
+        self._check_unstarted()
+        self._limit = count
+        return self
+    
+    def batch_size(self, count: int):
+        """Accepted for API compatibility; documents are produced one at a time anyway"""
+        self._check_unstarted()
+        self._batch_size = count
+        return self
+    
+    def _execute(self) -> Iterator[Dict]:
+        # An index in the sort order serves pages without sorting every match
+        docs = self.collection._ordered_scan(self.query, self._sort) if self._sort else None
+        if docs is None:
+            docs = (doc for _, doc in self.collection._scan(self.query))
+            if self._sort:
+                ordered = list(docs)
+                # Stable sorts applied from the least significant key; missing values sort first
+                for key, order in reversed(self._sort):
+                    ordered.sort(key=lambda doc: (doc.get(key) is not None, doc.get(key)), reverse=order < 0)
+                docs = iter(ordered)
+        stop = self._skip + self._limit if self._limit else None
+        for doc in itertools.islice(docs, self._skip, stop):
+            yield _project(doc, self.projection)
     
     def __aiter__(self):
         return self
     
     async def __anext__(self):
-        if self.index >= len(self.results):
+        if self._results is None:
+            self._results = self._execute()
+        try:
+            return next(self._results)
+        except StopIteration:
             raise StopAsyncIteration
-        result = self.results[self.index]
-        self.index += 1
-        return result
+    
+    async def to_list(self, length: Optional[int] = None) -> List[Dict]:
+        """Up to length remaining documents (all of them if length is None)"""
+        if self._results is None:
+            self._results = self._execute()
+        return list(itertools.islice(self._results, length))
 
 
 class InMemoryDatabase:
     """Simulates MongoDB database"""
     
-    def __init__(self):
+    def __init__(self, store: Optional["DurableStore"] = None):
         self.collections: Dict[str, InMemoryCollection] = {}
+        self.store = store
     
     def __getattr__(self, name: str):
         """Get or create collection"""
+        if name.startswith('__'):
+            raise AttributeError(name)
         if name not in self.collections:
-            self.collections[name] = InMemoryCollection()
+            self.collections[name] = InMemoryCollection(name, self.store)
         return self.collections[name]
+    
+    def __getitem__(self, name: str):
+        """db["name"] works like db.name, as in Motor"""
+        return self.__getattr__(name)
 
 
 class FallbackMongoDB:
@@ -176,13 +775,25 @@ class FallbackMongoDB:
     
     @classmethod
     async def connect_db(cls):
-        """Initialize in-memory database"""
+        """Initialize in-memory database, replaying the durable store when FALLBACK_DATA_DIR is set"""
         print("⚠️  MongoDB not detected - using in-memory storage for demo")
-        print("✅ In-memory database initialized")
+        data_dir = os.getenv("FALLBACK_DATA_DIR")
+        if not data_dir:
+            print("✅ In-memory database initialized (data will not persist)")
+            return
+        from .database_wal import DurableStore
+        store = DurableStore(data_dir)
+        cls.database = InMemoryDatabase(store)
+        replayed = store.load(cls.database)
+        documents = sum(len(c.data) for c in cls.database.collections.values())
+        print(f"✅ In-memory database loaded from {data_dir}: {documents} documents, {replayed} log records replayed")
     
     @classmethod
     async def close_db(cls):
-        """No-op for in-memory"""
+        """Flush and compact the durable store, if any"""
+        if cls.database.store:
+            await cls.database.store.close()
+            cls.database = InMemoryDatabase()
         print("✅ In-memory database closed")
     
     @classmethod
@@ -0,0 +1,179 @@
+"""
+Durable storage for the in-memory fallback database
+Every mutation is appended to a write-ahead log (after-images of changed documents,
+deletes and index definitions) and fsynced in groups: writers that arrive within
+FALLBACK_COMMIT_INTERVAL_MS share one write + fsync. Once the log passes
+FALLBACK_SNAPSHOT_RECORDS records, a compacted snapshot of every collection replaces
+it. Both files are msgpack. Startup loads the snapshot and replays the log tail, so a
+single-node deployment can run without MongoDB and keep its data across restarts.
+"""
+
+import asyncio
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from enum import Enum
+from pathlib import Path
+from typing import Any, Optional
+
+import msgpack
+
+FALLBACK_COMMIT_INTERVAL_MS = float(os.getenv("FALLBACK_COMMIT_INTERVAL_MS", "2"))
+FALLBACK_SNAPSHOT_RECORDS = int(os.getenv("FALLBACK_SNAPSHOT_RECORDS", "50000"))
+
+SNAPSHOT_FILE = "snapshot.msgpack"
+WAL_FILE = "wal.msgpack"
+UNPACK_OPTIONS = {"raw": False, "strict_map_key": False, "timestamp": 3}
+
+
+def _encode(value: Any) -> Any:
+    """Types msgpack does not know, stored the way MongoDB would: enums as values, datetimes as timestamps"""
+    if isinstance(value, Enum):
+        return value.value
+    if isinstance(value, datetime):
+        return msgpack.Timestamp.from_datetime(value)
+    raise TypeError(f"Cannot store {type(value).__name__} in the fallback database")
+
+
+class DurableStore:
+    """Write-ahead log plus snapshot for one InMemoryDatabase"""
+
+    def __init__(self, directory: Path, commit_interval_ms: float = FALLBACK_COMMIT_INTERVAL_MS):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.snapshot_path = self.directory / SNAPSHOT_FILE
+        self.wal_path = self.directory / WAL_FILE
+        self.commit_interval = commit_interval_ms / 1000
+        self.database = None
+        self.records_since_snapshot = 0
+        # Only used on the event loop thread
+        self._packer = msgpack.Packer(default=_encode, use_bin_type=True)
+        self._buffer = bytearray()
+        self._group: Optional[asyncio.Future] = None
+        self._snapshot_task: Optional[asyncio.Task] = None
+        # One thread, so log appends and snapshot writes reach the disk in submission order
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="fallback-wal")
+        self._wal = None
+
+    def load(self, database) -> int:
+        """Rebuild database from the snapshot and the log tail; returns the number of log records replayed"""
+        self.database = database
+        if self.snapshot_path.exists():
+            state = msgpack.unpackb(self.snapshot_path.read_bytes(), **UNPACK_OPTIONS)
+            for name, saved in state["collections"].items():
+                collection = database[name]
+                collection.data = dict(saved["docs"])
+                collection.counter = saved["counter"]
+                for fields, unique, sparse, *directions in saved["indexes"]:
+                    # Snapshots written before indexes kept their sort directions have three fields
+                    collection._build_index(tuple(fields), unique, sparse, tuple(directions[0]) if directions else None)
+
+        replayed = 0
+        if self.wal_path.exists():
+            with open(self.wal_path, "r+b") as wal:
+                unpacker = msgpack.Unpacker(wal, **UNPACK_OPTIONS)
+                good = 0
+                try:
+                    for record in unpacker:
+                        self._apply(record)
+                        good = unpacker.tell()
+                        replayed += 1
+                except (ValueError, msgpack.UnpackException):
+                    print("⚠️  Fallback WAL ends in a torn record; discarding it", file=sys.stderr)
+                # Drop a record cut short by a crash so new appends start on a record boundary
+                wal.truncate(good)
+
+        self._wal = open(self.wal_path, "ab")
+        self.records_since_snapshot = replayed
+        return replayed
+
+    def _apply(self, record: list) -> None:
+        """Replay one log record; puts and deletes are idempotent"""
+        kind, name = record[0], record[1]
+        collection = self.database[name]
+        if kind == "put":
+            doc_id, doc = record[2], record[3]
+            old = collection.data.get(doc_id)
+            if old is not None:
+                collection._unindex(doc_id, old)
+            collection.data[doc_id] = doc
+            collection._index(doc_id, doc)
+            collection.counter = max(collection.counter, int(doc_id) + 1)
+        elif kind == "del":
+            old = collection.data.pop(record[2], None)
+            if old is not None:
+                collection._unindex(record[2], old)
+        elif kind == "index":
+            fields = tuple(record[2])
+            if fields not in collection.indexes:
+                directions = tuple(record[5]) if len(record) > 5 else None
+                collection._build_index(fields, record[3], record[4], directions)
+
+    def log(self, record: tuple) -> None:
+        """Buffer one mutation; it is encoded now, so later in-memory changes do not leak into it"""
+        self._buffer += self._packer.pack(record)
+        self.records_since_snapshot += 1
+
+    async def commit(self) -> None:
+        """Wait until everything logged so far is fsynced, sharing the write with concurrent writers"""
+        if self._group is None:
+            if not self._buffer:
+                return
+            self._group = asyncio.ensure_future(self._write_group())
+        await asyncio.shield(self._group)
+
+    async def _write_group(self) -> None:
+        await asyncio.sleep(self.commit_interval)
+        # Capture and reset together: anything logged from here on joins the next group
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        self._group = None
+        await asyncio.get_running_loop().run_in_executor(self._executor, self._append, data)
+        if self.records_since_snapshot >= FALLBACK_SNAPSHOT_RECORDS and self._snapshot_task is None:
+            self._snapshot_task = asyncio.ensure_future(self.snapshot())
+
+    def _append(self, data: bytes) -> None:
+        self._wal.write(data)
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+
+    async def snapshot(self) -> None:
+        """Write a compacted snapshot of every collection and truncate the log"""
+        try:
+            # Encoded in one step on the loop thread, so it is a consistent view
+            state = self._packer.pack({"collections": {
+                name: {
+                    "counter": collection.counter,
+                    "indexes": [
+                        [list(i.fields), i.unique, i.sparse, list(i.directions)] for i in collection.indexes.values()
+                    ],
+                    "docs": list(collection.data.items()),
+                }
+                for name, collection in self.database.collections.items()
+            }})
+            self.records_since_snapshot = 0
+            # Queued behind every log append already submitted, all of which the snapshot
+            # covers; records logged after the encode land in the log after the truncate
+            await asyncio.get_running_loop().run_in_executor(self._executor, self._write_snapshot, state)
+        finally:
+            self._snapshot_task = None
+
+    def _write_snapshot(self, state: bytes) -> None:
+        temporary = self.snapshot_path.with_suffix(".tmp")
+        with open(temporary, "wb") as f:
+            f.write(state)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temporary, self.snapshot_path)
+        self._wal.truncate(0)
+        os.fsync(self._wal.fileno())
+
+    async def close(self) -> None:
+        """Flush pending writes and compact, so the next start only loads the snapshot"""
+        await self.commit()
+        if self._snapshot_task is not None:
+            await self._snapshot_task
+        await self.snapshot()
+        self._wal.close()
+        self._executor.shutdown(wait=True)
@@ -3,7 +3,9 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from .api import candidates, employers, tests, trace, admin
+from . import database
 from .database import MongoDB
+from .utils.trace_logger import attach_shared_sink, shutdown_trace_logger
 
 
 @asynccontextmanager
@@ -15,6 +17,12 @@ async def lifespan(app: FastAPI):
     # Startup
     await MongoDB.connect_db()
     
+    # R-LOG-01: With MongoDB available, all workers write trace events to trace_events;
+    # the local JSONL logs remain the fallback
+    if not database.USE_FALLBACK:
+        from .utils.trace_sink import MongoTraceSink
+        attach_shared_sink(MongoTraceSink(database.MONGODB_URL, database.DATABASE_NAME))
+    
     # Try to load questions from JSON files if database is empty
     try:
         from .database import get_item_bank_collection
@@ -38,6 +46,21 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️  Could not check question count: {e}")
     
+    # Build the in-process item bank snapshot (R-PERF-01)
+    try:
+        from .services.item_bank import refresh_item_bank
+        snapshot = await refresh_item_bank()
+        print(f"📚 Item bank snapshot v{snapshot.version} cached ({len(snapshot.by_id)} questions)")
+    except Exception as e:
+        print(f"⚠️  Could not cache item bank: {e}")
+    
+    # R-SCOR-01: Load per-track score distributions before any report is stored
+    from .services.percentiles import start_percentile_flusher, stop_percentile_flusher
+    try:
+        await start_percentile_flusher()
+    except Exception as e:
+        print(f"⚠️  Could not load percentile sketches: {e}")
+    
     # Try to load sample candidates if database is empty
     try:
         from .database import get_candidates_collection
@@ -62,10 +85,27 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"⚠️  Could not check candidate count: {e}")
     
+    # Exposure control: load shared item exposure counts and flush ours periodically
+    from .services.exposure import start_exposure_flusher, stop_exposure_flusher
+    try:
+        await start_exposure_flusher()
+    except Exception as e:
+        print(f"⚠️  Could not load item exposure counts: {e}")
+    
     print("🚀 VGP Platform started")
     yield
     # Shutdown
+    try:
+        await stop_exposure_flusher()
+    except Exception as e:
+        print(f"⚠️  Could not flush item exposure counts: {e}")
+    try:
+        await stop_percentile_flusher()
+    except Exception as e:
+        print(f"⚠️  Could not snapshot percentile sketches: {e}")
     await MongoDB.close_db()
+    # R-LOG-01: Persist every buffered trace event before exiting
+    shutdown_trace_logger()
     print("👋 VGP Platform shutdown")
 
 
@@ -35,6 +35,15 @@ class TrackSelection(BaseModel):
     level: Optional[str] = "core"
 
 
+class AdaptiveStats(BaseModel):
+    averageScore: float
+    discrimination: float
+    difficultyEstimate: float
+    attempts: int
+    # IRT lower asymptote; None means 1/len(options) for MCQ and 0 otherwise
+    guessing: Optional[float] = None
+
+
 class QuestionMetadata(BaseModel):
     questionId: str
     trackId: SkillTrack
@@ -47,13 +56,8 @@ class QuestionMetadata(BaseModel):
     referenceSolution: Optional[str] = None
     answerKey: Optional[str] = None
     timeLimitSeconds: int = 300
-
-
-class AdaptiveStats(BaseModel):
-    averageScore: float
-    discrimination: float
-    difficultyEstimate: float
-    attempts: int
+    # Calibrated IRT parameters; band defaults are used until an item is calibrated
+    adaptiveStats: Optional[AdaptiveStats] = None
 
 
 class CandidateResponse(BaseModel):
@@ -76,6 +80,11 @@ class TestSession(BaseModel):
     responses: List[CandidateResponse] = Field(default_factory=list)
     startedAt: str
     expiresAt: str
+    # Incremented by every state transition; writes are conditional on it (optimistic concurrency)
+    version: int = 0
+    # Running EAP ability estimate and its standard error (CAT engine)
+    theta: float = 0.0
+    thetaSE: float = 1.0
 
 
 class ScoreBreakdown(BaseModel):
@@ -93,6 +102,9 @@ class CandidateScoreReport(BaseModel):
     strengths: List[str] = Field(default_factory=list)  # R-REP-01: Required in all reports
     weaknesses: List[str] = Field(default_factory=list)  # R-REP-01: Required in all reports
     completedAt: str
+    # Session the report was scored from; re-scoring never lets an older session overwrite a newer one
+    sessionId: Optional[str] = None
+    sessionStartedAt: Optional[str] = None
 
 
 class JobRequirement(BaseModel):
@@ -120,6 +132,8 @@ class EligibleCandidate(BaseModel):
 class EligibleCandidateList(BaseModel):
     jobId: str
     eligibleCandidates: List[EligibleCandidate]
+    total: Optional[int] = None
+    nextCursor: Optional[str] = None
 
 
 class RoleMatch(BaseModel):
@@ -56,6 +56,7 @@ def format_user_error(message: str, technical_detail: str = "") -> str:
         "question not found": "The question could not be loaded. Please try again.",
         "unauthorized": "You don't have permission to access this information.",
         "timeout": "Your code took too long to run. Please optimize your solution.",
+        "session conflict": "This step of your test was already completed, possibly in another tab. Please reload to continue.",
     }
     
     message_lower = message.lower()
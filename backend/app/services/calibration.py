@@ -0,0 +1,256 @@
+"""
+Item Calibration - offline IRT parameter estimation
+Fits each item's discrimination (a) and difficulty (b) from historical test sessions
+by marginal maximum likelihood with EM over the CAT engine's quadrature grid
+(Bock-Aitkin), keeping the guessing floor (c) fixed. Memory is bounded: sessions are
+streamed in batches and reduced to per-item expected counts (items x grid), which are
+also the checkpoint that lets later runs add only new sessions.
+"""
+
+import os
+from datetime import datetime, timedelta, timezone
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+
+import numpy as np
+from pymongo import UpdateOne
+
+from ..database import (
+    get_calibration_state_collection,
+    get_calibration_stats_collection,
+    get_item_bank_collection,
+    get_test_sessions_collection,
+)
+from ..models.domain import CandidateResponse
+from ..utils.time import utc_now_iso
+from ..utils.trace_logger import log_event
+from .cat_engine import D, PRIOR, THETA_GRID, item_parameters, probability
+from .item_bank import ItemBankSnapshot, publish_item_bank, refresh_item_bank
+from .test_engine import evaluate_immediate
+
+CALIBRATION_BATCH_SIZE = int(os.getenv("CALIBRATION_BATCH_SIZE", "1000"))
+CALIBRATION_EM_ITERATIONS = int(os.getenv("CALIBRATION_EM_ITERATIONS", "25"))
+CALIBRATION_TOLERANCE = 1e-3
+# Items need this many responses before fitted parameters replace the band defaults
+CALIBRATION_MIN_ATTEMPTS = int(os.getenv("CALIBRATION_MIN_ATTEMPTS", "30"))
+# Sessions younger than this may still receive responses, so they wait for a later run
+CALIBRATION_SETTLE_MINUTES = int(os.getenv("CALIBRATION_SETTLE_MINUTES", "120"))
+CHECKPOINT_NAME = "irt"
+
+# Bounds and weak priors that keep sparse items from diverging (a ~ lognormal, b ~ N(0, 2))
+A_BOUNDS = (0.2, 4.0)
+B_BOUNDS = (-4.0, 4.0)
+LOG_A_PRIOR_SD = 0.5
+B_PRIOR_SD = 2.0
+
+
+class ItemParameters:
+    """Current a, b, c for every item in the bank, aligned by row"""
+
+    def __init__(self, snapshot: ItemBankSnapshot):
+        self.question_ids = list(snapshot.by_id)
+        self.index = {qid: i for i, qid in enumerate(self.question_ids)}
+        params = np.array([item_parameters(snapshot.by_id[qid]) for qid in self.question_ids]).reshape(-1, 3)
+        self.a, self.b, self.c = params[:, 0].copy(), params[:, 1].copy(), params[:, 2].copy()
+
+    def log_likelihood_rows(self) -> Tuple[np.ndarray, np.ndarray]:
+        """items x grid log P(correct) and log P(incorrect)"""
+        p = probability(THETA_GRID[None, :], self.a[:, None], self.b[:, None], self.c[:, None])
+        return np.log(p), np.log1p(-p)
+
+
+class SufficientStats:
+    """Expected examinee counts (n) and expected correct counts (r) per item and grid point"""
+
+    def __init__(self, size: int):
+        self.n = np.zeros((size, len(THETA_GRID)))
+        self.r = np.zeros((size, len(THETA_GRID)))
+        self.sessions = 0
+
+    def accumulate(self, params: ItemParameters, batch: List[List[Tuple[str, bool]]]) -> None:
+        """E-step for one batch of sessions: posterior over theta per session, spread onto its items"""
+        rows, sessions, correct = [], [], []
+        for s, outcomes in enumerate(batch):
+            for question_id, is_correct in outcomes:
+                if question_id in params.index:
+                    rows.append(params.index[question_id])
+                    sessions.append(s)
+                    correct.append(is_correct)
+        if not rows:
+            return
+        rows, sessions, correct = np.array(rows), np.array(sessions), np.array(correct, dtype=bool)
+
+        log_p, log_q = params.log_likelihood_rows()
+        log_posterior = np.tile(np.log(PRIOR), (len(batch), 1))
+        np.add.at(log_posterior, sessions, np.where(correct[:, None], log_p[rows], log_q[rows]))
+        posterior = np.exp(log_posterior - log_posterior.max(axis=1, keepdims=True))
+        posterior /= posterior.sum(axis=1, keepdims=True)
+
+        np.add.at(self.n, rows, posterior[sessions])
+        np.add.at(self.r, rows, posterior[sessions] * correct[:, None])
+        self.sessions += len(batch)
+
+
+def maximize(params: ItemParameters, stats: SufficientStats, steps: int = 20) -> None:
+    """
+    M-step: Fisher scoring on (log a, b) for all items at once, c held fixed.
+    Items without data keep their current values.
+    """
+    theta = THETA_GRID[None, :]
+    has_data = stats.n.sum(axis=1) > 0
+    c = params.c[:, None]
+    for _ in range(steps):
+        a, b = params.a[:, None], params.b[:, None]
+        p_star = 1.0 / (1.0 + np.exp(-D * a * (theta - b)))
+        p = np.clip(c + (1.0 - c) * p_star, 1e-9, 1 - 1e-9)
+        dp_dz = (1.0 - c) * p_star * (1.0 - p_star)
+        residual = (stats.r - stats.n * p) * dp_dz / (p * (1.0 - p))
+        weight = stats.n * dp_dz ** 2 / (p * (1.0 - p))
+        # Derivatives of z = D a (theta - b) with respect to log a and b
+        dz_dloga = D * a * (theta - b)
+        dz_db = -D * a
+
+        log_a = np.log(params.a)
+        grad = np.stack([
+            (residual * dz_dloga).sum(axis=1) - (log_a / LOG_A_PRIOR_SD ** 2),
+            (residual * dz_db).sum(axis=1) - (params.b / B_PRIOR_SD ** 2),
+        ], axis=1)
+        info_aa = (weight * dz_dloga ** 2).sum(axis=1) + 1 / LOG_A_PRIOR_SD ** 2
+        info_bb = (weight * dz_db ** 2).sum(axis=1) + 1 / B_PRIOR_SD ** 2
+        info_ab = (weight * dz_dloga * dz_db).sum(axis=1)
+        det = info_aa * info_bb - info_ab ** 2
+        step_loga = (info_bb * grad[:, 0] - info_ab * grad[:, 1]) / det
+        step_b = (info_aa * grad[:, 1] - info_ab * grad[:, 0]) / det
+        # Damp large steps; a Fisher-scoring step on a sparse item can overshoot
+        step_loga = np.clip(step_loga, -0.5, 0.5)
+        step_b = np.clip(step_b, -1.0, 1.0)
+
+        params.a = np.where(has_data, np.clip(np.exp(log_a + step_loga), *A_BOUNDS), params.a)
+        params.b = np.where(has_data, np.clip(params.b + step_b, *B_BOUNDS), params.b)
+        if np.max(np.abs(np.where(has_data, step_b, 0))) < 1e-6:
+            break
+
+
+async def _session_batches(query: Dict, snapshot: ItemBankSnapshot) -> AsyncIterator[List[List[Tuple[str, bool]]]]:
+    """Stream sessions matching query as batches of (questionId, correct) lists"""
+    batch: List[List[Tuple[str, bool]]] = []
+    async for doc in get_test_sessions_collection().find(query):
+        outcomes = []
+        for raw in doc.get("responses", []):
+            question = snapshot.by_id.get(raw.get("questionId"))
+            if question:
+                # Stored responses were validated on the way in
+                outcomes.append((question.questionId, evaluate_immediate(question, CandidateResponse.model_construct(**raw))))
+        if outcomes:
+            batch.append(outcomes)
+        if len(batch) >= CALIBRATION_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+async def _load_checkpoint(params: ItemParameters) -> Tuple[Optional[str], SufficientStats]:
+    stats = SufficientStats(len(params.question_ids))
+    state = await get_calibration_state_collection().find_one({"name": CHECKPOINT_NAME})
+    if not state:
+        return None, stats
+    async for doc in get_calibration_stats_collection().find({}):
+        row = params.index.get(doc["questionId"])
+        if row is not None:
+            stats.n[row] = doc["n"]
+            stats.r[row] = doc["r"]
+    stats.sessions = state.get("sessions", 0)
+    return state["watermark"], stats
+
+
+async def _save_checkpoint(params: ItemParameters, stats: SufficientStats, watermark: str) -> None:
+    operations = [
+        UpdateOne(
+            {"questionId": qid},
+            {"$set": {"questionId": qid, "n": stats.n[i].tolist(), "r": stats.r[i].tolist()}},
+            upsert=True,
+        )
+        for i, qid in enumerate(params.question_ids)
+        if stats.n[i].any()
+    ]
+    if operations:
+        await get_calibration_stats_collection().bulk_write(operations, ordered=False)
+    await get_calibration_state_collection().update_one(
+        {"name": CHECKPOINT_NAME},
+        {"$set": {"watermark": watermark, "sessions": stats.sessions, "updatedAt": utc_now_iso()}},
+        upsert=True,
+    )
+
+
+async def _write_parameters(params: ItemParameters, stats: SufficientStats) -> int:
+    """Bulk-write fitted adaptiveStats for items with enough responses"""
+    attempts = stats.n.sum(axis=1)
+    correct = stats.r.sum(axis=1)
+    operations = [
+        UpdateOne({"questionId": qid}, {"$set": {"adaptiveStats": {
+            "averageScore": round(float(correct[i] / attempts[i]), 4),
+            "discrimination": round(float(params.a[i]), 4),
+            "difficultyEstimate": round(float(params.b[i]), 4),
+            "guessing": round(float(params.c[i]), 4),
+            "attempts": int(round(attempts[i])),
+        }}})
+        for i, qid in enumerate(params.question_ids)
+        if attempts[i] >= CALIBRATION_MIN_ATTEMPTS
+    ]
+    if operations:
+        await get_item_bank_collection().bulk_write(operations, ordered=False)
+    return len(operations)
+
+
+async def calibrate_items(full: bool = False) -> Dict:
+    """
+    Calibrate the item bank from settled test sessions and write adaptiveStats back.
+    full=True refits from every session with EM to convergence (one streamed pass per
+    iteration). Otherwise only sessions since the checkpoint are read: their expected
+    counts, under the current parameters, are added to the checkpointed counts and one
+    M-step refits the affected items.
+    """
+    snapshot = await refresh_item_bank()
+    params = ItemParameters(snapshot)
+    cutoff = (datetime.now(timezone.utc) - timedelta(minutes=CALIBRATION_SETTLE_MINUTES)).isoformat()
+    watermark, stats = (None, None) if full else await _load_checkpoint(params)
+    # Without a checkpoint there is nothing to add to, so start with a full fit
+    full = full or watermark is None
+
+    if full:
+        await get_calibration_stats_collection().delete_many({})
+        query: Dict = {"startedAt": {"$lte": cutoff}}
+        iterations = 0
+        for iterations in range(1, CALIBRATION_EM_ITERATIONS + 1):
+            stats = SufficientStats(len(params.question_ids))
+            async for batch in _session_batches(query, snapshot):
+                stats.accumulate(params, batch)
+            previous = np.concatenate([params.a, params.b])
+            maximize(params, stats)
+            if np.max(np.abs(np.concatenate([params.a, params.b]) - previous), initial=0) < CALIBRATION_TOLERANCE:
+                break
+        new_sessions = stats.sessions
+    else:
+        query = {"startedAt": {"$gt": watermark, "$lte": cutoff}}
+        before = stats.sessions
+        async for batch in _session_batches(query, snapshot):
+            stats.accumulate(params, batch)
+        new_sessions = stats.sessions - before
+        iterations = 1
+        if new_sessions:
+            maximize(params, stats)
+
+    await _save_checkpoint(params, stats, cutoff)
+    calibrated = await _write_parameters(params, stats) if new_sessions else 0
+    if calibrated:
+        await publish_item_bank()
+
+    summary = {
+        "mode": "full" if full else "incremental",
+        "sessionsRead": new_sessions,
+        "emIterations": iterations,
+        "itemsCalibrated": calibrated,
+        "watermark": cutoff,
+    }
+    log_event("item_bank.calibrated", "calibration", {k: str(v) for k, v in summary.items()})
+    return summary
@@ -13,6 +13,8 @@ from ..database import get_candidates_collection, get_test_sessions_collection
 from ..utils.ids import new_id
 from ..utils.time import minutes_from_now_iso, utc_now_iso
 from ..utils.trace_logger import log_event
+from .eligibility_index import on_consent_granted
+from .test_engine import cache_session
 
 
 TEST_DURATION_MINUTES = 30
@@ -66,7 +68,7 @@ async def select_track(candidate_id: str, track: SkillTrack) -> TestSession:
         collection = get_candidates_collection()
         await collection.update_one(
             {"id": candidate_id},
-            {"$set": {"selectedTracks": [t.value for t in candidate.selectedTracks]}}
+            {"$addToSet": {"selectedTracks": track.value}}
         )
     
     # Create test session
@@ -82,6 +84,7 @@ async def select_track(candidate_id: str, track: SkillTrack) -> TestSession:
     
     sessions_collection = get_test_sessions_collection()
     await sessions_collection.insert_one(session.model_dump())
+    cache_session(session)
     
     log_event(
         "session.created",
@@ -105,6 +108,7 @@ async def share_with_employer(candidate_id: str, employer_id: str) -> Candidate:
             {"id": candidate_id},
             {"$addToSet": {"sharedEmployers": employer_id}}
         )
+        await on_consent_granted(candidate_id, employer_id)
         
         log_event(
             "candidate.share",
@@ -0,0 +1,164 @@
+"""
+CAT Engine - IRT-based computerized adaptive testing
+Maintains an EAP ability estimate (theta) on a fixed quadrature grid under the
+3PL model (2PL when an item has no guessing floor) and picks the unasked item
+with high Fisher information at the current estimate, drawn at random from the
+top CAT_RANDOMESQUE_K (randomesque exposure control) and skipping items whose
+exposure rate is over the cap while others remain.
+R-ETH-01: Estimates and item selection depend only on the candidate's responses
+(and the session's own random seed and per-item exposure counts)
+"""
+
+import os
+import random
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from ..models.domain import DifficultyBand, QuestionMetadata, SkillTrack
+from .item_bank import get_questions_for_track, get_snapshot
+
+# Quadrature grid for theta and its standard normal prior
+THETA_GRID = np.linspace(-4.0, 4.0, 81)
+PRIOR = np.exp(-0.5 * THETA_GRID ** 2)
+PRIOR /= PRIOR.sum()
+# Logistic scaling constant that makes the logistic curve approximate the normal ogive
+D = 1.7
+
+# Default item parameters until an item is calibrated (adaptiveStats)
+DEFAULT_DISCRIMINATION = 1.0
+BAND_DIFFICULTY = {DifficultyBand.easy: -1.0, DifficultyBand.medium: 0.0, DifficultyBand.hard: 1.0}
+
+# Stop once the estimate is this precise (and enough items were given), or at the item cap
+CAT_TARGET_SE = float(os.getenv("CAT_TARGET_SE", "0.3"))
+CAT_MIN_ITEMS = int(os.getenv("CAT_MIN_ITEMS", "3"))
+CAT_MAX_ITEMS = int(os.getenv("CAT_MAX_ITEMS", "20"))
+# Pick uniformly among this many most informative items, so candidates at the same
+# estimate do not all see the same item
+CAT_RANDOMESQUE_K = int(os.getenv("CAT_RANDOMESQUE_K", "5"))
+
+
+def item_parameters(question: QuestionMetadata) -> Tuple[float, float, float]:
+    """(a, b, c): calibrated values from adaptiveStats, else defaults from the difficulty band"""
+    stats = question.adaptiveStats
+    a = stats.discrimination if stats else DEFAULT_DISCRIMINATION
+    b = stats.difficultyEstimate if stats else BAND_DIFFICULTY[question.difficulty]
+    if stats and stats.guessing is not None:
+        c = stats.guessing
+    elif question.questionType == "mcq" and question.options:
+        c = 1.0 / max(len(question.options), 2)
+    else:
+        c = 0.0
+    return a, b, c
+
+
+def probability(theta: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """P(correct) under 3PL; broadcasts items (rows) against theta (columns)"""
+    return c + (1.0 - c) / (1.0 + np.exp(-D * a * (theta - b)))
+
+
+def information(theta: np.ndarray, a: np.ndarray, b: np.ndarray, c: np.ndarray) -> np.ndarray:
+    """Fisher information of 3PL items at theta"""
+    p = probability(theta, a, b, c)
+    return (D * a) ** 2 * ((1.0 - p) / p) * ((p - c) / (1.0 - c)) ** 2
+
+
+class ItemPool:
+    """
+    One track's items with their parameters and a precomputed items x grid table of
+    response probabilities and Fisher information. Built once per item bank snapshot.
+    """
+
+    def __init__(self, questions: List[QuestionMetadata], version: int):
+        self.version = version
+        self.questions = questions
+        self.index: Dict[str, int] = {q.questionId: i for i, q in enumerate(questions)}
+        params = np.array([item_parameters(q) for q in questions]).reshape(-1, 3)
+        self.a, self.b, self.c = (params[:, i:i + 1] for i in range(3))
+        self.p_correct = probability(THETA_GRID[None, :], self.a, self.b, self.c)
+        self.info = information(THETA_GRID[None, :], self.a, self.b, self.c)
+        # Items by decreasing information at each grid point, so a pick walks a
+        # presorted column instead of sorting the pool
+        self.order = np.argsort(-self.info, axis=0, kind="stable")
+        # Log-likelihood rows for a correct / incorrect answer, summed during estimation
+        self.log_p = np.log(self.p_correct)
+        self.log_q = np.log1p(-self.p_correct)
+
+
+_pools: Dict[SkillTrack, ItemPool] = {}
+
+
+async def get_pool(track: SkillTrack) -> ItemPool:
+    """Item pool for a track, rebuilt whenever the item bank snapshot changes"""
+    snapshot = await get_snapshot()
+    pool = _pools.get(track)
+    if pool is None or pool.version != snapshot.version:
+        pool = ItemPool(await get_questions_for_track(track), snapshot.version)
+        _pools[track] = pool
+    return pool
+
+
+def grid_index(theta: float) -> int:
+    """Nearest quadrature point to theta"""
+    return int(np.abs(THETA_GRID - theta).argmin())
+
+
+def estimate(pool: ItemPool, outcomes: Sequence[Tuple[str, bool]]) -> Tuple[float, float]:
+    """EAP estimate and posterior SD of theta from (questionId, correct) pairs"""
+    log_posterior = np.log(PRIOR)
+    for question_id, correct in outcomes:
+        row = pool.index.get(question_id)
+        if row is not None:
+            log_posterior = log_posterior + (pool.log_p[row] if correct else pool.log_q[row])
+    posterior = np.exp(log_posterior - log_posterior.max())
+    posterior /= posterior.sum()
+    theta = float(posterior @ THETA_GRID)
+    se = float(np.sqrt(posterior @ (THETA_GRID - theta) ** 2))
+    return theta, se
+
+
+def select_item(
+    pool: ItemPool,
+    theta: float,
+    asked: Sequence[str],
+    rng: Optional[random.Random] = None,
+    over_exposed: Optional[Callable[[str], bool]] = None,
+) -> Optional[QuestionMetadata]:
+    """
+    Unasked item at theta, or None if the pool is exhausted.
+    Without rng this is the maximum-information item. With rng it is drawn from the
+    CAT_RANDOMESQUE_K most informative items that are not over_exposed; if every
+    remaining item is over-exposed the most informative one is used anyway.
+    Walks the presorted column, so a pick costs O(k + items skipped), not a sort.
+    """
+    asked_set = set(asked)
+    k = CAT_RANDOMESQUE_K if rng is not None else 1
+    candidates: List[QuestionMetadata] = []
+    fallback: Optional[QuestionMetadata] = None
+    for row in pool.order[:, grid_index(theta)]:
+        question = pool.questions[row]
+        if question.questionId in asked_set:
+            continue
+        if over_exposed is not None and over_exposed(question.questionId):
+            fallback = fallback or question
+            continue
+        candidates.append(question)
+        if len(candidates) == k:
+            break
+    if not candidates:
+        return fallback
+    return rng.choice(candidates) if rng is not None else candidates[0]
+
+
+def should_stop(items_given: int, se: float) -> bool:
+    """Stopping rule: target precision reached after the minimum length, or the maximum length"""
+    return items_given >= CAT_MAX_ITEMS or (items_given >= CAT_MIN_ITEMS and se <= CAT_TARGET_SE)
+
+
+def band_for_theta(theta: float) -> DifficultyBand:
+    """Coarse difficulty band shown to the candidate, derived from the ability estimate"""
+    if theta < -0.5:
+        return DifficultyBand.easy
+    if theta > 0.5:
+        return DifficultyBand.hard
+    return DifficultyBand.medium
@@ -0,0 +1,169 @@
+"""
+Job Eligibility Index - MongoDB Implementation
+Materialized per-job list of eligible candidates, updated incrementally
+R-PRIV-01: Rows only exist for candidates who have shared with the job's employer
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+from pymongo import ASCENDING, DESCENDING, UpdateOne
+from pymongo.errors import BulkWriteError
+
+from ..models.domain import JobRequirement, SkillTrack
+from ..rules import check_privacy_consent
+from ..database import get_candidates_collection, get_job_eligibility_collection, get_jobs_collection
+from ..utils.time import utc_now_iso
+from ..utils.trace_logger import log_event
+from .matcher import score_job, score_jobs
+from .scoring_service import get_track_scores
+
+DUPLICATE_KEY = 11000
+
+
+def _row(job: JobRequirement, candidate_id: str, name: str, track_scores: Dict[SkillTrack, int], score: int) -> Dict:
+    """Build the index document for one eligible (job, candidate) pair"""
+    return {
+        "jobId": job.jobId,
+        "employerId": job.employerId,
+        "candidateId": candidate_id,
+        "name": name,
+        "trackScores": {track.value: track_scores[track] for track in job.requiredTracks},
+        "matchScore": score,
+        "updatedAt": utc_now_iso(),
+    }
+
+
+async def rebuild_job(job: JobRequirement) -> int:
+    """
+    Recompute the full index for one job.
+    Used when a job is created or its tracks/thresholds change. Rows are upserted in
+    place and only then are rows outside the new set deleted, so readers never see the
+    job's list empty mid-rebuild.
+    """
+    names: Dict[str, str] = {}
+    async for doc in get_candidates_collection().find({"sharedEmployers": job.employerId}):
+        if check_privacy_consent(doc["id"], job.employerId, doc.get("sharedEmployers", [])):
+            names[doc["id"]] = doc["profile"]["name"]
+
+    candidate_ids = list(names)
+    scores_by_candidate = await get_track_scores(candidate_ids, [t.value for t in job.requiredTracks])
+    track_scores = [scores_by_candidate.get(candidate_id, {}) for candidate_id in candidate_ids]
+    eligible, match = score_job(job, track_scores)
+    rows = [
+        _row(job, candidate_ids[i], names[candidate_ids[i]], track_scores[i], int(match[i]))
+        for i in eligible.nonzero()[0]
+    ]
+
+    collection = get_job_eligibility_collection()
+    if rows:
+        operations = [
+            UpdateOne({"jobId": job.jobId, "candidateId": row["candidateId"]}, {"$set": row}, upsert=True)
+            for row in rows
+        ]
+        try:
+            await collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # A concurrent _refresh_candidate upserted the same (jobId, candidateId) first;
+            # its row is at least as fresh as ours
+            if any(error.get("code") != DUPLICATE_KEY for error in e.details.get("writeErrors", [])):
+                raise
+    await collection.delete_many({"jobId": job.jobId, "candidateId": {"$nin": [row["candidateId"] for row in rows]}})
+
+    await get_jobs_collection().update_one(
+        {"jobId": job.jobId},
+        {"$set": {"eligibilityIndexedAt": utc_now_iso()}}
+    )
+    log_event("job.eligibility_rebuilt", job.employerId, {"jobId": job.jobId, "eligibleCount": str(len(rows))})
+    return len(rows)
+
+
+async def _refresh_candidate(candidate_id: str, job_query: Dict) -> None:
+    """Re-evaluate one candidate against every job matching job_query"""
+    candidate = await get_candidates_collection().find_one({"id": candidate_id})
+    if not candidate:
+        return
+    shared = candidate.get("sharedEmployers", [])
+
+    jobs = []
+    async for doc in get_jobs_collection().find({"employerId": {"$in": shared}, **job_query}):
+        doc.pop('_id', None)
+        jobs.append(JobRequirement(**doc))
+    if not jobs:
+        return
+
+    tracks = {track.value for job in jobs for track in job.requiredTracks}
+    track_scores = (await get_track_scores([candidate_id], sorted(tracks))).get(candidate_id, {})
+
+    eligible, match = score_jobs(jobs, track_scores)
+
+    collection = get_job_eligibility_collection()
+    for i, job in enumerate(jobs):
+        key = {"jobId": job.jobId, "candidateId": candidate_id}
+        if eligible[i] and check_privacy_consent(candidate_id, job.employerId, shared):
+            row = _row(job, candidate_id, candidate["profile"]["name"], track_scores, int(match[i]))
+            await collection.update_one(key, {"$set": row}, upsert=True)
+        else:
+            await collection.delete_one(key)
+
+
+async def on_report_upserted(candidate_id: str, track: Optional[SkillTrack] = None) -> None:
+    """A score report changed: refresh the candidate's rows for jobs requiring that track"""
+    await _refresh_candidate(candidate_id, {"requiredTracks": track.value} if track else {})
+
+
+async def on_consent_granted(candidate_id: str, employer_id: str) -> None:
+    """A candidate shared with an employer: evaluate them against that employer's jobs"""
+    await _refresh_candidate(candidate_id, {"employerId": employer_id})
+
+
+def _job_query(job_id: str, min_match_score: int) -> Dict:
+    query: Dict = {"jobId": job_id}
+    if min_match_score > 0:
+        query["matchScore"] = {"$gte": min_match_score}
+    return query
+
+
+async def page_job(
+    job_id: str,
+    limit: int,
+    min_match_score: int = 0,
+    after: Optional[Tuple[int, str]] = None,
+) -> List[Dict]:
+    """
+    Up to limit of a job's index rows with matchScore >= min_match_score, ordered
+    (matchScore desc, candidateId asc), starting after the (matchScore, candidateId)
+    row after. A keyset query: the (jobId, matchScore desc, candidateId) index serves
+    it in order, so a page costs O(limit) whatever its depth.
+    """
+    query = _job_query(job_id, min_match_score)
+    if after is not None:
+        score, candidate_id = after
+        query["$or"] = [
+            {"matchScore": {"$lt": score}},
+            {"matchScore": score, "candidateId": {"$gt": candidate_id}},
+        ]
+    cursor = get_job_eligibility_collection().find(query).sort(
+        [("matchScore", DESCENDING), ("candidateId", ASCENDING)]
+    ).limit(limit)
+    rows = []
+    async for doc in cursor:
+        doc.pop('_id', None)
+        rows.append(doc)
+    return rows
+
+
+async def candidate_rows(candidate_id: str) -> List[Dict]:
+    """A candidate's index rows across every job, best match first (served in order by the candidateId index)"""
+    cursor = get_job_eligibility_collection().find({"candidateId": candidate_id}).sort(
+        [("matchScore", DESCENDING), ("jobId", ASCENDING)]
+    )
+    rows = []
+    async for doc in cursor:
+        doc.pop('_id', None)
+        rows.append(doc)
+    return rows
+
+
+async def count_job(job_id: str, min_match_score: int = 0) -> int:
+    """Number of a job's index rows with matchScore >= min_match_score"""
+    return await get_job_eligibility_collection().count_documents(_job_query(job_id, min_match_score))
@@ -4,18 +4,41 @@ R-PRIV-01: Privacy-compliant candidate filtering
 R-LOG-01: All operations logged
 """
 
-from typing import List
+import base64
+import json
+from typing import Dict, Iterable, Optional, Tuple
 from fastapi import HTTPException, status
 
 from ..models.domain import (
     Candidate, EligibleCandidate, EligibleCandidateList, 
     Employer, JobRequirement, RoleMatch, RoleMatchList, SkillTrack
 )
-from ..rules import check_privacy_consent
 from ..database import get_employers_collection, get_jobs_collection, get_candidates_collection
+from ..utils.cache import TTLCache
 from ..utils.ids import new_id
 from ..utils.trace_logger import log_event
-from .scoring_service import get_report
+from .eligibility_index import candidate_rows, count_job, page_job, rebuild_job
+from .matcher import explain
+
+DEFAULT_PAGE_SIZE = 50
+
+# employer id -> name projection; invalidated on employer writes, TTL bounds cross-worker staleness
+EMPLOYER_NAME_CACHE = TTLCache(max_size=10_000, ttl_seconds=300)
+
+
+def _encode_cursor(match_score: int, candidate_id: str) -> str:
+    """Opaque token marking the last row of a page"""
+    raw = json.dumps([match_score, candidate_id]).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> Tuple[int, str]:
+    try:
+        match_score, candidate_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return int(match_score), str(candidate_id)
+    except (ValueError, TypeError):
+        # R-UX-01: Clear, non-technical error message
+        raise HTTPException(status_code=400, detail="Invalid page cursor. Please reload the candidate list.")
 
 
 async def _ensure_employer(employer_id: str) -> Employer:
@@ -28,6 +51,24 @@ async def _ensure_employer(employer_id: str) -> Employer:
     return Employer(**doc)
 
 
+async def _employer_names(employer_ids: Iterable[str]) -> Dict[str, str]:
+    """Resolve employer names from the cache, loading any misses with one query"""
+    names: Dict[str, str] = {}
+    missing = []
+    for employer_id in set(employer_ids):
+        name = EMPLOYER_NAME_CACHE.get(employer_id)
+        if name is None:
+            missing.append(employer_id)
+        else:
+            names[employer_id] = name
+    if missing:
+        collection = get_employers_collection()
+        async for doc in collection.find({"id": {"$in": missing}}):
+            names[doc["id"]] = doc["name"]
+            EMPLOYER_NAME_CACHE.set(doc["id"], doc["name"])
+    return names
+
+
 async def create_employer(name: str) -> Employer:
     """Create a new employer"""
     employer_id = new_id("emp")
@@ -35,6 +76,7 @@ async def create_employer(name: str) -> Employer:
     
     collection = get_employers_collection()
     await collection.insert_one(employer.model_dump())
+    EMPLOYER_NAME_CACHE.invalidate(employer_id)
     
     log_event("employer.created", employer_id, {"name": name})
     return employer
@@ -59,17 +101,31 @@ async def upsert_job(employer_id: str, requirement: JobRequirement) -> JobRequir
         {"id": employer_id},
         {"$addToSet": {"jobs": requirement.model_dump()}}
     )
+    EMPLOYER_NAME_CACHE.invalidate(employer_id)
     
     log_event("job.upserted", employer_id, {"jobId": requirement.jobId})
+    
+    # Thresholds or tracks may have changed: rematerialize this job's eligibility
+    await rebuild_job(requirement)
     return requirement
 
 
-async def eligible_candidates(employer_id: str, job_id: str) -> EligibleCandidateList:
+async def eligible_candidates(
+    employer_id: str,
+    job_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    min_match_score: int = 0,
+    cursor: Optional[str] = None,
+) -> EligibleCandidateList:
     """
-    Get eligible candidates for a job
+    Get one page of eligible candidates for a job, best match first
     R-PRIV-01: Only returns candidates who have explicitly shared
+    
+    Ordering is (matchScore desc, candidateId asc). Pages are keyset queries on the
+    materialized index, so each costs O(limit) however deep it is. total is only
+    counted for the first page (no cursor); later pages return None.
     """
-    employer = await _ensure_employer(employer_id)
+    await _ensure_employer(employer_id)
     
     jobs_collection = get_jobs_collection()
     job_doc = await jobs_collection.find_one({"jobId": job_id})
@@ -80,75 +136,39 @@ async def eligible_candidates(employer_id: str, job_id: str) -> EligibleCandidat
     job_doc.pop('_id', None)
     job = JobRequirement(**job_doc)
     
-    eligible: List[EligibleCandidate] = []
-    
-    # Get all candidates who have shared with this employer
-    candidates_collection = get_candidates_collection()
-    cursor = candidates_collection.find({"sharedEmployers": employer_id})
-    
-    async for doc in cursor:
-        doc.pop('_id', None)
-        candidate = Candidate(**doc)
-        
-        # R-PRIV-01: Double-check privacy consent
-        if not check_privacy_consent(candidate.id, employer_id, candidate.sharedEmployers):
-            continue
-        
-        if not await _meets_requirements(candidate, job):
-            continue
-        
-        track_scores: dict[SkillTrack, int] = {}
-        for track in job.requiredTracks:
-            report = await get_report(candidate.id, track.value)
-            if not report:
-                break
-            track_scores[track] = report.overallScore
-        else:
-            match_score, explanation = _match_score(job, track_scores)
-            eligible.append(
-                EligibleCandidate(
-                    candidateId=candidate.id,
-                    name=candidate.profile.name,
-                    trackScores=track_scores,
-                    matchScore=match_score,
-                    matchExplanation=explanation,
-                )
+    # Jobs created before the index existed are materialized on first read
+    if not job_doc.get("eligibilityIndexedAt"):
+        await rebuild_job(job)
+    
+    after = _decode_cursor(cursor) if cursor else None
+    
+    # One row past the page tells whether another page follows
+    rows = await page_job(job_id, limit + 1, min_match_score, after)
+    page = rows[:limit]
+    next_cursor = None
+    if len(rows) > limit:
+        next_cursor = _encode_cursor(page[-1]["matchScore"], page[-1]["candidateId"])
+    total = await count_job(job_id, min_match_score) if after is None else None
+    
+    eligible = []
+    for row in page:
+        track_scores = {SkillTrack(track): score for track, score in row["trackScores"].items()}
+        eligible.append(
+            EligibleCandidate(
+                candidateId=row["candidateId"],
+                name=row["name"],
+                trackScores=track_scores,
+                matchScore=row["matchScore"],
+                matchExplanation=explain(job, track_scores),
             )
+        )
     
     log_event("job.filter_run", employer_id, {"jobId": job_id, "resultCount": str(len(eligible))})
-    return EligibleCandidateList(jobId=job_id, eligibleCandidates=eligible)
-
-
-async def _meets_requirements(candidate: Candidate, job: JobRequirement) -> bool:
-    """Check if candidate meets job requirements"""
-    for track in job.requiredTracks:
-        report = await get_report(candidate.id, track.value)
-        if not report:
-            return False
-        threshold = job.minScores.get(track)
-        if threshold is None or report.overallScore < threshold:
-            return False
-    return True
-
-
-def _match_score(job: JobRequirement, track_scores: dict[SkillTrack, int]) -> tuple[int, str]:
-    """Calculate match score and explanation"""
-    scores = []
-    components = []
-    for track in job.requiredTracks:
-        candidate_score = track_scores[track]
-        threshold = job.minScores.get(track, 1)
-        ratio = candidate_score / max(threshold, 1)
-        score_component = min(int(ratio * 100), 120)
-        scores.append(score_component)
-        components.append(f"{track.value}: {candidate_score}/{threshold}")
-    avg = int(sum(scores) / len(scores)) if scores else 0
-    explanation = "; ".join(components)
-    return min(avg, 100), explanation
+    return EligibleCandidateList(jobId=job_id, eligibleCandidates=eligible, total=total, nextCursor=next_cursor)
 
 
 async def candidate_matches(candidate_id: str) -> RoleMatchList:
-    """Get recommended jobs for a candidate"""
+    """Get recommended jobs for a candidate, best match first, read from the job eligibility index"""
     candidates_collection = get_candidates_collection()
     candidate_doc = await candidates_collection.find_one({"id": candidate_id})
     
@@ -158,30 +178,21 @@ async def candidate_matches(candidate_id: str) -> RoleMatchList:
     candidate_doc.pop('_id', None)
     candidate = Candidate(**candidate_doc)
     
-    matches: List[RoleMatch] = []
-    
-    # Get jobs from employers candidate has shared with
+    # Jobs created before the index existed are materialized on first read
     jobs_collection = get_jobs_collection()
-    cursor = jobs_collection.find({"employerId": {"$in": candidate.sharedEmployers}})
-    
-    async for job_doc in cursor:
+    async for job_doc in jobs_collection.find({
+        "employerId": {"$in": candidate.sharedEmployers}, "eligibilityIndexedAt": None
+    }):
         job_doc.pop('_id', None)
-        job = JobRequirement(**job_doc)
-        
-        if not await _meets_requirements(candidate, job):
-            continue
-        
-        track_scores: dict[SkillTrack, int] = {}
-        for track in job.requiredTracks:
-            report = await get_report(candidate.id, track.value)
-            if not report:
-                break
-            track_scores[track] = report.overallScore
-        else:
-            match_score, _ = _match_score(job, track_scores)
-            employer = await _ensure_employer(job.employerId)
-            matches.append(
-                RoleMatch(jobId=job.jobId, company=employer.name, matchScore=match_score)
-            )
+        await rebuild_job(JobRequirement(**job_doc))
+    
+    # R-PRIV-01: index rows only exist for jobs of employers the candidate shared with
+    rows = await candidate_rows(candidate.id)
+    names = await _employer_names(row["employerId"] for row in rows)
+    matches = []
+    for row in rows:
+        if row["employerId"] not in names:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Employer not found")
+        matches.append(RoleMatch(jobId=row["jobId"], company=names[row["employerId"]], matchScore=row["matchScore"]))
     
     return RoleMatchList(candidateId=candidate_id, recommendedJobs=matches)
@@ -0,0 +1,125 @@
+"""
+Item Exposure - per-item administration counters for exposure control
+Counts are kept in process memory on the selection hot path (R-PERF-01) and
+periodically flushed to the item_exposure collection with $inc, so every worker
+adds to the same totals and picks up the others' on each flush.
+R-ETH-01: Counters are per item only; nothing about the candidate is recorded
+"""
+
+import asyncio
+import os
+import sys
+from typing import Dict, Optional
+
+from pymongo import UpdateOne
+
+from ..database import get_item_exposure_collection
+from ..models.domain import SkillTrack
+
+EXPOSURE_FLUSH_SECONDS = float(os.getenv("EXPOSURE_FLUSH_SECONDS", "30"))
+# Items given to more than this share of a track's sessions are skipped while others remain
+CAT_MAX_EXPOSURE_RATE = float(os.getenv("CAT_MAX_EXPOSURE_RATE", "0.25"))
+# Rates are too noisy to act on until a track has this many sessions
+EXPOSURE_MIN_SESSIONS = int(os.getenv("EXPOSURE_MIN_SESSIONS", "20"))
+
+
+class ExposureCounter:
+    """
+    Administrations per item, plus first-item administrations, whose sum per track is
+    the track's session count. Totals include increments not yet flushed.
+    """
+
+    def __init__(self) -> None:
+        self.exposures: Dict[str, int] = {}
+        self.sessions: Dict[SkillTrack, int] = {}
+        self._pending: Dict[str, Dict] = {}
+
+    def record(self, track: SkillTrack, question_id: str, first: bool) -> None:
+        """Count one administration of question_id; first marks the opening item of a session"""
+        self.exposures[question_id] = self.exposures.get(question_id, 0) + 1
+        pending = self._pending.setdefault(question_id, {"trackId": track, "exposures": 0, "firstExposures": 0})
+        pending["exposures"] += 1
+        if first:
+            self.sessions[track] = self.sessions.get(track, 0) + 1
+            pending["firstExposures"] += 1
+
+    def over_exposed(self, track: SkillTrack, question_id: str) -> bool:
+        """True once the item's exposure rate in the track exceeds CAT_MAX_EXPOSURE_RATE"""
+        sessions = self.sessions.get(track, 0)
+        if sessions < EXPOSURE_MIN_SESSIONS:
+            return False
+        return self.exposures.get(question_id, 0) > CAT_MAX_EXPOSURE_RATE * sessions
+
+    async def flush(self) -> int:
+        """$inc pending counts into item_exposure, then reload the shared totals"""
+        pending, self._pending = self._pending, {}
+        collection = get_item_exposure_collection()
+        if pending:
+            operations = [
+                UpdateOne(
+                    {"questionId": question_id},
+                    {
+                        "$set": {"trackId": counts["trackId"]},
+                        "$inc": {"exposures": counts["exposures"], "firstExposures": counts["firstExposures"]},
+                    },
+                    upsert=True,
+                )
+                for question_id, counts in pending.items()
+            ]
+            try:
+                await collection.bulk_write(operations, ordered=False)
+            except Exception:
+                # Keep the counts for the next flush
+                for question_id, counts in pending.items():
+                    merged = self._pending.setdefault(question_id, {"trackId": counts["trackId"], "exposures": 0, "firstExposures": 0})
+                    merged["exposures"] += counts["exposures"]
+                    merged["firstExposures"] += counts["firstExposures"]
+                raise
+        await self.load()
+        return len(pending)
+
+    async def load(self) -> None:
+        """Replace totals with the stored counts plus anything recorded since the last flush"""
+        exposures: Dict[str, int] = {}
+        sessions: Dict[SkillTrack, int] = {}
+        async for doc in get_item_exposure_collection().find({}):
+            exposures[doc["questionId"]] = doc.get("exposures", 0)
+            sessions[doc["trackId"]] = sessions.get(doc["trackId"], 0) + doc.get("firstExposures", 0)
+        for question_id, counts in self._pending.items():
+            exposures[question_id] = exposures.get(question_id, 0) + counts["exposures"]
+            sessions[counts["trackId"]] = sessions.get(counts["trackId"], 0) + counts["firstExposures"]
+        self.exposures, self.sessions = exposures, sessions
+
+
+EXPOSURE = ExposureCounter()
+_flusher: Optional[asyncio.Task] = None
+
+
+async def _flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(EXPOSURE_FLUSH_SECONDS)
+        try:
+            await EXPOSURE.flush()
+        except Exception as e:
+            print(f"⚠️  Could not flush item exposure counts: {e}", file=sys.stderr)
+
+
+async def start_exposure_flusher() -> None:
+    """Load stored totals and start the background flush task"""
+    global _flusher
+    await EXPOSURE.load()
+    if _flusher is None:
+        _flusher = asyncio.create_task(_flush_periodically())
+
+
+async def stop_exposure_flusher() -> None:
+    """Stop the background task and write out the remaining counts"""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        try:
+            await _flusher
+        except asyncio.CancelledError:
+            pass
+        _flusher = None
+    await EXPOSURE.flush()
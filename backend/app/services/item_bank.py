@@ -1,33 +1,140 @@
 """
 Item Bank Service - MongoDB Implementation
-Retrieves questions from MongoDB
+Retrieves questions from a process-resident snapshot of the item bank
+R-PERF-01: Question lookups on the test hot path never touch the database
 """
 
-from typing import List, Optional
+import os
+import time
+from typing import Dict, List, Optional, Tuple
+from pymongo import ReturnDocument
 from ..models.domain import DifficultyBand, QuestionMetadata, SkillTrack
-from ..database import get_item_bank_collection
+from ..database import get_item_bank_collection, get_item_bank_state_collection
 
+# How often a worker checks the shared item-bank version for writes made elsewhere
+ITEM_BANK_VERSION_CHECK_SECONDS = float(os.getenv("ITEM_BANK_VERSION_CHECK_SECONDS", "10"))
+VERSION_NAME = "item_bank"
 
-async def get_questions_for_track(track: SkillTrack, band: Optional[DifficultyBand] = None) -> List[QuestionMetadata]:
-    """Get questions for a specific track and optional difficulty band"""
+
+class ItemBankSnapshot:
+    """Immutable, indexed view of the item bank at a given version"""
+
+    def __init__(self, questions: List[QuestionMetadata], version: int):
+        self.version = version
+        self.by_id: Dict[str, QuestionMetadata] = {}
+        self.by_track_band: Dict[Tuple[SkillTrack, DifficultyBand], List[QuestionMetadata]] = {}
+        for question in questions:
+            self.by_id[question.questionId] = question
+            self.by_track_band.setdefault((question.trackId, question.difficulty), []).append(question)
+
+
+_snapshot: Optional[ItemBankSnapshot] = None
+_checked_at = 0.0
+
+
+async def _stored_version() -> int:
+    """Item-bank version shared by every worker and script (0 before the first write)"""
+    state = await get_item_bank_state_collection().find_one({"name": VERSION_NAME}, {"version": 1})
+    return state["version"] if state else 0
+
+
+async def bump_item_bank_version() -> int:
+    """
+    Record a write to the item bank so every worker reloads its snapshot.
+    Called by anything that writes questions: load-questions, the scraper and calibration.
+    """
+    state = await get_item_bank_state_collection().find_one_and_update(
+        {"name": VERSION_NAME},
+        {"$inc": {"version": 1}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER,
+    )
+    return state["version"]
+
+
+async def refresh_item_bank() -> ItemBankSnapshot:
+    """
+    Reload the item bank from MongoDB and atomically swap in a new snapshot.
+    The version is read before the documents, so a write that lands mid-load
+    leaves the snapshot stale and the next version check reloads it.
+    """
+    global _snapshot, _checked_at
+    _checked_at = time.monotonic()
+    version = await _stored_version()
     collection = get_item_bank_collection()
-    query = {"trackId": track.value}
-    if band:
-        query["difficulty"] = band.value
-    
-    cursor = collection.find(query)
     questions = []
-    async for doc in cursor:
+    async for doc in collection.find({}):
         doc.pop('_id', None)
         questions.append(QuestionMetadata(**doc))
+    _snapshot = ItemBankSnapshot(questions, version)
+    return _snapshot
+
+
+async def publish_item_bank() -> ItemBankSnapshot:
+    """Bump the shared version after a write and reload this worker's snapshot"""
+    await bump_item_bank_version()
+    return await refresh_item_bank()
+
+
+async def get_snapshot() -> ItemBankSnapshot:
+    """
+    Current snapshot, loaded on first use if startup did not load it.
+    At most once every ITEM_BANK_VERSION_CHECK_SECONDS the shared version is
+    compared and the snapshot reloaded if another process wrote to the bank.
+    """
+    global _checked_at
+    if _snapshot is None:
+        return await refresh_item_bank()
+    now = time.monotonic()
+    if now - _checked_at >= ITEM_BANK_VERSION_CHECK_SECONDS:
+        _checked_at = now
+        if await _stored_version() != _snapshot.version:
+            return await refresh_item_bank()
+    return _snapshot
+
+
+def snapshot_version() -> int:
+    """Shared item-bank version of the loaded snapshot (0 if not loaded or never written)"""
+    return _snapshot.version if _snapshot else 0
+
+
+async def get_questions_for_track(track: SkillTrack, band: Optional[DifficultyBand] = None) -> List[QuestionMetadata]:
+    """Get questions for a specific track and optional difficulty band"""
+    snapshot = await get_snapshot()
+    if band:
+        return list(snapshot.by_track_band.get((track, band), []))
+    questions = []
+    for b in DifficultyBand:
+        questions.extend(snapshot.by_track_band.get((track, b), []))
     return questions
 
 
 async def get_question(question_id: str) -> Optional[QuestionMetadata]:
     """Get a specific question by ID"""
+    snapshot = await get_snapshot()
+    question = snapshot.by_id.get(question_id)
+    if question:
+        return question
+    # Miss: the item may have been written by another worker since our snapshot
     collection = get_item_bank_collection()
-    doc = await collection.find_one({"questionId": question_id})
-    if not doc:
+    if not await collection.find_one({"questionId": question_id}):
         return None
-    doc.pop('_id', None)
-    return QuestionMetadata(**doc)
+    snapshot = await refresh_item_bank()
+    return snapshot.by_id.get(question_id)
+
+
+async def get_questions(question_ids: List[str]) -> Dict[str, QuestionMetadata]:
+    """
+    Resolve many questions at once, keyed by questionId.
+    Served from the snapshot; any misses are fetched with a single $in query.
+    """
+    snapshot = await get_snapshot()
+    found = {qid: snapshot.by_id[qid] for qid in question_ids if qid in snapshot.by_id}
+    missing = [qid for qid in dict.fromkeys(question_ids) if qid not in found]
+    if missing:
+        collection = get_item_bank_collection()
+        async for doc in collection.find({"questionId": {"$in": missing}}):
+            doc.pop('_id', None)
+            question = QuestionMetadata(**doc)
+            found[question.questionId] = question
+    return found
@@ -202,6 +202,7 @@ class LeetCodeScraper:
         Returns: Number of problems successfully stored
         """
         from ..database import get_item_bank_collection
+        from .item_bank import publish_item_bank
         
         problems = self.get_all_problems()[:limit]
         stored_count = 0
@@ -242,5 +243,9 @@ class LeetCodeScraper:
                     "error": str(e)
                 })
         
+        # Publish new items to every worker's item bank snapshot
+        if stored_count:
+            await publish_item_bank()
+        
         return stored_count
 
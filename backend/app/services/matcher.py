@@ -0,0 +1,84 @@
+"""
+Job Matcher - vectorized eligibility and match scoring
+Packs candidate track scores and job thresholds into dense arrays so one job
+can be scored against many candidates (or one candidate against many jobs)
+with array operations instead of per-row Python loops.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from ..models.domain import JobRequirement, SkillTrack
+
+TRACKS: List[SkillTrack] = list(SkillTrack)
+TRACK_INDEX: Dict[SkillTrack, int] = {track: i for i, track in enumerate(TRACKS)}
+
+# A component is the candidate/threshold ratio in percent, capped per track and overall
+COMPONENT_CAP = 120
+MATCH_CAP = 100
+
+
+def pack_scores(track_scores: Sequence[Dict[SkillTrack, int]]) -> np.ndarray:
+    """candidates x tracks matrix of overall scores; NaN where a report is missing"""
+    matrix = np.full((len(track_scores), len(TRACKS)), np.nan)
+    for row, scores in enumerate(track_scores):
+        for track, score in scores.items():
+            matrix[row, TRACK_INDEX[track]] = score
+    return matrix
+
+
+def pack_jobs(jobs: Sequence[JobRequirement]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    jobs x tracks threshold matrix and required-track mask.
+    A required track without a threshold gets NaN, which no score can meet.
+    """
+    thresholds = np.full((len(jobs), len(TRACKS)), np.nan)
+    required = np.zeros((len(jobs), len(TRACKS)), dtype=bool)
+    for row, job in enumerate(jobs):
+        for track in job.requiredTracks:
+            required[row, TRACK_INDEX[track]] = True
+            if track in job.minScores:
+                thresholds[row, TRACK_INDEX[track]] = job.minScores[track]
+    return thresholds, required
+
+
+def match_matrix(scores: np.ndarray, thresholds: np.ndarray, required: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score every candidate against every job.
+    Returns (eligible, match), both candidates x jobs; match is 0 where not eligible.
+    """
+    s = scores[:, None, :]
+    t = thresholds[None, :, :]
+    r = required[None, :, :]
+    with np.errstate(invalid="ignore"):
+        # NaN (missing report or threshold) fails the comparison, as it should
+        eligible = np.all(~r | (s >= t), axis=2)
+        components = np.minimum(np.floor(s / np.maximum(t, 1) * 100), COMPONENT_CAP)
+    components = np.where(r, components, 0)
+    counts = r.sum(axis=2)
+    averages = np.floor(components.sum(axis=2) / np.maximum(counts, 1))
+    match = np.where(eligible & (counts > 0), np.minimum(averages, MATCH_CAP), 0)
+    return eligible, match.astype(int)
+
+
+def score_job(job: JobRequirement, track_scores: Sequence[Dict[SkillTrack, int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """One job against many candidates: (eligible, match) vectors aligned with track_scores"""
+    thresholds, required = pack_jobs([job])
+    eligible, match = match_matrix(pack_scores(track_scores), thresholds, required)
+    return eligible[:, 0], match[:, 0]
+
+
+def score_jobs(jobs: Sequence[JobRequirement], track_scores: Dict[SkillTrack, int]) -> Tuple[np.ndarray, np.ndarray]:
+    """One candidate against many jobs: (eligible, match) vectors aligned with jobs"""
+    thresholds, required = pack_jobs(jobs)
+    eligible, match = match_matrix(pack_scores([track_scores]), thresholds, required)
+    return eligible[0], match[0]
+
+
+def explain(job: JobRequirement, track_scores: Dict[SkillTrack, int]) -> str:
+    """Human-readable threshold comparison; only built for rows actually returned"""
+    return "; ".join(
+        f"{track.value}: {track_scores[track]}/{job.minScores.get(track, 1)}"
+        for track in job.requiredTracks
+    )
@@ -0,0 +1,204 @@
+"""
+Percentile Engine - per-track score distributions from stored reports
+R-SCOR-01: Percentiles rank a score against everyone who has taken the track.
+Overall scores are integers 0-100, so each track keeps an exact histogram (a
+mergeable sketch with no approximation error) in a Fenwick tree: recording a score
+and ranking one are both O(log 101). Counts are updated in memory whenever a report
+is stored and periodically snapshotted to percentile_sketches with $inc, so every
+worker adds to the same totals and picks up the others' on each flush.
+"""
+
+import asyncio
+import bisect
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from pymongo import UpdateOne
+
+from ..database import get_percentile_sketches_collection, get_score_reports_collection
+from ..models.domain import SkillTrack
+
+MAX_SCORE = 100
+PERCENTILE_FLUSH_SECONDS = float(os.getenv("PERCENTILE_FLUSH_SECONDS", "30"))
+# Below this many reports in a track, the static table is more meaningful than the data
+PERCENTILE_MIN_POPULATION = int(os.getenv("PERCENTILE_MIN_POPULATION", "30"))
+
+PERCENTILES_PATH = Path(__file__).resolve().parents[1] / "data" / "percentiles.json"
+PERCENTILE_TABLE = {int(k): v for k, v in json.loads(PERCENTILES_PATH.read_text(encoding="utf-8")).items()}
+_TABLE_SCORES = sorted(PERCENTILE_TABLE)
+
+
+def static_percentile(score: int) -> int:
+    """Percentile from the static lookup table (50 below its lowest score)"""
+    position = bisect.bisect_right(_TABLE_SCORES, score)
+    return PERCENTILE_TABLE[_TABLE_SCORES[position - 1]] if position else 50
+
+
+class FenwickTree:
+    """Prefix sums over a fixed number of bins with O(log n) update and query"""
+
+    def __init__(self, size: int) -> None:
+        self.tree = [0] * (size + 1)
+
+    def add(self, index: int, delta: int) -> None:
+        index += 1
+        while index < len(self.tree):
+            self.tree[index] += delta
+            index += index & -index
+
+    def prefix(self, index: int) -> int:
+        """Sum of bins [0, index)"""
+        total = 0
+        while index > 0:
+            total += self.tree[index]
+            index -= index & -index
+        return total
+
+
+class ScoreDistribution:
+    """Exact histogram of one track's overall scores"""
+
+    def __init__(self) -> None:
+        self.counts = FenwickTree(MAX_SCORE + 1)
+        self.total = 0
+
+    def add(self, score: int, delta: int = 1) -> None:
+        self.counts.add(_clamp(score), delta)
+        self.total += delta
+
+    def percentile(self, score: int) -> int:
+        """Mid-rank percentile: share of scores below, counting ties as half"""
+        score = _clamp(score)
+        below = self.counts.prefix(score)
+        equal = self.counts.prefix(score + 1) - below
+        return int(round(100 * (below + 0.5 * equal) / self.total))
+
+
+def _clamp(score: int) -> int:
+    return max(0, min(MAX_SCORE, int(score)))
+
+
+class PercentileEngine:
+    """Live score distributions per track plus the deltas not yet snapshotted"""
+
+    def __init__(self) -> None:
+        self.distributions: Dict[SkillTrack, ScoreDistribution] = {}
+        self._pending: Dict[Tuple[str, int], int] = {}
+
+    def record(self, track: SkillTrack, score: int, previous: Optional[int] = None) -> None:
+        """Count a stored report's score; previous is the score it replaced, if any"""
+        self._add(track, score, 1)
+        if previous is not None:
+            self._add(track, previous, -1)
+
+    def discard(self, track: SkillTrack, score: int, previous: Optional[int] = None) -> None:
+        """Undo record(track, score, previous) for a report that was not stored after all"""
+        self._add(track, score, -1)
+        if previous is not None:
+            self._add(track, previous, 1)
+
+    def _add(self, track: SkillTrack, score: int, delta: int) -> None:
+        self.distributions.setdefault(SkillTrack(track), ScoreDistribution()).add(score, delta)
+        key = (SkillTrack(track).value, _clamp(score))
+        self._pending[key] = self._pending.get(key, 0) + delta
+
+    def percentile(self, track: SkillTrack, score: int) -> int:
+        """R-SCOR-01: Percentile of score within the track, or the static table for small populations"""
+        distribution = self.distributions.get(SkillTrack(track))
+        if distribution is None or distribution.total < PERCENTILE_MIN_POPULATION:
+            return static_percentile(score)
+        return distribution.percentile(score)
+
+    async def flush(self) -> int:
+        """$inc pending deltas into percentile_sketches, then reload the shared totals"""
+        pending, self._pending = self._pending, {}
+        pending = {key: delta for key, delta in pending.items() if delta}
+        if pending:
+            operations = [
+                UpdateOne({"trackId": track, "score": score}, {"$inc": {"count": delta}}, upsert=True)
+                for (track, score), delta in pending.items()
+            ]
+            try:
+                await get_percentile_sketches_collection().bulk_write(operations, ordered=False)
+            except Exception:
+                # Keep the deltas for the next flush
+                for key, delta in pending.items():
+                    self._pending[key] = self._pending.get(key, 0) + delta
+                raise
+        await self.load()
+        return len(pending)
+
+    async def load(self) -> None:
+        """Replace the distributions with the snapshot plus anything recorded since the last flush"""
+        counts: Dict[Tuple[str, int], int] = {}
+        async for doc in get_percentile_sketches_collection().find({}):
+            counts[(doc["trackId"], doc["score"])] = doc.get("count", 0)
+        for key, delta in self._pending.items():
+            counts[key] = counts.get(key, 0) + delta
+        self.distributions = _distributions(counts)
+
+    async def rebuild(self) -> int:
+        """Recount every stored report and overwrite the snapshot; returns the number of reports"""
+        counts: Dict[Tuple[str, int], int] = {}
+        async for doc in get_score_reports_collection().find({}):
+            key = (doc["trackId"], _clamp(doc["overallScore"]))
+            counts[key] = counts.get(key, 0) + 1
+        collection = get_percentile_sketches_collection()
+        await collection.delete_many({})
+        if counts:
+            # $set, not $inc, so workers rebuilding at the same time agree
+            await collection.bulk_write([
+                UpdateOne({"trackId": track, "score": score}, {"$set": {"count": count}}, upsert=True)
+                for (track, score), count in counts.items()
+            ], ordered=False)
+        self._pending = {}
+        self.distributions = _distributions(counts)
+        return sum(counts.values())
+
+
+def _distributions(counts: Dict[Tuple[str, int], int]) -> Dict[SkillTrack, ScoreDistribution]:
+    distributions: Dict[SkillTrack, ScoreDistribution] = {}
+    for (track, score), count in counts.items():
+        if count:
+            distributions.setdefault(SkillTrack(track), ScoreDistribution()).add(score, count)
+    return distributions
+
+
+PERCENTILES = PercentileEngine()
+_flusher: Optional[asyncio.Task] = None
+
+
+async def _flush_periodically() -> None:
+    while True:
+        await asyncio.sleep(PERCENTILE_FLUSH_SECONDS)
+        try:
+            await PERCENTILES.flush()
+        except Exception as e:
+            print(f"⚠️  Could not snapshot percentile sketches: {e}", file=sys.stderr)
+
+
+async def start_percentile_flusher() -> None:
+    """Load the snapshot (built from score_reports on first run) and start the background flush task"""
+    global _flusher
+    if await get_percentile_sketches_collection().count_documents({}) == 0:
+        await PERCENTILES.rebuild()
+    else:
+        await PERCENTILES.load()
+    if _flusher is None:
+        _flusher = asyncio.create_task(_flush_periodically())
+
+
+async def stop_percentile_flusher() -> None:
+    """Stop the background task and write out the remaining deltas"""
+    global _flusher
+    if _flusher is not None:
+        _flusher.cancel()
+        try:
+            await _flusher
+        except asyncio.CancelledError:
+            pass
+        _flusher = None
+    await PERCENTILES.flush()
@@ -0,0 +1,258 @@
+"""
+Bulk Re-scoring - regenerate score reports after scoring rules change
+Streams submitted sessions in sessionId order, scores each batch against the
+in-process item bank snapshot with the same build_report used by live submits, and
+writes changed reports with one bulk_write per batch. Progress is checkpointed after
+every batch so an interrupted run resumes where it stopped. Percentiles are then
+recomputed against the rebuilt score distribution. The admin API starts runs in the
+background (start_rescore) and reports their status by job id.
+R-SCOR-01: Every report is regenerated by the current standardized scoring rules
+R-LOG-01: Re-scoring runs are logged
+"""
+
+import asyncio
+import os
+from typing import AsyncIterator, Dict, List, Optional, Set, Tuple
+
+from pymongo import ASCENDING, UpdateOne
+
+from ..database import (
+    get_jobs_collection,
+    get_rescore_state_collection,
+    get_score_reports_collection,
+    get_test_sessions_collection,
+)
+from ..models.domain import CandidateScoreReport, JobRequirement, SkillTrack, TestSession
+from ..utils.ids import new_id
+from ..utils.time import utc_now_iso
+from ..utils.trace_logger import log_event
+from .item_bank import ItemBankSnapshot, refresh_item_bank
+from .percentiles import PERCENTILES
+from .scoring_service import build_report
+
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", "1000"))
+# Dry runs return at most this many per-report diffs alongside the counts
+DIFF_SAMPLE_SIZE = 20
+CHECKPOINT_NAME = "rescore"
+
+# Runs started by start_rescore in this worker, by job id
+_runs: Dict[str, asyncio.Task] = {}
+SCORED_FIELDS = {"overallScore", "subscores", "strengths", "weaknesses"}
+
+
+async def _session_batches(after: Optional[str]) -> AsyncIterator[List[TestSession]]:
+    """Stream submitted sessions with sessionId > after, in sessionId order"""
+    query: Dict = {"status": "submitted"}
+    if after:
+        query["sessionId"] = {"$gt": after}
+    batch: List[TestSession] = []
+    async for doc in get_test_sessions_collection().find(query).sort("sessionId", ASCENDING):
+        doc.pop('_id', None)
+        batch.append(TestSession(**doc))
+        if len(batch) >= RESCORE_BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _diff(existing: Dict, report: CandidateScoreReport) -> Dict:
+    """{field: [stored, rescored]} for every scored field that changed"""
+    rescored = report.model_dump(include=SCORED_FIELDS)
+    return {
+        field: [existing.get(field), rescored[field]]
+        for field in sorted(SCORED_FIELDS)
+        if existing.get(field) != rescored[field]
+    }
+
+
+async def _rescore_batch(sessions: List[TestSession], snapshot: ItemBankSnapshot) -> Tuple[List[UpdateOne], List[Dict], int]:
+    """Rescore one batch: returns the report updates, the per-report diffs and the count of sessions without a report"""
+    # The newest session per candidate and track is the one its report reflects. It is
+    # picked across every submitted session, not just this batch, so each report is
+    # rescored once: by the batch that holds its newest session
+    candidate_ids = list({session.candidateId for session in sessions})
+    newest: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    cursor = get_test_sessions_collection().find(
+        {"status": "submitted", "candidateId": {"$in": candidate_ids}},
+        {"_id": 0, "candidateId": 1, "trackId": 1, "startedAt": 1, "sessionId": 1},
+    )
+    async for doc in cursor:
+        pair = (doc["candidateId"], SkillTrack(doc["trackId"]).value)
+        rank = (doc["startedAt"], doc["sessionId"])
+        if pair not in newest or rank > newest[pair]:
+            newest[pair] = rank
+    latest: Dict[Tuple[str, str], TestSession] = {
+        (session.candidateId, session.trackId.value): session
+        for session in sessions
+        if newest.get((session.candidateId, session.trackId.value)) == (session.startedAt, session.sessionId)
+    }
+
+    existing: Dict[Tuple[str, str], Dict] = {}
+    cursor = get_score_reports_collection().find({"candidateId": {"$in": list({c for c, _ in latest})}})
+    async for doc in cursor:
+        existing[(doc["candidateId"], doc["trackId"])] = doc
+
+    operations: List[UpdateOne] = []
+    diffs: List[Dict] = []
+    missing = 0
+    for pair, session in latest.items():
+        doc = existing.get(pair)
+        if doc is None:
+            # Reports are regenerated, never invented; a missing one is counted and left alone
+            missing += 1
+            continue
+        stored_started = doc.get("sessionStartedAt")
+        if stored_started and stored_started > session.startedAt:
+            # The report already reflects a newer session
+            continue
+        # Percentiles are recomputed for every report once all scores are rewritten
+        report = build_report(session, snapshot.by_id, lambda _: doc["percentile"], doc["completedAt"])
+        changes = _diff(doc, report)
+        if changes:
+            diffs.append({"candidateId": pair[0], "trackId": pair[1], "sessionId": session.sessionId, "changes": changes})
+        elif doc.get("sessionId") == session.sessionId:
+            continue
+        operations.append(UpdateOne(
+            # Conditional on the report still being the one we read, so a concurrent submit wins
+            {"candidateId": pair[0], "trackId": pair[1], "sessionStartedAt": stored_started},
+            {"$set": report.model_dump(include=SCORED_FIELDS | {"sessionId", "sessionStartedAt"})},
+        ))
+    return operations, diffs, missing
+
+
+async def _update_percentiles() -> int:
+    """Rebuild the score distributions from the rewritten reports and restamp changed percentiles"""
+    await PERCENTILES.rebuild()
+    collection = get_score_reports_collection()
+    updated = 0
+    operations: List[UpdateOne] = []
+    async for doc in collection.find({}):
+        percentile = PERCENTILES.percentile(doc["trackId"], doc["overallScore"])
+        if percentile != doc.get("percentile"):
+            operations.append(UpdateOne(
+                {"candidateId": doc["candidateId"], "trackId": doc["trackId"]},
+                {"$set": {"percentile": percentile}},
+            ))
+        if len(operations) >= RESCORE_BATCH_SIZE:
+            updated += (await collection.bulk_write(operations, ordered=False)).modified_count
+            operations = []
+    if operations:
+        updated += (await collection.bulk_write(operations, ordered=False)).modified_count
+    return updated
+
+
+async def _rebuild_eligibility() -> None:
+    """Scores changed across many candidates at once, so rebuild each job's index instead of per-candidate refreshes"""
+    from .eligibility_index import rebuild_job
+    async for doc in get_jobs_collection().find({}):
+        doc.pop('_id', None)
+        await rebuild_job(JobRequirement(**doc))
+
+
+async def rescore_reports(dry_run: bool = False, restart: bool = False) -> Dict:
+    """
+    Regenerate score reports from submitted sessions with the current scoring rules.
+    dry_run computes and returns the diffs without writing anything. Otherwise a run
+    resumes from the last checkpoint unless restart is set or the previous run finished.
+    """
+    snapshot = await refresh_item_bank()
+    state_collection = get_rescore_state_collection()
+    state = None if dry_run or restart else await state_collection.find_one({"name": CHECKPOINT_NAME})
+    if state and state.get("phase") == "done":
+        state = None
+    progress = {
+        "sessionsRead": state.get("sessionsRead", 0) if state else 0,
+        "reportsChanged": state.get("reportsChanged", 0) if state else 0,
+        "reportsMissing": state.get("reportsMissing", 0) if state else 0,
+    }
+    resumed_from = state.get("lastSessionId") if state else None
+    diffs: List[Dict] = []
+    changed_candidates: Set[str] = set()
+
+    if not state or state.get("phase") == "reports":
+        async for batch in _session_batches(resumed_from):
+            operations, batch_diffs, missing = await _rescore_batch(batch, snapshot)
+            progress["sessionsRead"] += len(batch)
+            progress["reportsChanged"] += len(batch_diffs)
+            progress["reportsMissing"] += missing
+            if dry_run:
+                diffs.extend(batch_diffs[:DIFF_SAMPLE_SIZE - len(diffs)])
+                continue
+            if operations:
+                await get_score_reports_collection().bulk_write(operations, ordered=False)
+            changed_candidates.update(d["candidateId"] for d in batch_diffs if "overallScore" in d["changes"])
+            await state_collection.update_one(
+                {"name": CHECKPOINT_NAME},
+                {"$set": {"phase": "reports", "lastSessionId": batch[-1].sessionId, **progress, "updatedAt": utc_now_iso()}},
+                upsert=True,
+            )
+
+    summary: Dict = {"dryRun": dry_run, "resumedFrom": resumed_from, **progress}
+    if dry_run:
+        summary["diffs"] = diffs
+        return summary
+
+    await state_collection.update_one(
+        {"name": CHECKPOINT_NAME}, {"$set": {"phase": "percentiles", "updatedAt": utc_now_iso()}}, upsert=True
+    )
+    summary["percentilesUpdated"] = await _update_percentiles()
+    # A resumed run cannot tell which candidates earlier batches changed, so it rebuilds too
+    if changed_candidates or resumed_from:
+        await _rebuild_eligibility()
+    await state_collection.update_one(
+        {"name": CHECKPOINT_NAME}, {"$set": {"phase": "done", **progress, "updatedAt": utc_now_iso()}}, upsert=True
+    )
+    log_event("reports.rescored", "rescoring", {k: str(v) for k, v in summary.items()})
+    return summary
+
+
+def running_rescore() -> Optional[str]:
+    """Job id of the background run in progress in this worker, if any"""
+    return next(iter(_runs), None)
+
+
+async def start_rescore(dry_run: bool = False, restart: bool = False) -> str:
+    """
+    Run rescore_reports as a background task and return its job id at once.
+    The job's status and, when it finishes, its summary are kept in rescore_state
+    under that id (see get_rescore_job).
+    """
+    job_id = new_id("rescore")
+    await get_rescore_state_collection().insert_one({
+        "name": job_id,
+        "status": "running",
+        "dryRun": dry_run,
+        "restart": restart,
+        "startedAt": utc_now_iso(),
+    })
+    task = asyncio.create_task(_run_job(job_id, dry_run, restart))
+    _runs[job_id] = task
+    task.add_done_callback(lambda _: _runs.pop(job_id, None))
+    return job_id
+
+
+async def _run_job(job_id: str, dry_run: bool, restart: bool) -> None:
+    collection = get_rescore_state_collection()
+    try:
+        summary = await rescore_reports(dry_run=dry_run, restart=restart)
+    except Exception as e:
+        # A real run left its checkpoint behind, so the next one resumes
+        await collection.update_one(
+            {"name": job_id}, {"$set": {"status": "failed", "error": str(e), "finishedAt": utc_now_iso()}}
+        )
+        log_event("reports.rescore_failed", "rescoring", {"jobId": job_id, "error": str(e)})
+        return
+    await collection.update_one(
+        {"name": job_id}, {"$set": {"status": "done", "summary": summary, "finishedAt": utc_now_iso()}}
+    )
+
+
+async def get_rescore_job(job_id: str) -> Optional[Dict]:
+    """Status of a run started by start_rescore, or None if the id is unknown"""
+    doc = await get_rescore_state_collection().find_one({"name": job_id})
+    if doc is None or doc["name"] == CHECKPOINT_NAME:
+        return None
+    doc.pop('_id', None)
+    doc["jobId"] = doc.pop("name")
+    return doc
@@ -5,24 +5,22 @@ R-REP-01: All reports include score, percentile, strengths, weaknesses
 R-LOG-01: All scoring events logged
 """
 
-import json
-from pathlib import Path
-from typing import Optional
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Tuple
 from fastapi import HTTPException
 
-from ..models.domain import CandidateScoreReport, ScoreBreakdown
-from ..database import get_score_reports_collection, get_test_sessions_collection
+from ..models.domain import CandidateResponse, CandidateScoreReport, QuestionMetadata, ScoreBreakdown, SkillTrack, TestSession
+from ..database import get_score_reports_collection
 from ..utils.time import utc_now_iso
 from ..utils.trace_logger import log_event
-from .item_bank import get_question
-from .test_engine import get_session
-
-PERCENTILES_PATH = Path(__file__).resolve().parents[1] / "data" / "percentiles.json"
-PERCENTILE_TABLE = json.loads(PERCENTILES_PATH.read_text(encoding="utf-8"))
+from .item_bank import get_questions
+from .percentiles import PERCENTILES
+from .test_engine import MAX_ATTEMPTS, get_session, session_conflict, transition_session
 
 SUBSKILLS = ["algorithms", "data_structures", "code_quality"]
 
 
+@lru_cache(maxsize=65536)
 def _coding_score(code: Optional[str]) -> int:
     """Simple heuristic scoring for code submissions"""
     if not code:
@@ -47,17 +45,14 @@ def _mcq_score(question, answer: Optional[str]) -> int:
     return 0
 
 
-def _percentile(score: int) -> int:
-    """R-SCOR-01: Convert raw score to percentile"""
-    sorted_scores = sorted(int(k) for k in PERCENTILE_TABLE.keys())
-    percentile = 50
-    for key in sorted_scores:
-        if score >= key:
-            percentile = PERCENTILE_TABLE[str(key)]
-    return percentile
+def _response_score(question: QuestionMetadata, response: CandidateResponse) -> int:
+    """Score a single response according to its question type"""
+    if question.questionType == "mcq":
+        return _mcq_score(question, response.answer)
+    return _coding_score(response.code)
 
 
-async def _calculate_strengths_weaknesses(session, breakdown: dict) -> tuple[list[str], list[str]]:
+def _calculate_strengths_weaknesses(scored: List[Tuple[QuestionMetadata, int]], breakdown: dict) -> tuple[list[str], list[str]]:
     """R-REP-01: Calculate strengths and weaknesses from performance data."""
     strengths = []
     weaknesses = []
@@ -83,11 +78,7 @@ async def _calculate_strengths_weaknesses(session, breakdown: dict) -> tuple[lis
     
     # Analyze question tags for more specific strengths/weaknesses
     tag_performance: dict[str, list[int]] = {}
-    for response in session.responses:
-        question = await get_question(response.questionId)
-        if not question:
-            continue
-        score = _mcq_score(question, response.answer) if question.questionType == "mcq" else _coding_score(response.code)
+    for question, score in scored:
         for tag in question.tags:
             tag_performance.setdefault(tag, []).append(score)
     
@@ -110,34 +101,26 @@ async def _calculate_strengths_weaknesses(session, breakdown: dict) -> tuple[lis
     return strengths, weaknesses
 
 
-async def finalize_session(session_id: str) -> CandidateScoreReport:
+def build_report(
+    session: TestSession,
+    questions: Dict[str, QuestionMetadata],
+    percentile_of: Callable[[int], int],
+    completed_at: str,
+) -> CandidateScoreReport:
     """
-    Finalize test session and generate score report
+    Score a session's responses into a report; no I/O, so live submits and bulk
+    re-scoring apply exactly the same rules
     R-SCOR-01: Standardized scoring algorithm
     R-REP-01: Report includes all required fields
     """
-    session = await get_session(session_id)
-    if session.status not in {"in_progress", "responses_complete"}:
-        raise HTTPException(status_code=400, detail="Session already finalized")
-    
-    # Update session status
-    sessions_collection = get_test_sessions_collection()
-    await sessions_collection.update_one(
-        {"sessionId": session_id},
-        {"$set": {"status": "submitted"}}
-    )
-    session.status = "submitted"
+    scored: List[Tuple[QuestionMetadata, int]] = []
+    for response in session.responses:
+        question = questions.get(response.questionId)
+        if question:
+            scored.append((question, _response_score(question, response)))
 
     subskill_scores: dict[str, list[int]] = {k: [] for k in SUBSKILLS}
-
-    for response in session.responses:
-        question = await get_question(response.questionId)
-        if not question:
-            continue
-        if question.questionType == "mcq":
-            score = _mcq_score(question, response.answer)
-        else:
-            score = _coding_score(response.code)
+    for question, score in scored:
         subskill_scores.setdefault(question.subskill, []).append(score)
 
     breakdown = {}
@@ -147,37 +130,94 @@ async def finalize_session(session_id: str) -> CandidateScoreReport:
 
     score_breakdown = ScoreBreakdown(**breakdown)
     overall = int(0.4 * score_breakdown.algorithms + 0.4 * score_breakdown.data_structures + 0.2 * score_breakdown.code_quality)
-    percentile = _percentile(overall)
 
     # R-REP-01: Calculate strengths and weaknesses based on performance
-    strengths, weaknesses = await _calculate_strengths_weaknesses(session, breakdown)
+    strengths, weaknesses = _calculate_strengths_weaknesses(scored, breakdown)
 
-    report = CandidateScoreReport(
+    return CandidateScoreReport(
         candidateId=session.candidateId,
         trackId=session.trackId,
         overallScore=overall,
         subscores=score_breakdown,
-        percentile=percentile,
+        percentile=percentile_of(overall),
         strengths=strengths,
         weaknesses=weaknesses,
-        completedAt=utc_now_iso(),
+        completedAt=completed_at,
+        sessionId=session.sessionId,
+        sessionStartedAt=session.startedAt,
     )
-    
-    # Store in MongoDB
+
+
+async def finalize_session(session_id: str) -> CandidateScoreReport:
+    """
+    Finalize test session and generate score report
+    R-SCOR-01: Standardized scoring algorithm
+    R-REP-01: Report includes all required fields
+    """
+    # Update session status; a concurrent submit of the same session loses here instead
+    # of producing a second report. A cached copy behind another worker's writes also
+    # loses, and the next attempt reads the session again.
+    updated = None
+    for _ in range(MAX_ATTEMPTS):
+        session = await get_session(session_id)
+        if session.status not in {"in_progress", "responses_complete"}:
+            raise HTTPException(status_code=400, detail="Session already finalized")
+        updated = await transition_session(
+            session,
+            {"status": {"$in": ["in_progress", "responses_complete"]}},
+            {"$set": {"status": "submitted"}},
+        )
+        if updated is not None:
+            break
+    if updated is None:
+        raise session_conflict()
+    session = updated
+
+    # Resolve every answered question in one item-bank read
+    questions = await get_questions([r.questionId for r in session.responses])
     reports_collection = get_score_reports_collection()
-    await reports_collection.update_one(
-        {"candidateId": session.candidateId, "trackId": session.trackId.value},
+    previous = await reports_collection.find_one(
+        {"candidateId": session.candidateId, "trackId": session.trackId.value}, {"_id": 0, "overallScore": 1}
+    )
+
+    def percentile_of(overall: int) -> int:
+        # R-SCOR-01: Rank against the live track population; a retake replaces the old score
+        PERCENTILES.record(session.trackId, overall, previous["overallScore"] if previous else None)
+        return PERCENTILES.percentile(session.trackId, overall)
+
+    report = build_report(session, questions, percentile_of, utc_now_iso())
+    
+    # Store in MongoDB, unless the stored report already reflects a newer session (a
+    # retake submitted first, or a rescore run) - the newest session always wins
+    key = {"candidateId": session.candidateId, "trackId": session.trackId.value}
+    replaced = await reports_collection.find_one_and_update(
+        {**key, "$or": [{"sessionStartedAt": None}, {"sessionStartedAt": {"$lte": session.startedAt}}]},
         {"$set": report.model_dump()},
-        upsert=True
+        projection={"_id": 1},
     )
+    stored = replaced is not None
+    if not stored:
+        # No report yet, or a newer one: only the first case inserts
+        newer = await reports_collection.find_one_and_update(
+            key, {"$setOnInsert": report.model_dump()}, projection={"_id": 1}, upsert=True
+        )
+        stored = newer is None
+    
+    if stored:
+        # Keep materialized job eligibility in step with the new score
+        from .eligibility_index import on_report_upserted
+        await on_report_upserted(session.candidateId, session.trackId)
+    else:
+        PERCENTILES.discard(session.trackId, report.overallScore, previous["overallScore"] if previous else None)
     
     log_event(
         "session.scored",
         session.candidateId,
         {
             "sessionId": session.sessionId,
-            "overall": str(overall),
-            "percentile": str(percentile),
+            "overall": str(report.overallScore),
+            "percentile": str(report.percentile),
+            "stored": str(stored).lower(),
         },
     )
     return report
@@ -193,3 +233,21 @@ async def get_report(candidate_id: str, track_id: str) -> Optional[CandidateScor
     
     doc.pop('_id', None)
     return CandidateScoreReport(**doc)
+
+
+async def get_track_scores(candidate_ids: List[str], track_ids: List[str]) -> Dict[str, Dict[SkillTrack, int]]:
+    """
+    Bulk-load overall scores for many candidates and tracks with a single query.
+    Returns {candidateId: {track: overallScore}}; candidates without reports are absent.
+    """
+    if not candidate_ids or not track_ids:
+        return {}
+    collection = get_score_reports_collection()
+    cursor = collection.find(
+        {"candidateId": {"$in": candidate_ids}, "trackId": {"$in": track_ids}},
+        {"_id": 0, "candidateId": 1, "trackId": 1, "overallScore": 1},
+    )
+    scores: Dict[str, Dict[SkillTrack, int]] = {}
+    async for doc in cursor:
+        scores.setdefault(doc["candidateId"], {})[SkillTrack(doc["trackId"])] = doc["overallScore"]
+    return scores
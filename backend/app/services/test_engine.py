@@ -8,22 +8,54 @@ R-LOG-01: All test events logged
 
 from __future__ import annotations
 
+import os
+import random
 from datetime import datetime, timezone
-from typing import Dict, Optional
+from typing import Dict, List, Optional, Tuple
 
 from fastapi import HTTPException, status
+from pymongo import ReturnDocument
 
-from ..models.domain import CandidateResponse, DifficultyBand, QuestionMetadata, TestSession
+from ..models.domain import CandidateResponse, QuestionMetadata, TestSession
 from ..rules import format_user_error
 from ..database import get_test_sessions_collection
+from ..utils.cache import TTLCache
 from ..utils.trace_logger import log_event
-from .item_bank import get_question, get_questions_for_track
+from . import cat_engine
+from .exposure import EXPOSURE
+from .item_bank import get_question, get_questions
 
-BAND_SEQUENCE = [DifficultyBand.easy, DifficultyBand.medium, DifficultyBand.hard]
+# Write-through cache of in-progress sessions (R-PERF-01). Entries are refreshed by every
+# successful transition and evicted when a session leaves "in_progress". A cache hit costs
+# no database read. Safe with several workers: every write is conditional on the version,
+# so a copy made stale by another worker loses its transition, which evicts it, and the
+# caller reloads and retries once (see MAX_ATTEMPTS). The TTL only bounds memory for
+# abandoned sessions.
+SESSION_CACHE_TTL_SECONDS = float(os.getenv("SESSION_CACHE_TTL_SECONDS", "300"))
+SESSION_CACHE = TTLCache(max_size=10_000, ttl_seconds=SESSION_CACHE_TTL_SECONDS)
+# A request runs on the cached copy first and, if that turns out stale, once more on a fresh read
+MAX_ATTEMPTS = 2
+
+
+def cache_session(session: TestSession) -> None:
+    """Write-through: store the latest known state of a session, or evict it once it is no longer active"""
+    if session.status == "in_progress":
+        SESSION_CACHE.set(session.sessionId, session)
+    else:
+        SESSION_CACHE.invalidate(session.sessionId)
 
 
 async def get_session(session_id: str) -> TestSession:
-    """Get test session by ID"""
+    """
+    Get test session by ID.
+    Served from the session cache without a read, so the copy may be behind another
+    worker's writes; transitions detect that through the version. The returned object
+    may be shared, so callers must not mutate it.
+    """
+    cached: Optional[TestSession] = SESSION_CACHE.get(session_id)
+    if cached is not None:
+        return cached
+
     collection = get_test_sessions_collection()
     doc = await collection.find_one({"sessionId": session_id})
     
@@ -35,7 +67,42 @@ async def get_session(session_id: str) -> TestSession:
         )
     
     doc.pop('_id', None)
-    return TestSession(**doc)
+    session = TestSession(**doc)
+    cache_session(session)
+    return session
+
+
+def _version_filter(version: int):
+    """Sessions stored before versioning have no version field; treat them as version 0"""
+    return {"$in": [0, None]} if version == 0 else version
+
+
+async def transition_session(session: TestSession, expected: Dict, update: Dict) -> Optional[TestSession]:
+    """
+    Apply one session state transition atomically.
+    The write only lands if the session is still at the version (and state) this request
+    read; returns the updated session, or None if a concurrent request got there first.
+    """
+    collection = get_test_sessions_collection()
+    update.setdefault("$inc", {})["version"] = 1
+    doc = await collection.find_one_and_update(
+        {"sessionId": session.sessionId, "version": _version_filter(session.version), **expected},
+        update,
+        return_document=ReturnDocument.AFTER,
+    )
+    if not doc:
+        # Our copy is stale (another request or worker moved the session on)
+        SESSION_CACHE.invalidate(session.sessionId)
+        return None
+    doc.pop('_id', None)
+    updated = TestSession(**doc)
+    cache_session(updated)
+    return updated
+
+
+def session_conflict() -> HTTPException:
+    """R-UX-01: Clear error for a double-submit or a retry that lost the race"""
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=format_user_error("session conflict"))
 
 
 def _time_remaining(session: TestSession) -> int:
@@ -45,23 +112,29 @@ def _time_remaining(session: TestSession) -> int:
     return max(0, remaining)
 
 
-async def _select_question(session: TestSession) -> Optional[QuestionMetadata]:
+async def _select_question(session: TestSession, theta: float) -> Optional[QuestionMetadata]:
     """
-    Select next question based on adaptive algorithm
+    Select a highly informative unasked item at the ability estimate, with exposure control.
+    The draw is seeded by the session and its position in it, so a retry or a concurrent
+    duplicate request for the same slot picks the same item.
     R-ETH-01: Selection is based only on performance, not demographics
     """
-    asked = set(session.questionIds)
-    candidates = await get_questions_for_track(session.trackId, session.currentBand)
-    candidates = [q for q in candidates if q.questionId not in asked]
-    if candidates:
-        return candidates[0]
-    # fallback search other bands
-    for band in BAND_SEQUENCE:
-        alt = [q for q in await get_questions_for_track(session.trackId, band) if q.questionId not in asked]
-        if alt:
-            session.currentBand = band
-            return alt[0]
-    return None
+    pool = await cat_engine.get_pool(session.trackId)
+    rng = random.Random(f"{session.sessionId}:{len(session.questionIds)}")
+    return cat_engine.select_item(
+        pool, theta, session.questionIds, rng,
+        lambda question_id: EXPOSURE.over_exposed(session.trackId, question_id),
+    )
+
+
+async def _outcomes(session: TestSession) -> List[Tuple[str, bool]]:
+    """(questionId, correct) for every recorded response, re-scored from the item bank snapshot"""
+    questions = await get_questions([r.questionId for r in session.responses])
+    return [
+        (r.questionId, evaluate_immediate(questions[r.questionId], r))
+        for r in session.responses
+        if r.questionId in questions
+    ]
 
 
 async def next_question(session_id: str) -> Dict:
@@ -69,6 +142,15 @@ async def next_question(session_id: str) -> Dict:
     Get next question for a test session
     R-PERF-01: Fast question retrieval
     """
+    for _ in range(MAX_ATTEMPTS):
+        block = await _next_question(session_id)
+        if block is not None:
+            return block
+    raise session_conflict()
+
+
+async def _next_question(session_id: str) -> Optional[Dict]:
+    """One attempt at next_question; None if the session copy it read was stale"""
     session = await get_session(session_id)
     
     if session.status != "in_progress":
@@ -83,8 +165,9 @@ async def next_question(session_id: str) -> Dict:
         collection = get_test_sessions_collection()
         await collection.update_one(
             {"sessionId": session_id},
-            {"$set": {"status": "expired"}}
+            {"$set": {"status": "expired"}, "$inc": {"version": 1}}
         )
+        SESSION_CACHE.invalidate(session_id)
         # R-UX-01: Clear error message
         raise HTTPException(
             status_code=400,
@@ -97,33 +180,42 @@ async def next_question(session_id: str) -> Dict:
         if not question:
             raise HTTPException(status_code=404, detail="Question not found")
     else:
-        question = await _select_question(session)
+        question = await _select_question(session, session.theta)
         if not question:
             raise HTTPException(status_code=400, detail="No remaining questions; please submit test")
+        band = cat_engine.band_for_theta(session.theta)
         
-        # Update session with new question
-        session.currentQuestionId = question.questionId
-        if question.questionId not in session.questionIds:
-            session.questionIds.append(question.questionId)
-            
-            collection = get_test_sessions_collection()
-            await collection.update_one(
-                {"sessionId": session_id},
-                {"$set": {
-                    "currentQuestionId": question.questionId,
-                    "questionIds": session.questionIds
-                }}
-            )
-            
-            log_event(
-                "session.question_assigned",
-                session.candidateId,
-                {"sessionId": session.sessionId, "questionId": question.questionId, "band": session.currentBand.value},
-            )
-
-    question_payload = question.model_dump()
-    question_payload.pop("answerKey", None)
-    question_payload.pop("referenceSolution", None)
+        # Assign the question only if no other request assigned one since we read the
+        # session; only the new id is appended, not the whole list
+        updated = await transition_session(
+            session,
+            {"currentQuestionId": None},
+            {
+                "$set": {"currentQuestionId": question.questionId, "currentBand": band.value},
+                "$addToSet": {"questionIds": question.questionId},
+            },
+        )
+        if updated is None:
+            # Lost a race with a concurrent request (e.g. a double-click) or our copy was
+            # stale: the retry reads the session again and serves what was assigned
+            return None
+        EXPOSURE.record(session.trackId, question.questionId, first=not session.questionIds)
+        log_event(
+            "session.question_assigned",
+            session.candidateId,
+            {"sessionId": session.sessionId, "questionId": question.questionId, "band": updated.currentBand.value},
+        )
+        session = updated
+
+    return _question_block(question, session)
+
+
+def _question_block(question: QuestionMetadata, session: TestSession) -> Dict:
+    """
+    Candidate-facing question payload; answer keys, reference solutions and
+    calibrated item parameters (adaptiveStats) never leave the server
+    """
+    question_payload = question.model_dump(exclude={"answerKey", "referenceSolution", "adaptiveStats"})
 
     return {
         "question": question_payload,
@@ -132,7 +224,7 @@ async def next_question(session_id: str) -> Dict:
     }
 
 
-def _evaluate_immediate(question: QuestionMetadata, response: CandidateResponse) -> bool:
+def evaluate_immediate(question: QuestionMetadata, response: CandidateResponse) -> bool:
     """
     R-PERF-01: Code evaluation should complete within 3 seconds per test case.
     For demo purposes, we use simple pattern matching. In production, this would
@@ -156,34 +248,63 @@ def _evaluate_immediate(question: QuestionMetadata, response: CandidateResponse)
 
 async def submit_response(session_id: str, response: CandidateResponse) -> Dict:
     """
-    Submit response and update adaptive difficulty
+    Submit response, update the ability estimate and assign the next question
+    R-PERF-01: The next question is selected and persisted in the same write and returned
+    as `next`, so each item costs one round trip. When the estimate reaches the target
+    precision (or the item cap or pool end) `next` is None and the session is marked
+    responses_complete
     R-LOG-01: Log all responses
     """
+    for attempt in range(1, MAX_ATTEMPTS + 1):
+        result = await _submit_response(session_id, response, last=attempt == MAX_ATTEMPTS)
+        if result is not None:
+            return result
+    raise session_conflict()
+
+
+async def _submit_response(session_id: str, response: CandidateResponse, last: bool) -> Optional[Dict]:
+    """One attempt at submit_response; None if the session copy it read was stale"""
     session = await get_session(session_id)
     
     if session.currentQuestionId != response.questionId:
+        if any(r.questionId == response.questionId for r in session.responses):
+            # Retry or double-click of an answer that was already recorded
+            raise session_conflict()
+        if not last:
+            # A cached copy may be behind another worker that already moved the session on
+            SESSION_CACHE.invalidate(session_id)
+            return None
         raise HTTPException(status_code=400, detail="Question mismatch")
 
-    session.responses.append(response)
     question = await get_question(response.questionId)
     if not question:
         raise HTTPException(status_code=404, detail="Question not found")
 
-    correct = _evaluate_immediate(question, response)
-    session.currentQuestionId = None
-
-    session.currentBand = _next_band(session.currentBand, correct)
+    correct = evaluate_immediate(question, response)
+    outcomes = await _outcomes(session) + [(response.questionId, correct)]
+    pool = await cat_engine.get_pool(session.trackId)
+    theta, theta_se = cat_engine.estimate(pool, outcomes)
+    next_item = None
+    if not cat_engine.should_stop(len(outcomes), theta_se):
+        next_item = await _select_question(session, theta)
     
-    # Update session in database
-    collection = get_test_sessions_collection()
-    await collection.update_one(
-        {"sessionId": session_id},
-        {"$set": {
-            "responses": [r.model_dump() for r in session.responses],
-            "currentQuestionId": None,
-            "currentBand": session.currentBand.value
-        }}
-    )
+    # Record the answer only if the question is still open at the version we read;
+    # the response is appended, a constant-size write
+    update: Dict = {
+        "$push": {"responses": response.model_dump()},
+        "$set": {"theta": theta, "thetaSE": theta_se, "currentBand": cat_engine.band_for_theta(theta).value},
+    }
+    if next_item:
+        update["$set"]["currentQuestionId"] = next_item.questionId
+        update["$addToSet"] = {"questionIds": next_item.questionId}
+    else:
+        update["$set"].update({"currentQuestionId": None, "status": "responses_complete"})
+    updated = await transition_session(session, {"currentQuestionId": response.questionId}, update)
+    if updated is None:
+        # Stale copy or a concurrent duplicate; the retry reads the session again and a
+        # duplicate then finds its answer already recorded
+        return None
+    session = updated
     
     log_event(
         "session.response_recorded",
@@ -192,18 +313,19 @@ async def submit_response(session_id: str, response: CandidateResponse) -> Dict:
             "sessionId": session.sessionId,
             "questionId": response.questionId,
             "correct": str(correct),
+            "theta": f"{theta:.3f}",
+            "thetaSE": f"{theta_se:.3f}",
             "nextBand": session.currentBand.value,
         },
     )
 
-    return {"status": "recorded", "nextBand": session.currentBand.value}
-
+    if not next_item:
+        return {"status": "recorded", "nextBand": session.currentBand.value, "next": None}
+    EXPOSURE.record(session.trackId, next_item.questionId, first=False)
+    log_event(
+        "session.question_assigned",
+        session.candidateId,
+        {"sessionId": session.sessionId, "questionId": next_item.questionId, "band": session.currentBand.value},
+    )
+    return {"status": "recorded", "nextBand": session.currentBand.value, "next": _question_block(next_item, session)}
 
-def _next_band(current: DifficultyBand, correct: bool) -> DifficultyBand:
-    """Adaptive difficulty adjustment based on performance"""
-    idx = BAND_SEQUENCE.index(current)
-    if correct and idx < len(BAND_SEQUENCE) - 1:
-        return BAND_SEQUENCE[idx + 1]
-    if not correct and idx > 0:
-        return BAND_SEQUENCE[idx - 1]
-    return current
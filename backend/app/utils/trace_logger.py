@@ -1,26 +1,198 @@
+import atexit
 import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
 from pathlib import Path
-from typing import Any, Dict, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from .time import utc_now_iso
+from .trace_store import SegmentedLog, TraceEntry, index_keys
 
 TRACE_PATH = Path(__file__).resolve().parents[3] / "logs" / "trace.jsonl"
-PROMPT_TRACE_PATH = Path(__file__).resolve().parents[3] / "logs" / "prompt_trace.jsonl"
 
+# Flush when this many events are buffered, or this long after the oldest buffered event
+TRACE_BATCH_SIZE = int(os.getenv("TRACE_BATCH_SIZE", "256"))
+TRACE_FLUSH_INTERVAL_SECONDS = float(os.getenv("TRACE_FLUSH_INTERVAL_SECONDS", "0.25"))
+# Bound on events waiting for the writer. When full, "block" (the default, lossless) makes
+# the caller wait up to TRACE_BLOCK_TIMEOUT_SECONDS for room (callers run on the event loop,
+# so the wait stays bounded) and then parks the event in an unbounded overflow buffer that
+# the writer drains next; "drop" discards it at once, and the writer records how many it
+# lost as a trace.dropped event.
+TRACE_MAX_BUFFERED_EVENTS = int(os.getenv("TRACE_MAX_BUFFERED_EVENTS", "10000"))
+TRACE_BACKPRESSURE = os.getenv("TRACE_BACKPRESSURE", "block")
+TRACE_BLOCK_TIMEOUT_SECONDS = float(os.getenv("TRACE_BLOCK_TIMEOUT_SECONDS", "0.05"))
 
-def _write_line(path: Path, payload: Dict[str, Any]) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    with path.open("a", encoding="utf-8") as fh:
-        fh.write(json.dumps(payload) + "\n")
+_STOP = object()
+_FLUSH = object()
+
+
+class TraceWriter:
+    """
+    Background writer for trace events.
+    Callers enqueue serialized entries with their index keys; a daemon thread appends them
+    in batches to each segmented log, so request handlers never wait on disk I/O.
+    When a shared sink (MongoDB trace_events) is attached, batches go there instead and
+    the local logs only take the entries the shared sink could not store.
+    """
+
+    def __init__(
+        self,
+        logs: Sequence[SegmentedLog],
+        batch_size: int = TRACE_BATCH_SIZE,
+        flush_interval: float = TRACE_FLUSH_INTERVAL_SECONDS,
+        max_buffered: int = TRACE_MAX_BUFFERED_EVENTS,
+        backpressure: str = TRACE_BACKPRESSURE,
+        block_timeout: float = TRACE_BLOCK_TIMEOUT_SECONDS,
+    ) -> None:
+        self.logs = list(logs)
+        self.shared_sink = None
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.backpressure = backpressure
+        self.block_timeout = block_timeout
+        self.dropped = 0
+        self.overflowed = 0
+        self._unreported_drops = 0
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_buffered)
+        # Events that did not fit in the queue, oldest first; while it holds anything new
+        # events join it too, so the writer still sees them in submission order
+        self._overflow: "deque[TraceEntry]" = deque()
+        self._overflow_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name="trace-writer", daemon=True)
+            self._thread.start()
+
+    def submit(self, entry: TraceEntry) -> None:
+        self.start()
+        if self.backpressure == "drop":
+            try:
+                self._queue.put_nowait(entry)
+            except queue.Full:
+                with self._overflow_lock:
+                    self.dropped += 1
+                    self._unreported_drops += 1
+                if self.dropped == 1 or self.dropped % 1000 == 0:
+                    print(f"⚠️  Trace writer is behind; {self.dropped} events dropped", file=sys.stderr)
+            return
+        with self._overflow_lock:
+            if self._overflow:
+                self._overflow.append(entry)
+                return
+        try:
+            self._queue.put(entry, timeout=self.block_timeout)
+        except queue.Full:
+            with self._overflow_lock:
+                self._overflow.append(entry)
+                self.overflowed += 1
+            if self.overflowed == 1 or self.overflowed % 1000 == 0:
+                print(f"⚠️  Trace writer is behind; {self.overflowed} events held in its overflow buffer", file=sys.stderr)
+
+    def flush(self) -> None:
+        """Write buffered events now and block until everything submitted so far is on disk"""
+        if self._thread and self._thread.is_alive():
+            self._queue.put(_FLUSH)
+            self._queue.join()
+
+    def stop(self) -> None:
+        """Flush outstanding events and stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            if not thread or not thread.is_alive():
+                return
+            self._queue.put(_STOP)
+            thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while True:
+            batch: List[TraceEntry] = []
+            markers = 0
+            try:
+                # Wake up now and then for overflow parked while the queue was idle
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                self._write_batch(self._take_overflow())
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while True:
+                if item is _STOP or item is _FLUSH:
+                    markers += 1
+                    break
+                batch.append(item)
+                remaining = deadline - time.monotonic()
+                if len(batch) >= self.batch_size or remaining <= 0:
+                    break
+                try:
+                    item = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+            queued = len(batch)
+            # The overflow only holds events submitted after everything still queued
+            if self._queue.empty():
+                batch.extend(self._take_overflow())
+            self._write_batch(batch)
+            for _ in range(queued + markers):
+                self._queue.task_done()
+            if item is _STOP:
+                return
+
+    def _take_overflow(self) -> List[TraceEntry]:
+        with self._overflow_lock:
+            entries = list(self._overflow)
+            self._overflow.clear()
+        return entries
+
+    def _write_batch(self, batch: List[TraceEntry]) -> None:
+        with self._overflow_lock:
+            dropped, self._unreported_drops = self._unreported_drops, 0
+        if dropped:
+            # R-LOG-01: losses under the "drop" policy are themselves on the record
+            batch = batch + [make_entry("trace.dropped", None, {"dropped": dropped})]
+        if not batch:
+            return
+        if self.shared_sink is not None:
+            # Only what the shared sink could not store falls back to the local logs
+            batch = self.shared_sink.append(batch)
+            if not batch:
+                return
+        for log in self.logs:
+            try:
+                log.append(batch)
+            except OSError as e:
+                print(f"⚠️  Could not write trace events to {log.active_path}: {e}", file=sys.stderr)
+
+
+# Each event is persisted once, here; the prompt trace is the indexed "prompt" stream
+# of this log (see trace_store.EVENT_STREAMS), not a second copy
+TRACE_LOG = SegmentedLog(TRACE_PATH)
+
+_writer = TraceWriter([TRACE_LOG])
+atexit.register(_writer.stop)
 
 
 def log_event(event_type: str, actor_id: Optional[str], payload: Dict[str, Any]) -> None:
     """
     R-LOG-01: Log all test events for auditability.
-    
+
     This function logs every user action, system response, rule update, and test result
-    to ensure full traceability and debugging capability.
+    to ensure full traceability and debugging capability. The record is serialized
+    immediately and persisted by the background writer.
     """
+    _writer.submit(make_entry(event_type, actor_id, payload))
+
+
+def make_entry(event_type: str, actor_id: Optional[str], payload: Dict[str, Any]) -> TraceEntry:
+    """Serialize a trace record with its index keys"""
     record = {
         "timestamp": utc_now_iso(),
         "eventType": event_type,
@@ -28,5 +200,27 @@ def log_event(event_type: str, actor_id: Optional[str], payload: Dict[str, Any])
         "payload": payload,
         "ruleCompliance": "R-LOG-01",  # Mark as compliant with logging rule
     }
-    _write_line(TRACE_PATH, record)
-    _write_line(PROMPT_TRACE_PATH, record)
+    return TraceEntry(record["timestamp"], json.dumps(record) + "\n", index_keys(record), record)
+
+
+def flush_events() -> None:
+    """Wait until all logged events are written"""
+    _writer.flush()
+
+
+def attach_shared_sink(sink) -> None:
+    """Route trace batches to a shared sink; the local logs become its fallback"""
+    _writer.flush()
+    _writer.shared_sink = sink
+
+
+def shared_sink_attached() -> bool:
+    return _writer.shared_sink is not None
+
+
+def shutdown_trace_logger() -> None:
+    """Flush and stop the writer; called on application shutdown"""
+    _writer.stop()
+    sink, _writer.shared_sink = _writer.shared_sink, None
+    if sink is not None:
+        sink.close()
@@ -0,0 +1,106 @@
+import os
+import sys
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+
+from pymongo import ASCENDING, DESCENDING, MongoClient
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from .trace_store import EVENT_STREAMS, TraceEntry
+
+TRACE_COLLECTION = "trace_events"
+# Trace events older than this are removed by MongoDB's TTL monitor
+TRACE_RETENTION_SECONDS = int(os.getenv("TRACE_RETENTION_SECONDS", str(90 * 24 * 3600)))
+# A record already in trace_events (e.g. a retried batch) needs no fallback copy
+DUPLICATE_KEY = 11000
+
+
+class MongoTraceSink:
+    """
+    Shared trace sink: writes each batch from the trace writer thread into the
+    trace_events collection with one insert_many, so every worker and host feeds
+    the same queryable audit log (R-LOG-01).
+    Uses its own synchronous client because it runs off the event loop.
+    """
+
+    def __init__(self, url: str, database_name: str) -> None:
+        self.client = MongoClient(url, serverSelectionTimeoutMS=2000)
+        self.collection = self.client[database_name][TRACE_COLLECTION]
+
+    def append(self, entries: Sequence[TraceEntry]) -> List[TraceEntry]:
+        """
+        Insert a batch; returns the entries MongoDB did not store, for the file fallback.
+        The insert is unordered, so after a partial failure only the documents listed in
+        the error's writeErrors are returned, not the whole batch.
+        """
+        created_at = datetime.now(timezone.utc)
+        stored = [entry for entry in entries if entry.record is not None]
+        # Entries without a record cannot be inserted; they go to the files as they are
+        rejected = [entry for entry in entries if entry.record is None]
+        if not stored:
+            return rejected
+        documents = [dict(entry.record, createdAt=created_at) for entry in stored]
+        try:
+            self.collection.insert_many(documents, ordered=False)
+        except BulkWriteError as e:
+            failed = sorted({
+                error["index"] for error in e.details.get("writeErrors", []) if error.get("code") != DUPLICATE_KEY
+            })
+            if failed:
+                print(f"⚠️  MongoDB rejected {len(failed)} of {len(documents)} trace events", file=sys.stderr)
+            rejected.extend(stored[i] for i in failed)
+        except PyMongoError as e:
+            print(f"⚠️  Could not write trace events to MongoDB: {type(e).__name__}", file=sys.stderr)
+            return list(entries)
+        return rejected
+
+    def close(self) -> None:
+        self.client.close()
+
+
+async def create_trace_indexes(db) -> None:
+    """TTL on createdAt plus the lookups served by GET /api/trace/query"""
+    collection = db[TRACE_COLLECTION]
+    await collection.create_index([("createdAt", ASCENDING)], expireAfterSeconds=TRACE_RETENTION_SECONDS)
+    await collection.create_index([("actorId", ASCENDING), ("timestamp", DESCENDING)])
+    await collection.create_index([("eventType", ASCENDING), ("timestamp", DESCENDING)])
+    await collection.create_index([("payload.sessionId", ASCENDING), ("timestamp", DESCENDING)], sparse=True)
+    await collection.create_index([("timestamp", DESCENDING)])
+
+
+async def query_trace_collection(
+    collection,
+    filters: Dict[str, Optional[str]],
+    limit: int,
+    before: Optional[str] = None,
+    after: Optional[str] = None,
+) -> List[Dict]:
+    """
+    `limit` events matching the filters in the (after, before) window, oldest first: the
+    most recent ones, or with only `after` given, the first ones after it (as SegmentedLog.tail)
+    """
+    query: Dict = {}
+    for field in ("actorId", "eventType"):
+        if filters.get(field):
+            query[field] = filters[field]
+    if filters.get("sessionId"):
+        query["payload.sessionId"] = filters["sessionId"]
+    if filters.get("stream"):
+        event_types = [t for t, stream in EVENT_STREAMS.items() if stream == filters["stream"]]
+        query["$and"] = [{"eventType": {"$in": event_types}}]
+    window = {}
+    if before:
+        window["$lt"] = before
+    if after:
+        window["$gt"] = after
+    if window:
+        query["timestamp"] = window
+
+    forward = bool(after and not before)
+    cursor = collection.find(query, {"_id": 0, "createdAt": 0}).sort(
+        "timestamp", ASCENDING if forward else DESCENDING
+    ).limit(limit)
+    records = await cursor.to_list(length=limit)
+    if not forward:
+        records.reverse()
+    return records
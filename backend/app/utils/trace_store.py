@@ -0,0 +1,570 @@
+import bisect
+import gzip
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from pathlib import Path
+from typing import BinaryIO, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Seal the active segment once it reaches this size or age
+TRACE_SEGMENT_MAX_BYTES = int(os.getenv("TRACE_SEGMENT_MAX_BYTES", str(64 * 1024 * 1024)))
+TRACE_SEGMENT_MAX_AGE_SECONDS = float(os.getenv("TRACE_SEGMENT_MAX_AGE_SECONDS", str(24 * 3600)))
+READ_BLOCK_SIZE = 64 * 1024
+# Sealed segments are written as independent gzip members of this many records,
+# so an indexed lookup only decompresses the blocks holding matching records
+SEALED_BLOCK_RECORDS = 512
+
+# Record fields covered by the sidecar index, as "<field>:<value>" keys
+INDEXED_FIELDS = ("actorId", "eventType", "sessionId", "stream")
+# Routing table for views over the single trace log: event type -> stream.
+# The prompt trace (questions served and answers given) is the "prompt" stream.
+EVENT_STREAMS = {
+    "session.question_assigned": "prompt",
+    "session.response_recorded": "prompt",
+}
+
+
+class TraceEntry(NamedTuple):
+    """One serialized record queued for the trace sinks, with its index keys"""
+    timestamp: str
+    line: str
+    keys: Tuple[str, ...]
+    record: Optional[Dict] = None
+
+
+def index_keys(record: Dict) -> Tuple[str, ...]:
+    """Index keys for a trace record; sessionId is taken from the payload, stream from EVENT_STREAMS"""
+    values = {
+        "actorId": record.get("actorId"),
+        "eventType": record.get("eventType"),
+        "sessionId": (record.get("payload") or {}).get("sessionId"),
+        "stream": EVENT_STREAMS.get(record.get("eventType")),
+    }
+    return tuple(f"{field}:{values[field]}" for field in INDEXED_FIELDS if values[field])
+
+
+def read_lines_reversed(path: Path, block_size: int = READ_BLOCK_SIZE) -> Iterator[str]:
+    """Yield a file's non-empty lines last to first, seeking backwards one block at a time"""
+    try:
+        fh = path.open("rb")
+    except OSError:
+        return
+    with fh:
+        yield from _lines_reversed(fh, fh.seek(0, os.SEEK_END), block_size)
+
+
+def _lines_reversed(fh, end: int, block_size: int = READ_BLOCK_SIZE, start: int = 0) -> Iterator[str]:
+    """Non-empty lines of an open binary file between byte start (a line start) and end, last to first"""
+    position = end
+    remainder = b""
+    while position > start:
+        step = min(block_size, position - start)
+        position -= step
+        fh.seek(position)
+        block = fh.read(step) + remainder
+        lines = block.split(b"\n")
+        # The first piece may be the tail of a line that starts in an earlier block
+        remainder = lines.pop(0)
+        for line in reversed(lines):
+            if line.strip():
+                yield line.decode("utf-8")
+    if remainder.strip():
+        yield remainder.decode("utf-8")
+
+
+@lru_cache(maxsize=32)
+def _load_sealed_index(path: str) -> Dict:
+    """Sealed segment indexes never change once written, so they are cached by path"""
+    with gzip.open(path, "rt", encoding="utf-8") as fh:
+        return json.load(fh)
+
+
+class SegmentedLog:
+    """
+    Append-only JSONL log made of one active file plus sealed, gzip-compressed segments.
+
+    A manifest next to the active file records each sealed segment's name, time range
+    and record count, so readers can go straight to the segments they need. Every
+    segment also has a sidecar index from actorId/eventType/sessionId keys to record
+    positions, so filtered queries (and stream views such as the prompt trace) read
+    only the matching records.
+    Layout for logs/trace.jsonl:
+        logs/trace.jsonl                 active segment
+        logs/trace.idx.jsonl             active index: [byteOffset, timestamp, keys] per record
+        logs/trace.000001.jsonl.gz       sealed segments, oldest first
+        logs/trace.000001.idx.json.gz    sealed index: gzip block offsets and first timestamps + postings
+        logs/trace.manifest.json         manifest
+    """
+
+    def __init__(
+        self,
+        active_path: Path,
+        max_bytes: int = TRACE_SEGMENT_MAX_BYTES,
+        max_age_seconds: float = TRACE_SEGMENT_MAX_AGE_SECONDS,
+    ) -> None:
+        self.active_path = active_path
+        self.directory = active_path.parent
+        self.name = active_path.name.split(".")[0]
+        self.manifest_path = self.directory / f"{self.name}.manifest.json"
+        self.sidecar_path = self.directory / f"{self.name}.idx.jsonl"
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self._lock = threading.Lock()
+        self._manifest: Optional[Dict] = None
+        # Reader-side postings for the active segment, folded in from the sidecar as it grows,
+        # plus every record's offset and timestamp in file order for bisecting cursors
+        self._postings: Dict[str, List[int]] = {}
+        self._offsets: List[int] = []
+        self._timestamps: List[str] = []
+        self._postings_position = 0
+        self._postings_generation: Optional[float] = None
+
+    # Manifest -----------------------------------------------------------
+
+    def read_manifest(self) -> Dict:
+        try:
+            return json.loads(self.manifest_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return {"segments": [], "active": {}}
+
+    def _write_manifest(self, manifest: Dict) -> None:
+        tmp = self.manifest_path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(manifest, indent=1), encoding="utf-8")
+        os.replace(tmp, self.manifest_path)
+
+    # Writing --------------------------------------------------------------
+
+    def append(self, entries: Sequence[TraceEntry]) -> None:
+        """Append a batch of records and their index entries, sealing the active segment first if it is full or old"""
+        with self._lock:
+            self.directory.mkdir(parents=True, exist_ok=True)
+            if self._manifest is None:
+                self._manifest = self.read_manifest()
+            manifest = self._manifest
+            if self._should_rotate(manifest.get("active", {})):
+                self._seal(manifest)
+            active = manifest.setdefault("active", {})
+            if not active.get("firstTimestamp"):
+                # Only the opening of a segment touches the manifest on the write path
+                active["firstTimestamp"] = entries[0].timestamp
+                active["openedAt"] = time.time()
+                self._write_manifest(manifest)
+            if not self.sidecar_path.exists():
+                self._index_active()
+
+            encoded = [entry.line.encode("utf-8") for entry in entries]
+            with self.active_path.open("ab") as fh:
+                offset = fh.tell()
+                fh.write(b"".join(encoded))
+            sidecar = []
+            for entry, data in zip(entries, encoded):
+                sidecar.append(json.dumps([offset, entry.timestamp, list(entry.keys)]) + "\n")
+                offset += len(data)
+            with self.sidecar_path.open("a", encoding="utf-8") as fh:
+                fh.write("".join(sidecar))
+
+    def _index_active(self) -> None:
+        """Build the sidecar for an active file written before indexing existed"""
+        sidecar = []
+        try:
+            with self.active_path.open("rb") as fh:
+                offset = 0
+                for line in fh:
+                    if line.strip():
+                        try:
+                            record = json.loads(line)
+                        except ValueError:
+                            record = {}
+                        sidecar.append(json.dumps([offset, record.get("timestamp"), list(index_keys(record))]) + "\n")
+                    offset += len(line)
+        except OSError:
+            pass
+        self.sidecar_path.write_text("".join(sidecar), encoding="utf-8")
+
+    def _should_rotate(self, active: Dict) -> bool:
+        try:
+            size = self.active_path.stat().st_size
+        except OSError:
+            return False
+        if size == 0:
+            return False
+        if size >= self.max_bytes:
+            return True
+        opened_at = active.get("openedAt")
+        return opened_at is not None and time.time() - opened_at >= self.max_age_seconds
+
+    def _seal(self, manifest: Dict) -> None:
+        """Compress and index the active file as the next numbered segment, and start a new one"""
+        segments = manifest.setdefault("segments", [])
+        sequence = segments[-1]["sequence"] + 1 if segments else 1
+        sealed_name = f"{self.name}.{sequence:06d}.jsonl.gz"
+        index_name = f"{self.name}.{sequence:06d}.idx.json.gz"
+        staging = self.directory / f"{self.name}.{sequence:06d}.jsonl"
+        os.replace(self.active_path, staging)
+
+        records = 0
+        first_timestamp = last_timestamp = None
+        blocks: List[int] = []
+        # Timestamp of each block's first record, so cursors can skip whole blocks
+        block_timestamps: List[str] = []
+        postings: Dict[str, List[List[int]]] = {}
+        block: List[bytes] = []
+        with staging.open("rb") as src, (self.directory / sealed_name).open("wb") as dst:
+            for line in src:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    record = {}
+                for key in index_keys(record):
+                    postings.setdefault(key, []).append([len(blocks), len(block)])
+                first_timestamp = first_timestamp or record.get("timestamp")
+                last_timestamp = record.get("timestamp") or last_timestamp
+                if not block:
+                    block_timestamps.append(last_timestamp or "")
+                block.append(line if line.endswith(b"\n") else line + b"\n")
+                records += 1
+                if len(block) >= SEALED_BLOCK_RECORDS:
+                    blocks.append(dst.tell())
+                    dst.write(gzip.compress(b"".join(block)))
+                    block = []
+            if block:
+                blocks.append(dst.tell())
+                dst.write(gzip.compress(b"".join(block)))
+        with gzip.open(self.directory / index_name, "wt", encoding="utf-8") as fh:
+            json.dump({"blocks": blocks, "blockTimestamps": block_timestamps, "postings": postings}, fh)
+        staging.unlink()
+        self.sidecar_path.unlink(missing_ok=True)
+
+        segments.append({
+            "sequence": sequence,
+            "file": sealed_name,
+            "index": index_name,
+            "firstTimestamp": first_timestamp,
+            "lastTimestamp": last_timestamp,
+            "records": records,
+        })
+        manifest["active"] = {}
+        self._write_manifest(manifest)
+
+    # Reading --------------------------------------------------------------
+
+    def sealed_segments(self) -> List[Dict]:
+        """Sealed segment entries, oldest first"""
+        return self.read_manifest().get("segments", [])
+
+    def read_segment(self, segment: Dict) -> List[str]:
+        with gzip.open(self.directory / segment["file"], "rt", encoding="utf-8") as fh:
+            return fh.read().splitlines()
+
+    def _sealed_index(self, segment: Dict) -> Optional[Dict]:
+        return _load_sealed_index(str(self.directory / segment["index"])) if segment.get("index") else None
+
+    def _segment_reversed(self, segment: Dict, before: Optional[str] = None) -> Iterator[str]:
+        """
+        A sealed segment's lines last to first, decompressing one gzip block at a time
+        from the end (block offsets come from the sealed index), so a tail only pays for
+        the blocks it reads; blocks starting at or after `before` are skipped unread.
+        Segments sealed without an index are read whole.
+        """
+        index = self._sealed_index(segment)
+        if index is None:
+            yield from reversed(self.read_segment(segment))
+            return
+        blocks = index["blocks"]
+        stop = _block_range(index, before=before)[1]
+        with (self.directory / segment["file"]).open("rb") as fh:
+            for block_no in reversed(range(stop)):
+                yield from reversed(_read_block(fh, blocks, block_no))
+
+    def _segment_forward(self, segment: Dict, after: Optional[str]) -> Iterator[str]:
+        """A sealed segment's lines first to last, starting at the block that holds `after`"""
+        index = self._sealed_index(segment)
+        if index is None:
+            yield from self.read_segment(segment)
+            return
+        blocks = index["blocks"]
+        start = _block_range(index, after=after)[0]
+        with (self.directory / segment["file"]).open("rb") as fh:
+            for block_no in range(start, len(blocks)):
+                yield from _read_block(fh, blocks, block_no)
+
+    def _open_active(
+        self, before: Optional[str] = None, after: Optional[str] = None
+    ) -> Tuple[Optional[BinaryIO], int, int]:
+        """
+        The active file opened under the lock, with the byte range (start, end) holding
+        after < timestamp < before. The range is bisected from the sidecar's timestamps
+        rather than found by reading, so it costs the same however far back the cursor
+        is. Rotation renames the file and appends grow it, but an open handle keeps
+        reading the same file, and nothing past the end is read, so no partial batch is seen.
+        """
+        with self._lock:
+            try:
+                fh = self.active_path.open("rb")
+            except OSError:
+                return None, 0, 0
+            size = fh.seek(0, os.SEEK_END)
+            self._refresh_postings()
+            start, end = 0, size
+            if not self._offsets:
+                # No sidecar yet (a file written before indexing): the whole file is in range
+                return fh, start, end
+            if after:
+                position = bisect.bisect_right(self._timestamps, after)
+                start = self._offsets[position] if position < len(self._offsets) else size
+            if before:
+                position = bisect.bisect_left(self._timestamps, before)
+                end = self._offsets[position] if position < len(self._offsets) else size
+            return fh, start, max(start, end)
+
+    def read_active(self) -> List[str]:
+        try:
+            return self.active_path.read_text(encoding="utf-8").splitlines()
+        except OSError:
+            return []
+
+    def _segments_in_window(self, before: Optional[str], after: Optional[str]) -> Iterator[Dict]:
+        """Sealed segments, newest first, whose manifest time range overlaps (after, before)"""
+        for segment in reversed(self.sealed_segments()):
+            if before and segment.get("firstTimestamp") and segment["firstTimestamp"] >= before:
+                continue
+            if after and segment.get("lastTimestamp") and segment["lastTimestamp"] <= after:
+                return
+            yield segment
+
+    def _segments_after(self, after: str) -> Iterator[Dict]:
+        """Sealed segments, oldest first, holding records newer than after"""
+        for segment in self.sealed_segments():
+            if segment.get("lastTimestamp") and segment["lastTimestamp"] <= after:
+                continue
+            yield segment
+
+    def iter_newest_first(self, before: Optional[str] = None, after: Optional[str] = None) -> Iterator[str]:
+        """
+        Yield serialized records newest first, limited to after < timestamp < before.
+        The active segment is read backwards from the `before` cursor; sealed segments
+        outside the window are skipped using the manifest's time ranges.
+        """
+        def lines() -> Iterator[str]:
+            fh, start, end = self._open_active(before, after)
+            if fh is not None:
+                with fh:
+                    yield from _lines_reversed(fh, end, start=start)
+            for segment in self._segments_in_window(before, after):
+                yield from self._segment_reversed(segment, before)
+
+        return _in_window(lines(), before, after)
+
+    def iter_oldest_first(self, after: str) -> Iterator[str]:
+        """Yield serialized records with timestamp > after, oldest first"""
+        def lines() -> Iterator[str]:
+            for segment in self._segments_after(after):
+                yield from self._segment_forward(segment, after)
+            fh, start, end = self._open_active(after=after)
+            if fh is not None:
+                with fh:
+                    fh.seek(start)
+                    while fh.tell() < end:
+                        yield fh.readline().decode("utf-8")
+
+        return _after_cursor(lines(), after)
+
+    def tail(self, limit: int, before: Optional[str] = None, after: Optional[str] = None) -> List[Dict]:
+        """
+        `limit` records in the (after, before) timestamp window, oldest first: the last
+        ones, or with only `after` given, the first ones after it, so a poller that fell
+        behind pages forward without gaps. Cost depends on `limit`, not on how large the
+        log has grown.
+        """
+        if after and not before:
+            return _collect(self.iter_oldest_first(after), limit, newest_first=False)
+        return _collect(self.iter_newest_first(before, after), limit)
+
+    # Indexed queries ------------------------------------------------------
+
+    def _refresh_postings(self) -> None:
+        """Fold sidecar entries written since the last query into the active postings"""
+        generation = self.read_manifest().get("active", {}).get("openedAt")
+        if generation != self._postings_generation:
+            # The active segment was sealed and reopened; start over
+            self._postings, self._postings_position = {}, 0
+            self._offsets, self._timestamps = [], []
+            self._postings_generation = generation
+        try:
+            with self.sidecar_path.open("rb") as fh:
+                fh.seek(self._postings_position)
+                for raw in fh:
+                    if not raw.endswith(b"\n"):
+                        break  # entry still being written; picked up next time
+                    self._postings_position += len(raw)
+                    offset, timestamp, keys = json.loads(raw)
+                    for key in keys:
+                        self._postings.setdefault(key, []).append(offset)
+                    self._offsets.append(offset)
+                    # An unreadable record sorts with the one before it
+                    self._timestamps.append(timestamp or (self._timestamps[-1] if self._timestamps else ""))
+        except OSError:
+            pass
+
+    def _query_active(
+        self, keys: List[str], before: Optional[str] = None, after: Optional[str] = None, forward: bool = False
+    ) -> Iterator[str]:
+        with self._lock:
+            self._refresh_postings()
+            offsets = _intersect([self._postings.get(key, []) for key in keys])
+            if not offsets:
+                return
+            # Cursor bounds bisected from the sidecar timestamps, as byte offsets
+            low = high = None
+            if after:
+                position = bisect.bisect_right(self._timestamps, after)
+                low = self._offsets[position] if position < len(self._offsets) else None
+                if low is None:
+                    return
+            if before:
+                position = bisect.bisect_left(self._timestamps, before)
+                high = self._offsets[position] if position < len(self._offsets) else None
+            # Opened with the postings, so a rotation after this cannot swap the file under them
+            try:
+                fh = self.active_path.open("rb")
+            except OSError:
+                return
+        offsets = [o for o in offsets if (low is None or o >= low) and (high is None or o < high)]
+        with fh:
+            for offset in (reversed(offsets) if forward else offsets):
+                fh.seek(offset)
+                yield fh.readline().decode("utf-8")
+
+    def _query_sealed(
+        self, segment: Dict, keys: List[str], before: Optional[str] = None, after: Optional[str] = None,
+        forward: bool = False,
+    ) -> Iterator[str]:
+        index = self._sealed_index(segment)
+        start, stop = _block_range(index, before=before, after=after)
+        positions = [
+            p for p in _intersect([[tuple(p) for p in index["postings"].get(key, [])] for key in keys])
+            if start <= p[0] < stop
+        ]
+        current, block_lines = None, []
+        with (self.directory / segment["file"]).open("rb") as fh:
+            for block_no, line_no in (reversed(positions) if forward else positions):
+                if block_no != current:
+                    block_lines = _read_block(fh, index["blocks"], block_no)
+                    current = block_no
+                yield block_lines[line_no]
+
+    def query(
+        self,
+        filters: Dict[str, Optional[str]],
+        limit: int,
+        before: Optional[str] = None,
+        after: Optional[str] = None,
+    ) -> List[Dict]:
+        """
+        `limit` records matching every given filter (actorId, eventType, sessionId, stream)
+        in the (after, before) timestamp window, oldest first; which ones follows tail().
+        Matching positions come from the sidecar indexes, so only the matching records are read.
+        """
+        keys = [f"{field}:{value}" for field, value in filters.items() if value and field in INDEXED_FIELDS]
+        if not keys:
+            return self.tail(limit, before, after)
+
+        if after and not before:
+            def forward() -> Iterator[str]:
+                for segment in self._segments_after(after):
+                    if segment.get("index"):
+                        yield from self._query_sealed(segment, keys, after=after, forward=True)
+                yield from self._query_active(keys, after=after, forward=True)
+
+            return _collect(_after_cursor(forward(), after), limit, newest_first=False)
+
+        def lines() -> Iterator[str]:
+            yield from self._query_active(keys, before, after)
+            for segment in self._segments_in_window(before, after):
+                if segment.get("index"):
+                    yield from self._query_sealed(segment, keys, before, after)
+
+        return _collect(_in_window(lines(), before, after), limit)
+
+
+def _block_range(index: Dict, before: Optional[str] = None, after: Optional[str] = None) -> Tuple[int, int]:
+    """
+    Blocks [start, stop) of a sealed segment that can hold after < timestamp < before,
+    from the blocks' first timestamps; every block for indexes written without them
+    """
+    starts = index.get("blockTimestamps")
+    start, stop = 0, len(index["blocks"])
+    if starts:
+        if after:
+            # The block holding the last record at or before `after` may continue past it
+            start = max(0, bisect.bisect_right(starts, after) - 1)
+        if before:
+            stop = bisect.bisect_left(starts, before)
+    return start, stop
+
+
+def _read_block(fh, blocks: List[int], block_no: int) -> List[str]:
+    """Lines of one gzip block of a sealed segment"""
+    fh.seek(blocks[block_no])
+    size = blocks[block_no + 1] - blocks[block_no] if block_no + 1 < len(blocks) else -1
+    return gzip.decompress(fh.read(size)).decode("utf-8").splitlines()
+
+
+def _intersect(postings: List[List]) -> List:
+    """Positions present in every postings list, newest (last written) first"""
+    if not postings or not all(postings):
+        return []
+    shortest = min(postings, key=len)
+    others = [set(p) for p in postings if p is not shortest]
+    return [position for position in reversed(shortest) if all(position in other for other in others)]
+
+
+def _in_window(lines: Iterator[str], before: Optional[str], after: Optional[str]) -> Iterator[str]:
+    """Filter newest-first lines to after < timestamp < before, stopping once past `after`"""
+    for line in lines:
+        if not line.strip():
+            continue
+        timestamp = _timestamp(line)
+        if before and timestamp and timestamp >= before:
+            continue
+        if after and timestamp and timestamp <= after:
+            return
+        yield line
+
+
+def _after_cursor(lines: Iterator[str], after: str) -> Iterator[str]:
+    """Filter oldest-first lines to timestamp > after (the first block read may start earlier)"""
+    for line in lines:
+        if not line.strip():
+            continue
+        timestamp = _timestamp(line)
+        if timestamp and timestamp <= after:
+            continue
+        yield line
+
+
+def _collect(lines: Iterator[str], limit: int, newest_first: bool = True) -> List[Dict]:
+    """Parse up to `limit` lines and return them oldest first"""
+    records = []
+    if limit > 0:
+        for line in lines:
+            records.append(json.loads(line))
+            if len(records) >= limit:
+                break
+    if newest_first:
+        records.reverse()
+    return records
+
+
+def _timestamp(line) -> Optional[str]:
+    """Timestamp of a serialized record (str or bytes), or None if unreadable"""
+    if not line:
+        return None
+    try:
+        return json.loads(line).get("timestamp")
+    except ValueError:
+        return None
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Calibrate item IRT parameters from historical test sessions
+Incremental from the last checkpoint by default; --full refits from every session
+"""
+
+import argparse
+import asyncio
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import MongoDB
+from app.services.calibration import calibrate_items
+
+
+async def main(full: bool):
+    await MongoDB.connect_db()
+    try:
+        print(f"🔄 Calibrating item bank ({'full refit' if full else 'incremental'})...")
+        summary = await calibrate_items(full=full)
+        print(f"✅ Read {summary['sessionsRead']} sessions in {summary['emIterations']} EM iteration(s)")
+        print(f"✅ Wrote adaptiveStats for {summary['itemsCalibrated']} items (watermark {summary['watermark']})")
+    finally:
+        await MongoDB.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--full", action="store_true", help="Refit from all sessions instead of the checkpoint")
+    asyncio.run(main(parser.parse_args().full))
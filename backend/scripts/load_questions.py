@@ -15,6 +15,7 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 from app.database import MongoDB
 from app.models.domain import QuestionMetadata
 from app.database import get_item_bank_collection
+from app.services.item_bank import bump_item_bank_version
 
 
 async def load_questions_from_json():
@@ -78,9 +79,10 @@ async def load_questions_from_json():
                         question = QuestionMetadata(**q_data)
                         
                         # Insert or update (upsert based on questionId)
+                        # Keep calibrated IRT parameters unless the file provides its own
                         await collection.update_one(
                             {"questionId": question.questionId},
-                            {"$set": question.model_dump()},
+                            {"$set": question.model_dump(exclude={"adaptiveStats"} if question.adaptiveStats is None else None)},
                             upsert=True
                         )
                         total_loaded += 1
@@ -94,6 +96,10 @@ async def load_questions_from_json():
                 continue
         
         print(f"\n✅ Successfully loaded {total_loaded} questions into database")
+        if total_loaded:
+            # Running API workers pick the new questions up on their next version check
+            version = await bump_item_bank_version()
+            print(f"📚 Item bank version is now v{version}")
         
         if errors:
             print(f"\n⚠️  {len(errors)} errors encountered:")
@@ -18,7 +18,9 @@ from app.models.domain import (
     ScoreBreakdown, Employer
 )
 from app.services.candidate_service import create_candidate, share_with_employer
+from app.services.eligibility_index import on_report_upserted
 from app.services.employer_service import create_employer
+from app.services.percentiles import PERCENTILES, start_percentile_flusher, stop_percentile_flusher
 from app.database import get_score_reports_collection, get_employers_collection
 from app.utils.time import utc_now_iso
 from app.utils.ids import new_id
@@ -94,20 +96,6 @@ def _calculate_subscores(overall_score: int) -> ScoreBreakdown:
     )
 
 
-def _calculate_percentile(score: int) -> int:
-    """Calculate percentile based on score"""
-    if score >= 90:
-        return int(85 + (score - 90))
-    elif score >= 80:
-        return int(70 + ((score - 80) * 1.5))
-    elif score >= 70:
-        return int(50 + ((score - 70) * 2))
-    elif score >= 60:
-        return int(30 + ((score - 60) * 2))
-    else:
-        return max(5, int(30 - ((60 - score) * 2)))
-
-
 def _get_strengths_weaknesses(score: int, track: str) -> tuple[list[str], list[str]]:
     """Generate strengths and weaknesses based on score"""
     strengths = []
@@ -157,7 +145,9 @@ async def create_candidate_with_scores(candidate_data: dict, employer_ids: list[
         if score > 0:  # Only create report if score exists
             subscores = _calculate_subscores(score)
             strengths, weaknesses = _get_strengths_weaknesses(score, track.value.split('_')[0])
-            percentile = _calculate_percentile(score)
+            # New candidate, so there is no previous score to replace
+            PERCENTILES.record(track, score)
+            percentile = PERCENTILES.percentile(track, score)
             
             report = CandidateScoreReport(
                 candidateId=candidate.id,
@@ -175,6 +165,8 @@ async def create_candidate_with_scores(candidate_data: dict, employer_ids: list[
                 {"$set": report.model_dump()},
                 upsert=True
             )
+    # Reports written directly: bring the candidate's job eligibility rows up to date
+    await on_report_upserted(candidate.id)
     
     return candidate
 
@@ -184,6 +176,7 @@ async def populate_sample_candidates():
     
     print("🚀 Connecting to database...")
     await MongoDB.connect_db()
+    await start_percentile_flusher()
     
     print("\n📝 Creating/Getting demo employer...")
     
@@ -244,6 +237,7 @@ async def populate_sample_candidates():
             print(f"  ❌ Failed to create {candidate_data['name']}: {e}")
             continue
     
+    await stop_percentile_flusher()
     print(f"\n✨ Successfully created {created_count} candidates with scores!")
     print(f"📊 All candidates are shared with all employers")
     print(f"\n🎯 DEMO EMPLOYER ID: {DEMO_EMPLOYER_ID}")
@@ -18,6 +18,7 @@ from app.models.domain import (
     ScoreBreakdown, Employer, JobRequirement
 )
 from app.services.candidate_service import create_candidate, share_with_employer
+from app.services.eligibility_index import on_report_upserted
 from app.services.employer_service import create_employer, upsert_job
 from app.database import get_score_reports_collection
 from app.utils.time import utc_now_iso
@@ -159,6 +160,8 @@ async def populate_sample_data():
         )
         
         await reports_collection.insert_one(score_report.model_dump())
+        # Reports written directly: bring the candidate's job eligibility rows up to date
+        await on_report_upserted(candidate.id, data["track"])
         print(f"  📊 Score: {data['score']}, Percentile: {data['percentile']}")
     
     print("\n✨ Sample data population complete!")
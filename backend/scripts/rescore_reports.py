@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+"""
+Regenerate score reports from submitted sessions after scoring rules change
+Resumes from the last checkpoint by default; --dry-run only prints what would change
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from pathlib import Path
+
+# Add parent directory to path
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from app.database import MongoDB
+from app.services.rescoring import rescore_reports
+
+
+async def main(dry_run: bool, restart: bool):
+    await MongoDB.connect_db()
+    try:
+        print(f"🔄 Re-scoring reports{' (dry run)' if dry_run else ''}...")
+        summary = await rescore_reports(dry_run=dry_run, restart=restart)
+        if summary["resumedFrom"]:
+            print(f"↪️  Resumed after session {summary['resumedFrom']}")
+        print(f"✅ Read {summary['sessionsRead']} sessions; {summary['reportsChanged']} reports changed")
+        if summary["reportsMissing"]:
+            print(f"⚠️  {summary['reportsMissing']} submitted sessions have no report (left untouched)")
+        if dry_run:
+            for diff in summary["diffs"]:
+                print(json.dumps(diff))
+        else:
+            print(f"✅ Updated {summary['percentilesUpdated']} percentiles")
+    finally:
+        await MongoDB.close_db()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--dry-run", action="store_true", help="Show the diffs without writing")
+    parser.add_argument("--restart", action="store_true", help="Ignore the checkpoint and start from the first session")
+    args = parser.parse_args()
+    asyncio.run(main(args.dry_run, args.restart))
@@ -0,0 +1,65 @@
+import sys
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import database
+from backend.app.api import trace as trace_api
+from backend.app.database_fallback import FallbackMongoDB, InMemoryDatabase
+from backend.app.services import employer_service, item_bank, test_engine
+from backend.app.utils import trace_logger
+from backend.app.utils.trace_store import SegmentedLog
+
+
+@pytest.fixture(autouse=True)
+def trace_log(tmp_path, monkeypatch):
+    """Send every trace event logged during a test to tmp_path instead of the tracked logs/ directory"""
+    trace_logger.flush_events()
+    log = SegmentedLog(tmp_path / "logs" / "trace.jsonl")
+    monkeypatch.setattr(trace_logger._writer, "logs", [log])
+    monkeypatch.setattr(trace_logger, "TRACE_LOG", log)
+    monkeypatch.setattr(trace_api, "TRACE_LOG", log)
+    yield log
+    # Events still queued belong to this test's log, not whichever is restored
+    trace_logger.flush_events()
+
+
+@pytest.fixture
+def fallback_db(monkeypatch):
+    """A fresh in-memory database installed as the app's database; the previous one is restored afterwards"""
+    db = InMemoryDatabase()
+    monkeypatch.setattr(FallbackMongoDB, "database", db)
+    monkeypatch.setattr(database.MongoDB, "client", FallbackMongoDB)
+    monkeypatch.setattr(database, "USE_FALLBACK", True)
+    # In-process caches of the previous database's contents
+    monkeypatch.setattr(item_bank, "_snapshot", None)
+    test_engine.SESSION_CACHE.clear()
+    employer_service.EMPLOYER_NAME_CACHE.clear()
+    yield db
+    test_engine.SESSION_CACHE.clear()
+    employer_service.EMPLOYER_NAME_CACHE.clear()
+
+
+def _question_doc(question_id: str, band: str = "medium", **fields) -> dict:
+    return {
+        "questionId": question_id,
+        "trackId": "python_core_v1",
+        "prompt": "What does len([]) return?",
+        "questionType": "mcq",
+        "difficulty": band,
+        "tags": ["basics"],
+        "subskill": "algorithms",
+        "options": ["0", "1"],
+        "answerKey": "0",
+        **fields,
+    }
+
+
+@pytest.fixture
+def make_question():
+    """Factory for item bank documents: an MCQ in the python track whose answer is "0" """
+    return _question_doc
@@ -0,0 +1,80 @@
+import asyncio
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.database_fallback import InMemoryDatabase
+from backend.app.services import calibration, item_bank
+from backend.app.services.cat_engine import probability
+
+TRUE_B = np.array([-1.5, -0.5, 0.0, 0.5, 1.5])
+TRUE_A = np.array([0.8, 1.2, 1.5, 1.0, 1.3])
+
+
+def _question(i: int) -> dict:
+    return {
+        "questionId": f"q{i}",
+        "trackId": "python_core_v1",
+        "prompt": "Pick the answer",
+        "questionType": "mcq",
+        "difficulty": "medium",
+        "tags": ["basics"],
+        "subskill": "algorithms",
+        "answerKey": "right",
+    }
+
+
+async def _simulate_sessions(db: InMemoryDatabase, count: int, rng: np.random.Generator, offset: int = 0) -> None:
+    started = (datetime.now(timezone.utc) - timedelta(days=1)).isoformat()
+    for s in range(count):
+        theta = rng.normal()
+        p = probability(theta, TRUE_A, TRUE_B, 0.0)
+        responses = [
+            {"questionId": f"q{i}", "responseType": "mcq", "answer": "right" if rng.random() < p[i] else "wrong",
+             "code": None, "timeTakenSeconds": 30, "copiedCharacters": 0}
+            for i in range(len(TRUE_B))
+        ]
+        await db.test_sessions.insert_one({"sessionId": f"s{offset + s}", "startedAt": started, "responses": responses})
+
+
+def test_full_calibration_recovers_parameters_and_incremental_run_adds_sessions(fallback_db):
+    rng = np.random.default_rng(7)
+
+    async def scenario():
+        for i in range(len(TRUE_B)):
+            await fallback_db.item_bank.insert_one(_question(i))
+        await _simulate_sessions(fallback_db, 1500, rng)
+
+        summary = await calibration.calibrate_items(full=True)
+        assert summary["sessionsRead"] == 1500 and summary["itemsCalibrated"] == len(TRUE_B)
+        snapshot = await item_bank.get_snapshot()
+        stats = [snapshot.by_id[f"q{i}"].adaptiveStats for i in range(len(TRUE_B))]
+        fitted_b = np.array([s.difficultyEstimate for s in stats])
+        fitted_a = np.array([s.discrimination for s in stats])
+        assert np.abs(fitted_b - TRUE_B).max() < 0.3
+        assert np.abs(fitted_a - TRUE_A).max() < 0.4
+        assert all(s.attempts == 1500 and s.guessing == 0.0 for s in stats)
+
+        # Nothing new since the checkpoint
+        assert (await calibration.calibrate_items())["sessionsRead"] == 0
+
+        # Settled sessions after the watermark are the only ones read next time
+        state = await fallback_db.calibration_state.find_one({"name": calibration.CHECKPOINT_NAME})
+        await fallback_db.calibration_state.update_one(
+            {"name": calibration.CHECKPOINT_NAME},
+            {"$set": {"watermark": (datetime.now(timezone.utc) - timedelta(days=2)).isoformat()}},
+        )
+        await fallback_db.test_sessions.delete_many({})
+        await _simulate_sessions(fallback_db, 200, rng, offset=1500)
+        summary = await calibration.calibrate_items()
+        assert summary["mode"] == "incremental" and summary["sessionsRead"] == 200
+        assert (await item_bank.get_question("q0")).adaptiveStats.attempts == 1700
+        assert state["sessions"] == 1500
+
+    asyncio.run(scenario())
@@ -1,3 +1,4 @@
+import asyncio
 import sys
 from pathlib import Path
 
@@ -7,6 +8,7 @@ ROOT = Path(__file__).resolve().parents[2]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
 
+from backend.app.api.admin import load_questions
 from backend.app.main import app
 from backend.app.state import db
 
@@ -21,8 +23,9 @@ def reset_state():
     db.jobs.clear()
 
 
-def test_candidate_can_complete_python_flow():
+def test_candidate_can_complete_python_flow(fallback_db):
     reset_state()
+    asyncio.run(load_questions())
     resp = client.post(
         "/api/candidates",
         json={"name": "Evelyn", "email": "evelyn@example.com"},
@@ -0,0 +1,119 @@
+import asyncio
+import random
+import sys
+from pathlib import Path
+
+import numpy as np
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import database
+from backend.app.database_fallback import FallbackMongoDB, InMemoryDatabase
+from backend.app.models.domain import AdaptiveStats, DifficultyBand, QuestionMetadata
+from backend.app.services import cat_engine, exposure
+
+
+def _question(question_id: str, difficulty: float, discrimination: float = 1.5) -> QuestionMetadata:
+    return QuestionMetadata(
+        questionId=question_id,
+        trackId="python_core_v1",
+        prompt="Write a function",
+        questionType="coding",
+        difficulty="medium",
+        tags=["basics"],
+        subskill="algorithms",
+        adaptiveStats=AdaptiveStats(
+            averageScore=0.5, discrimination=discrimination, difficultyEstimate=difficulty, attempts=100
+        ),
+    )
+
+
+def _pool() -> cat_engine.ItemPool:
+    return cat_engine.ItemPool([_question(f"q{i}", b) for i, b in enumerate(np.linspace(-2, 2, 9))], version=1)
+
+
+def test_default_parameters_come_from_band_and_options():
+    question = QuestionMetadata(
+        questionId="q", trackId="python_core_v1", prompt="?", questionType="mcq",
+        difficulty="hard", tags=[], subskill="algorithms", options=["a", "b", "c", "d"],
+    )
+    assert cat_engine.item_parameters(question) == (1.0, 1.0, 0.25)
+
+
+def test_information_table_matches_direct_computation():
+    pool = _pool()
+    column = cat_engine.grid_index(0.5)
+    direct = cat_engine.information(cat_engine.THETA_GRID[column], pool.a[:, 0], pool.b[:, 0], pool.c[:, 0])
+    assert np.allclose(pool.info[:, column], direct)
+
+
+def test_estimate_tracks_responses_and_gains_precision():
+    pool = _pool()
+    theta0, se0 = cat_engine.estimate(pool, [])
+    assert abs(theta0) < 1e-9 and abs(se0 - 1) < 0.01
+
+    strong, strong_se = cat_engine.estimate(pool, [("q4", True), ("q6", True), ("q8", True)])
+    weak, _ = cat_engine.estimate(pool, [("q4", False), ("q2", False), ("q0", False)])
+    assert weak < theta0 < strong
+    assert strong_se < se0
+
+
+def test_selects_most_informative_unasked_item():
+    pool = _pool()
+    assert cat_engine.select_item(pool, 0.0, []).questionId == "q4"
+    assert cat_engine.select_item(pool, 1.0, ["q6"]).questionId in {"q5", "q7"}
+    assert cat_engine.select_item(pool, 0.0, [f"q{i}" for i in range(9)]) is None
+
+
+def test_randomesque_selection_spreads_exposure_and_is_seeded():
+    pool = _pool()
+    top = {f"q{i}" for i in range(2, 7)}
+    firsts = {cat_engine.select_item(pool, 0.0, [], random.Random(f"sess-{i}:0")).questionId for i in range(200)}
+    assert firsts == top
+    assert (cat_engine.select_item(pool, 0.0, [], random.Random("sess-1:0")).questionId
+            == cat_engine.select_item(pool, 0.0, [], random.Random("sess-1:0")).questionId)
+
+
+def test_over_exposed_items_are_skipped_until_nothing_else_remains():
+    pool = _pool()
+    rng = random.Random(1)
+    picked = cat_engine.select_item(pool, 0.0, [], rng, lambda qid: qid != "q0")
+    assert picked.questionId == "q0"
+    asked = [q.questionId for q in pool.questions if q.questionId not in {"q1", "q5"}]
+    assert cat_engine.select_item(pool, 0.0, asked, rng, lambda qid: True).questionId == "q5"
+
+
+def test_exposure_counts_cap_items_and_flush_with_inc():
+    FallbackMongoDB.database = InMemoryDatabase()
+    database.MongoDB.client = FallbackMongoDB
+    database.USE_FALLBACK = True
+    counter = exposure.ExposureCounter()
+    for _ in range(exposure.EXPOSURE_MIN_SESSIONS):
+        counter.record("python_core_v1", "q4", first=True)
+    counter.record("python_core_v1", "q5", first=False)
+    assert counter.over_exposed("python_core_v1", "q4")
+    assert not counter.over_exposed("python_core_v1", "q5")
+
+    async def scenario():
+        assert await counter.flush() == 2
+        counter.record("python_core_v1", "q5", first=False)
+        await counter.flush()
+        other_worker = exposure.ExposureCounter()
+        await other_worker.load()
+        return other_worker, await database.get_item_exposure_collection().find_one({"questionId": "q5"})
+
+    other_worker, stored = asyncio.run(scenario())
+    assert stored["exposures"] == 2 and stored["firstExposures"] == 0
+    assert other_worker.sessions == {"python_core_v1": exposure.EXPOSURE_MIN_SESSIONS}
+    assert other_worker.over_exposed("python_core_v1", "q4")
+
+
+def test_stopping_rule_and_band():
+    assert not cat_engine.should_stop(cat_engine.CAT_MIN_ITEMS - 1, 0.01)
+    assert cat_engine.should_stop(cat_engine.CAT_MIN_ITEMS, cat_engine.CAT_TARGET_SE)
+    assert cat_engine.should_stop(cat_engine.CAT_MAX_ITEMS, 1.0)
+    assert cat_engine.band_for_theta(-1.2) == DifficultyBand.easy
+    assert cat_engine.band_for_theta(0.2) == DifficultyBand.medium
+    assert cat_engine.band_for_theta(0.9) == DifficultyBand.hard
@@ -0,0 +1,282 @@
+import asyncio
+import time
+import sys
+from pathlib import Path
+
+import pytest
+from pymongo import ASCENDING, DESCENDING
+from pymongo.errors import DuplicateKeyError, InvalidOperation
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.database_fallback import InMemoryCollection, InMemoryDatabase
+from backend.app.database_wal import DurableStore
+from backend.app.models.domain import SkillTrack
+
+
+def test_unique_index_rejects_duplicates_on_insert_and_update():
+    collection = InMemoryCollection()
+
+    async def scenario():
+        await collection.create_index([("id", ASCENDING)], unique=True)
+        await collection.insert_one({"id": "a"})
+        await collection.insert_one({"id": "b"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"id": "a"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.update_one({"id": "b"}, {"$set": {"id": "a"}})
+        # The failed update left the document and the index untouched
+        assert await collection.find_one({"id": "b"}, {"_id": 0}) == {"id": "b"}
+        await collection.update_one({"id": "b"}, {"$set": {"id": "c"}})
+        return await collection.count_documents({"id": "b"}), await collection.count_documents({"id": "c"})
+
+    assert asyncio.run(scenario()) == (0, 1)
+
+
+def test_multikey_and_compound_indexes_serve_equality_and_in():
+    collection = InMemoryCollection()
+
+    async def scenario():
+        await collection.create_index([("sharedEmployers", ASCENDING)])
+        await collection.create_index([("candidateId", ASCENDING), ("trackId", DESCENDING)])
+        for i in range(1000):
+            await collection.insert_one({
+                "candidateId": f"c{i}",
+                "trackId": SkillTrack.python_core_v1,
+                "sharedEmployers": [f"e{i % 10}", "e-all"],
+            })
+        index = collection.indexes[("sharedEmployers",)]
+        assert len(index.lookup({"sharedEmployers": "e3"})) == 100
+        assert index.lookup({"name": "x"}) is None
+
+        shared = [doc["candidateId"] async for doc in collection.find({"sharedEmployers": {"$in": ["e1", "e2"]}})]
+        assert len(shared) == 200 and shared[:2] == ["c1", "c2"]
+        assert await collection.count_documents({"sharedEmployers": "e-all"}) == 1000
+
+        await collection.update_one({"candidateId": "c5"}, {"$addToSet": {"sharedEmployers": "e-new"}})
+        assert [d["candidateId"] async for d in collection.find({"sharedEmployers": "e-new"})] == ["c5"]
+        found = await collection.find_one({"candidateId": "c7", "trackId": "python_core_v1"})
+        assert found["candidateId"] == "c7"
+
+        await collection.delete_many({"sharedEmployers": "e5"})
+        return await collection.count_documents({"sharedEmployers": "e-all"}), index.lookup({"sharedEmployers": "e5"})
+
+    assert asyncio.run(scenario()) == (900, set())
+
+
+def test_sparse_index_skips_documents_without_the_field():
+    collection = InMemoryCollection()
+
+    async def scenario():
+        await collection.create_index([("email", ASCENDING)], unique=True, sparse=True)
+        await collection.insert_one({"name": "no email"})
+        await collection.insert_one({"name": "also no email"})
+        await collection.insert_one({"email": "a@example.com"})
+        with pytest.raises(DuplicateKeyError):
+            await collection.insert_one({"email": "a@example.com"})
+        return await collection.count_documents({"email": None})
+
+    assert asyncio.run(scenario()) == 2
+
+
+def test_cursor_is_lazy_and_returns_projected_copies():
+    collection = InMemoryCollection()
+
+    async def scenario():
+        for i in range(5):
+            await collection.insert_one({"n": i, "tags": ["x"], "payload": {"big": "y" * 10}})
+        cursor = collection.find({"tags": "x"}, {"n": 1, "tags": 1})
+        # Nothing is read until iteration starts
+        await collection.insert_one({"n": 5, "tags": ["x"], "payload": {}})
+        docs = [doc async for doc in cursor]
+        docs[0]["tags"].append("mutated")
+        docs[0].pop("n")
+        stored = await collection.find_one({"n": 0})
+        with pytest.raises(InvalidOperation):
+            cursor.limit(1)
+        return docs, stored
+
+    docs, stored = asyncio.run(scenario())
+    assert [d.get("n") for d in docs] == [None, 1, 2, 3, 4, 5]
+    assert all("payload" not in d for d in docs)
+    assert stored["tags"] == ["x"] and stored["n"] == 0
+
+
+def test_cursor_sort_skip_limit_and_to_list():
+    collection = InMemoryCollection()
+
+    async def scenario():
+        for i, (track, score) in enumerate([("a", 70), ("b", 90), ("a", 90), ("b", 50), ("a", 80)]):
+            await collection.insert_one({"id": i, "track": track, "score": score})
+        await collection.insert_one({"id": 5, "track": "a"})
+        page = await collection.find({}, {"_id": 0, "id": 1}).sort([("score", DESCENDING), ("id", ASCENDING)]).skip(1).limit(3).to_list(length=None)
+        by_track = await collection.find({"track": "a"}, sort=[("score", ASCENDING)]).batch_size(2).to_list(length=10)
+        cursor = collection.find({}).sort("id", DESCENDING)
+        first_two = await cursor.to_list(length=2)
+        rest = [doc["id"] async for doc in cursor]
+        return page, by_track, first_two, rest
+
+    page, by_track, first_two, rest = asyncio.run(scenario())
+    assert page == [{"id": 2}, {"id": 4}, {"id": 0}]
+    assert [d["id"] for d in by_track] == [5, 0, 4, 2]
+    assert [d["id"] for d in first_two] == [5, 4] and rest == [3, 2, 1, 0]
+
+
+def test_range_and_ne_conditions_on_missing_or_null_fields():
+    collection = InMemoryCollection()
+
+    async def scenario():
+        await collection.insert_many([{"id": 0, "score": 70}, {"id": 1, "score": None}, {"id": 2}, {"id": 3, "score": "high"}])
+
+        async def ids(query):
+            return [doc["id"] async for doc in collection.find(query)]
+
+        return (
+            await ids({"score": {"$gt": 50}}),
+            await ids({"score": {"$ne": 70}}),
+            await ids({"score": {"$ne": None}}),
+            await ids({"score": {"$lte": None}}),
+            await ids({"$or": [{"score": {"$lt": 60}}, {"id": {"$in": [2, 3]}}]}),
+            await ids({"score": {"$nin": [70, "high"]}}),
+            await ids({"score": {"$nin": [None]}}),
+        )
+
+    gt, ne, ne_null, lte_null, either, nin, nin_null = asyncio.run(scenario())
+    assert gt == [0]
+    assert ne == [1, 2, 3]
+    assert ne_null == [0, 3]
+    assert lte_null == [1, 2]
+    assert either == [2, 3]
+    assert nin == [1, 2]
+    assert nin_null == [0, 3]
+
+
+def test_array_update_operators_push_and_add_to_set():
+    collection = InMemoryCollection()
+
+    async def scenario():
+        await collection.insert_one({"id": "a", "tags": ["x"]})
+        await collection.update_one({"id": "a"}, {"$push": {"log": 1}})
+        await collection.update_one({"id": "a"}, {"$push": {"log": {"$each": [2, 3]}}})
+        await collection.update_one({"id": "a"}, {"$addToSet": {"tags": {"$each": ["x", "y"]}}})
+        await collection.update_one({"id": "b"}, {"$push": {"log": 1}, "$set": {"n": 1}}, upsert=True)
+        return await collection.find_one({"id": "a"}), await collection.find_one({"id": "b"})
+
+    a, b = asyncio.run(scenario())
+    assert a == {"id": "a", "tags": ["x", "y"], "log": [1, 2, 3]}
+    assert b == {"id": "b", "log": [1], "n": 1}
+
+
+def test_compound_index_serves_sorted_keyset_pages():
+    collection = InMemoryCollection()
+    rows = [("job-a", score, f"c{i:02d}") for i, score in enumerate([80, 95, 80, 40, 95, 60, 80, 95])]
+
+    async def scenario():
+        await collection.create_index([("jobId", ASCENDING), ("score", DESCENDING), ("candidateId", ASCENDING)])
+        await collection.insert_many([{"jobId": j, "score": s, "candidateId": c} for j, s, c in rows])
+        await collection.insert_one({"jobId": "job-b", "score": 99, "candidateId": "c99"})
+        sort = [("score", DESCENDING), ("candidateId", ASCENDING)]
+        assert collection.indexes[("jobId", "score", "candidateId")].ordered({"jobId": "job-a"}, sort) is not None
+
+        pages, after = [], None
+        while True:
+            query = {"jobId": "job-a", "score": {"$gte": 50}}
+            if after:
+                query["$or"] = [{"score": {"$lt": after[0]}}, {"score": after[0], "candidateId": {"$gt": after[1]}}]
+            page = await collection.find(query, {"_id": 0}).sort(sort).limit(3).to_list(length=None)
+            if not page:
+                return pages
+            pages.append([doc["candidateId"] for doc in page])
+            after = (page[-1]["score"], page[-1]["candidateId"])
+            # Writes between pages keep the index order current
+            await collection.insert_one({"jobId": "job-a", "score": 10, "candidateId": f"late-{len(pages)}"})
+
+    assert asyncio.run(scenario()) == [["c01", "c04", "c07"], ["c00", "c02", "c06"], ["c05"]]
+
+
+def _open(directory):
+    store = DurableStore(directory, commit_interval_ms=1)
+    database = InMemoryDatabase(store)
+    store.load(database)
+    return store, database
+
+
+def test_durable_store_replays_documents_indexes_and_ids(tmp_path):
+    async def write():
+        store, database = _open(tmp_path)
+        await database.jobs.create_index([("id", ASCENDING)], unique=True)
+        await asyncio.gather(*(database.jobs.insert_one({"id": f"job-{i}", "trackId": SkillTrack.python_core_v1}) for i in range(5)))
+        await database.jobs.update_one({"id": "job-1"}, {"$set": {"title": "Backend"}})
+        await database.jobs.delete_one({"id": "job-2"})
+        # No close(): the log alone has to carry everything
+        store._wal.close()
+
+    async def reopen():
+        store, database = _open(tmp_path)
+        with pytest.raises(DuplicateKeyError):
+            await database.jobs.insert_one({"id": "job-0"})
+        inserted = await database.jobs.insert_one({"id": "job-9"})
+        ids = [doc["id"] async for doc in database.jobs.find({}, {"_id": 0, "id": 1})]
+        title = (await database.jobs.find_one({"id": "job-1"}))["title"]
+        track = (await database.jobs.find_one({"trackId": SkillTrack.python_core_v1.value}))["trackId"]
+        await store.close()
+        return ids, title, track, inserted.inserted_id
+
+    asyncio.run(write())
+    ids, title, track, new_id = asyncio.run(reopen())
+    assert ids == ["job-0", "job-1", "job-3", "job-4", "job-9"]
+    assert title == "Backend"
+    assert track == SkillTrack.python_core_v1.value
+    assert new_id == "5"
+
+
+def test_durable_store_compacts_and_drops_a_torn_tail(tmp_path):
+    async def write():
+        store, database = _open(tmp_path)
+        for i in range(3):
+            await database.sessions.insert_one({"sessionId": f"s{i}"})
+        await store.snapshot()
+        await database.sessions.insert_one({"sessionId": "s3"})
+        store._wal.close()
+
+    asyncio.run(write())
+    assert (tmp_path / "snapshot.msgpack").exists()
+    # Only the record written after the snapshot is left in the log; then simulate a crash mid-append
+    with open(tmp_path / "wal.msgpack", "ab") as wal:
+        wal.write(b"\x94\xa3put")
+
+    async def reopen():
+        store, database = _open(tmp_path)
+        sessions = [doc["sessionId"] async for doc in database.sessions.find({})]
+        await database.sessions.insert_one({"sessionId": "s4"})
+        store._wal.close()
+        store, database = _open(tmp_path)
+        return sessions, await database.sessions.count_documents({})
+
+    sessions, count = asyncio.run(reopen())
+    assert sessions == ["s0", "s1", "s2", "s3"]
+    assert count == 5
+
+
+def test_in_queries_at_100k_documents_cost_one_set_lookup_per_value():
+    collection = InMemoryCollection()
+    ids = [f"cand-{i}" for i in range(100_000)]
+
+    async def scenario():
+        await collection.create_index([("candidateId", ASCENDING)])
+        await collection.insert_many([
+            {"candidateId": c, "email": f"{c}@example.com", "trackId": "python_core_v1"} for c in ids
+        ])
+        started = time.perf_counter()
+        # Served by the candidateId index; trackId is checked per candidate
+        indexed = await collection.count_documents({"candidateId": {"$in": ids}, "trackId": {"$in": ["python_core_v1", "sql_core_v1"]}})
+        # No index on email: every document is tested against a 50k-value $in
+        scanned = await collection.count_documents({"email": {"$in": [f"{c}@example.com" for c in ids[::2]]}})
+        return indexed, scanned, time.perf_counter() - started
+
+    indexed, scanned, elapsed = asyncio.run(scenario())
+    assert (indexed, scanned) == (100_000, 50_000)
+    # A linear search of the $in list per document takes minutes here
+    assert elapsed < 5
@@ -0,0 +1,248 @@
+import asyncio
+import sys
+import time
+
+import pytest
+from fastapi import HTTPException
+from pathlib import Path
+from pymongo.errors import BulkWriteError
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import database
+from backend.app.database_fallback import InMemoryDatabase
+from backend.app.models.domain import CandidateProfile, JobRequirement, SkillTrack
+from backend.app.services import candidate_service, eligibility_index, employer_service
+
+
+async def _store_report(db: InMemoryDatabase, candidate_id: str, track: SkillTrack, score: int) -> None:
+    await db.score_reports.update_one(
+        {"candidateId": candidate_id, "trackId": track.value},
+        {"$set": {"overallScore": score}},
+        upsert=True,
+    )
+    await eligibility_index.on_report_upserted(candidate_id, track)
+
+
+def test_index_follows_consent_scores_and_thresholds(fallback_db):
+    async def scenario():
+        employer = await employer_service.create_employer("Acme")
+        strong = await candidate_service.create_candidate(CandidateProfile(name="Ada", email="ada@example.com"))
+        weak = await candidate_service.create_candidate(CandidateProfile(name="Bo", email="bo@example.com"))
+        await _store_report(fallback_db, strong.id, SkillTrack.python_core_v1, 90)
+        await _store_report(fallback_db, weak.id, SkillTrack.python_core_v1, 60)
+        await candidate_service.share_with_employer(strong.id, employer.id)
+
+        job = JobRequirement(
+            jobId="job-py",
+            employerId=employer.id,
+            requiredTracks=[SkillTrack.python_core_v1],
+            minScores={SkillTrack.python_core_v1: 70},
+            preferredExperienceYears=None,
+        )
+        await employer_service.upsert_job(employer.id, job)
+        result = await employer_service.eligible_candidates(employer.id, "job-py")
+        assert [c.candidateId for c in result.eligibleCandidates] == [strong.id]
+
+        # Consent and a better score arrive after the job was indexed
+        await candidate_service.share_with_employer(weak.id, employer.id)
+        assert (await employer_service.eligible_candidates(employer.id, "job-py")).total == 1
+        await _store_report(fallback_db, weak.id, SkillTrack.python_core_v1, 80)
+        result = await employer_service.eligible_candidates(employer.id, "job-py")
+        assert {c.candidateId for c in result.eligibleCandidates} == {strong.id, weak.id}
+
+        # Raising the threshold rematerializes the job
+        job.minScores = {SkillTrack.python_core_v1: 85}
+        await employer_service.upsert_job(employer.id, job)
+        result = await employer_service.eligible_candidates(employer.id, "job-py")
+        assert [c.candidateId for c in result.eligibleCandidates] == [strong.id]
+
+    asyncio.run(scenario())
+
+
+
+def test_rebuild_upserts_in_place_and_tolerates_concurrent_upserts(fallback_db, monkeypatch):
+    async def scenario():
+        employer = await employer_service.create_employer("Acme")
+        ids = []
+        for name, score in [("Ada", 90), ("Bo", 80)]:
+            candidate = await candidate_service.create_candidate(CandidateProfile(name=name, email=f"{name}@example.com"))
+            await _store_report(fallback_db, candidate.id, SkillTrack.python_core_v1, score)
+            await candidate_service.share_with_employer(candidate.id, employer.id)
+            ids.append(candidate.id)
+        job = JobRequirement(
+            jobId="job-py",
+            employerId=employer.id,
+            requiredTracks=[SkillTrack.python_core_v1],
+            minScores={SkillTrack.python_core_v1: 70},
+            preferredExperienceYears=None,
+        )
+        assert await eligibility_index.rebuild_job(job) == 2
+
+        # The rebuild never empties the job's list: rows are only ever deleted by the
+        # final sweep, and only those outside the new set
+        deletes = []
+        collection = fallback_db.job_eligibility
+        delete_many = collection.delete_many
+        monkeypatch.setattr(collection, "delete_many", lambda query: deletes.append(query) or delete_many(query))
+        job.minScores = {SkillTrack.python_core_v1: 85}
+        assert await eligibility_index.rebuild_job(job) == 1
+        assert deletes == [{"jobId": "job-py", "candidateId": {"$nin": [ids[0]]}}]
+        assert [row["candidateId"] for row in await eligibility_index.page_job("job-py", 10)] == [ids[0]]
+
+        # A concurrent _refresh_candidate that upserted the same row first is not an error
+        async def lost_upsert_race(operations, ordered=True):
+            raise BulkWriteError({"writeErrors": [{"index": 0, "code": 11000, "errmsg": "E11000 duplicate key"}]})
+
+        monkeypatch.setattr(collection, "bulk_write", lost_upsert_race)
+        assert await eligibility_index.rebuild_job(job) == 1
+
+    asyncio.run(scenario())
+
+
+def test_candidate_matches_come_from_the_index_best_first(fallback_db):
+    async def scenario():
+        acme = await employer_service.create_employer("Acme")
+        globex = await employer_service.create_employer("Globex")
+        ada = await candidate_service.create_candidate(CandidateProfile(name="Ada", email="ada@example.com"))
+        await _store_report(fallback_db, ada.id, SkillTrack.python_core_v1, 80)
+        await _store_report(fallback_db, ada.id, SkillTrack.sql_core_v1, 95)
+        for employer in (acme, globex):
+            await candidate_service.share_with_employer(ada.id, employer.id)
+
+        for employer, job_id, track in ((acme, "job-py", SkillTrack.python_core_v1), (globex, "job-sql", SkillTrack.sql_core_v1)):
+            await employer_service.upsert_job(employer.id, JobRequirement(
+                jobId=job_id, employerId=employer.id, requiredTracks=[track],
+                minScores={track: 70}, preferredExperienceYears=None,
+            ))
+        # Written before the index existed: materialized on the candidate's first read
+        await fallback_db.jobs.insert_one(JobRequirement(
+            jobId="job-old", employerId=acme.id, requiredTracks=[SkillTrack.sql_core_v1],
+            minScores={SkillTrack.sql_core_v1: 90}, preferredExperienceYears=None,
+        ).model_dump())
+
+        result = await employer_service.candidate_matches(ada.id)
+        ranked = [(m.jobId, m.company) for m in result.recommendedJobs]
+        scores = [m.matchScore for m in result.recommendedJobs]
+
+        await fallback_db.employers.delete_one({"id": globex.id})
+        employer_service.EMPLOYER_NAME_CACHE.invalidate(globex.id)
+        with pytest.raises(HTTPException) as missing:
+            await employer_service.candidate_matches(ada.id)
+        return ranked, scores, missing.value.status_code
+
+    ranked, scores, status = asyncio.run(scenario())
+    assert {job for job, _ in ranked} == {"job-py", "job-sql", "job-old"}
+    assert ("job-sql", "Globex") in ranked
+    assert scores == sorted(scores, reverse=True)
+    # A job whose employer no longer exists is an error, not a silent gap
+    assert status == 404
+
+
+def test_employer_names_are_cached_until_the_employer_is_written(fallback_db, monkeypatch):
+    async def scenario():
+        acme = await employer_service.create_employer("Acme")
+        ada = await candidate_service.create_candidate(CandidateProfile(name="Ada", email="ada@example.com"))
+        await _store_report(fallback_db, ada.id, SkillTrack.python_core_v1, 80)
+        await candidate_service.share_with_employer(ada.id, acme.id)
+        job = JobRequirement(
+            jobId="job-py", employerId=acme.id, requiredTracks=[SkillTrack.python_core_v1],
+            minScores={SkillTrack.python_core_v1: 70}, preferredExperienceYears=None,
+        )
+        await employer_service.upsert_job(acme.id, job)
+
+        reads = []
+        employers = fallback_db.employers
+        find, find_one = employers.find, employers.find_one
+        monkeypatch.setattr(employers, "find", lambda *a, **k: reads.append(a) or find(*a, **k))
+        monkeypatch.setattr(employers, "find_one", lambda *a, **k: reads.append(a) or find_one(*a, **k))
+
+        first = await employer_service.candidate_matches(ada.id)
+        assert [m.company for m in first.recommendedJobs] == ["Acme"]
+        assert len(reads) == 1
+        # Served from EMPLOYER_NAME_CACHE: no employer read at all
+        second = await employer_service.candidate_matches(ada.id)
+        assert [m.company for m in second.recommendedJobs] == ["Acme"]
+        assert len(reads) == 1
+
+        # A write through the service evicts the entry, so the next read sees the new name
+        await employers.update_one({"id": acme.id}, {"$set": {"name": "Acme Corp"}})
+        await employer_service.upsert_job(acme.id, job)
+        assert acme.id not in employer_service.EMPLOYER_NAME_CACHE
+        reads.clear()
+        third = await employer_service.candidate_matches(ada.id)
+        assert [m.company for m in third.recommendedJobs] == ["Acme Corp"]
+        assert len(reads) == 1
+
+    asyncio.run(scenario())
+
+def test_eligible_pages_follow_cursor_in_rank_order(fallback_db):
+    async def scenario():
+        employer = await employer_service.create_employer("Acme")
+        job = JobRequirement(
+            jobId="job-any",
+            employerId=employer.id,
+            requiredTracks=[SkillTrack.sql_core_v1],
+            minScores={SkillTrack.sql_core_v1: 0},
+            preferredExperienceYears=None,
+        )
+        await employer_service.upsert_job(employer.id, job)
+        scores = {"c-a": 80, "c-b": 95, "c-c": 80, "c-d": 40, "c-e": 95, "c-f": 60}
+        for candidate_id, score in scores.items():
+            await fallback_db.job_eligibility.insert_one({
+                "jobId": "job-any", "candidateId": candidate_id, "name": candidate_id,
+                "trackScores": {"sql_core_v1": score}, "matchScore": score,
+            })
+
+        seen, cursor = [], None
+        while True:
+            page = await employer_service.eligible_candidates(
+                employer.id, "job-any", limit=4, min_match_score=50, cursor=cursor
+            )
+            # Counted once, on the first page
+            assert page.total == (5 if cursor is None else None)
+            seen.extend(c.candidateId for c in page.eligibleCandidates)
+            cursor = page.nextCursor
+            if not cursor:
+                break
+        assert seen == ["c-b", "c-e", "c-a", "c-c", "c-f"]
+
+    asyncio.run(scenario())
+
+
+def test_deep_pages_at_100k_candidates_cost_one_page_each(fallback_db):
+    async def scenario():
+        await database._create_indexes(fallback_db)
+        employer = await employer_service.create_employer("Acme")
+        job = JobRequirement(
+            jobId="job-big",
+            employerId=employer.id,
+            requiredTracks=[SkillTrack.sql_core_v1],
+            minScores={SkillTrack.sql_core_v1: 0},
+            preferredExperienceYears=None,
+        )
+        await employer_service.upsert_job(employer.id, job)
+        await fallback_db.job_eligibility.insert_many([
+            {
+                "jobId": "job-big", "candidateId": f"c{i:06d}", "name": f"c{i}",
+                "trackScores": {"sql_core_v1": i % 101}, "matchScore": i % 101,
+            }
+            for i in range(100_000)
+        ])
+        first = await employer_service.eligible_candidates(employer.id, "job-big", limit=50)
+
+        started = time.perf_counter()
+        cursor = employer_service._encode_cursor(50, "c050000")
+        for _ in range(20):
+            page = await employer_service.eligible_candidates(employer.id, "job-big", limit=50, cursor=cursor)
+            cursor = page.nextCursor
+        return first, page, time.perf_counter() - started
+
+    first, page, elapsed = asyncio.run(scenario())
+    assert first.total == 100_000 and first.eligibleCandidates[0].matchScore == 100
+    assert len(page.eligibleCandidates) == 50 and page.total is None
+    assert all(c.matchScore <= 50 for c in page.eligibleCandidates)
+    # Scanning the job's rows for each page takes seconds here
+    assert elapsed < 1
@@ -0,0 +1,58 @@
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.models.domain import DifficultyBand, SkillTrack
+from backend.app.services import item_bank
+
+
+def test_snapshot_indexes_by_track_and_band(fallback_db, make_question):
+    async def scenario():
+        await fallback_db.item_bank.insert_one(make_question("q-easy", "easy"))
+        await fallback_db.item_bank.insert_one(make_question("q-hard", "hard"))
+        snapshot = await item_bank.refresh_item_bank()
+
+        easy = await item_bank.get_questions_for_track(SkillTrack.python_core_v1, DifficultyBand.easy)
+        everything = await item_bank.get_questions_for_track(SkillTrack.python_core_v1)
+        assert [q.questionId for q in easy] == ["q-easy"]
+        assert [q.questionId for q in everything] == ["q-easy", "q-hard"]
+        assert item_bank.snapshot_version() == snapshot.version
+
+        # Items written behind the snapshot's back are picked up on lookup
+        await fallback_db.item_bank.insert_one(make_question("q-new", "medium"))
+        assert (await item_bank.get_question("q-new")).questionId == "q-new"
+        assert item_bank.snapshot_version() == snapshot.version
+        assert await item_bank.get_question("missing") is None
+
+    asyncio.run(scenario())
+
+
+def test_snapshot_reloads_when_another_process_bumps_the_version(fallback_db, make_question, monkeypatch):
+    async def scenario():
+        await fallback_db.item_bank.insert_one(make_question("q1"))
+        snapshot = await item_bank.refresh_item_bank()
+        assert snapshot.version == 0
+
+        # Another process (e.g. scripts/calibrate_items.py) writes and bumps the shared version
+        await fallback_db.item_bank.find_one_and_update(
+            {"questionId": "q1"}, {"$set": {"adaptiveStats": {
+                "averageScore": 0.4, "discrimination": 1.2, "difficultyEstimate": 1.5, "attempts": 40,
+            }}}
+        )
+        assert await item_bank.bump_item_bank_version() == 1
+
+        # Within the check interval the cached snapshot is served without a read
+        monkeypatch.setattr(item_bank, "ITEM_BANK_VERSION_CHECK_SECONDS", 3600)
+        assert await item_bank.get_snapshot() is snapshot
+
+        monkeypatch.setattr(item_bank, "ITEM_BANK_VERSION_CHECK_SECONDS", 0)
+        reloaded = await item_bank.get_snapshot()
+        assert reloaded.version == 1
+        assert reloaded.by_id["q1"].adaptiveStats.difficultyEstimate == 1.5
+        assert await item_bank.get_snapshot() is reloaded
+
+    asyncio.run(scenario())
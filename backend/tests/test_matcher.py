@@ -0,0 +1,66 @@
+import random
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.models.domain import JobRequirement, SkillTrack
+from backend.app.services import matcher
+
+
+def _reference(job: JobRequirement, track_scores: dict) -> tuple[bool, int]:
+    """Per-candidate loop the matcher replaces"""
+    for track in job.requiredTracks:
+        threshold = job.minScores.get(track)
+        if track not in track_scores or threshold is None or track_scores[track] < threshold:
+            return False, 0
+    components = [
+        min(int(track_scores[t] / max(job.minScores.get(t, 1), 1) * 100), 120)
+        for t in job.requiredTracks
+    ]
+    avg = int(sum(components) / len(components)) if components else 0
+    return True, min(avg, 100)
+
+
+def _random_job(rng: random.Random, job_id: str) -> JobRequirement:
+    tracks = rng.sample(list(SkillTrack), rng.randint(1, len(SkillTrack)))
+    return JobRequirement(
+        jobId=job_id,
+        employerId="emp-1",
+        requiredTracks=tracks,
+        minScores={t: rng.choice([0, 1, 30, 55, 70, 90]) for t in tracks if rng.random() > 0.1},
+        preferredExperienceYears=None,
+    )
+
+
+def _random_scores(rng: random.Random) -> dict:
+    return {t: rng.randint(0, 100) for t in SkillTrack if rng.random() > 0.2}
+
+
+def test_matrix_agrees_with_per_candidate_loop():
+    rng = random.Random(7)
+    jobs = [_random_job(rng, f"job-{i}") for i in range(25)]
+    candidates = [_random_scores(rng) for _ in range(400)]
+
+    for job in jobs:
+        eligible, match = matcher.score_job(job, candidates)
+        for i, scores in enumerate(candidates):
+            assert (bool(eligible[i]), int(match[i])) == _reference(job, scores)
+
+    eligible, match = matcher.score_jobs(jobs, candidates[0])
+    for j, job in enumerate(jobs):
+        assert (bool(eligible[j]), int(match[j])) == _reference(job, candidates[0])
+
+
+def test_explanation_lists_each_required_track():
+    job = JobRequirement(
+        jobId="job-1",
+        employerId="emp-1",
+        requiredTracks=[SkillTrack.python_core_v1, SkillTrack.sql_core_v1],
+        minScores={SkillTrack.python_core_v1: 70, SkillTrack.sql_core_v1: 60},
+        preferredExperienceYears=None,
+    )
+    scores = {SkillTrack.python_core_v1: 80, SkillTrack.sql_core_v1: 65}
+    assert matcher.explain(job, scores) == "python_core_v1: 80/70; sql_core_v1: 65/60"
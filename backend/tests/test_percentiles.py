@@ -0,0 +1,63 @@
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.models.domain import SkillTrack
+from backend.app.services import percentiles
+
+TRACK = SkillTrack.python_core_v1
+
+
+def test_static_table_lookup():
+    assert percentiles.static_percentile(10) == 50
+    assert percentiles.static_percentile(50) == 60
+    assert percentiles.static_percentile(89) == 90
+    assert percentiles.static_percentile(100) == 95
+
+
+def test_mid_rank_percentile_matches_direct_count():
+    distribution = percentiles.ScoreDistribution()
+    scores = [(7 * i) % 101 for i in range(500)]
+    for score in scores:
+        distribution.add(score)
+    for probe in (0, 13, 50, 77, 100):
+        below = sum(s < probe for s in scores)
+        equal = sum(s == probe for s in scores)
+        assert distribution.percentile(probe) == round(100 * (below + 0.5 * equal) / len(scores))
+
+
+def test_small_population_uses_static_table_and_retakes_replace_scores():
+    engine = percentiles.PercentileEngine()
+    engine.record(TRACK, 90)
+    assert engine.percentile(TRACK, 90) == percentiles.static_percentile(90)
+
+    for score in range(percentiles.PERCENTILE_MIN_POPULATION):
+        engine.record(TRACK, score)
+    assert engine.percentile(TRACK, 90) > 95
+    engine.record(TRACK, 10, previous=90)
+    assert engine.distributions[TRACK].total == percentiles.PERCENTILE_MIN_POPULATION + 1
+    assert engine.percentile(TRACK, 90) == 100
+
+
+def test_snapshot_is_shared_through_inc_and_rebuilt_from_reports(fallback_db):
+    async def scenario():
+        first, second = percentiles.PercentileEngine(), percentiles.PercentileEngine()
+        first.record(TRACK, 70)
+        second.record(TRACK, 80)
+        second.record(TRACK, 80)
+        await first.flush()
+        await second.flush()
+        await first.load()
+        assert first.distributions[TRACK].total == second.distributions[TRACK].total == 3
+
+        for i, score in enumerate((40, 60, 60)):
+            await fallback_db.score_reports.insert_one({"candidateId": f"c{i}", "trackId": TRACK.value, "overallScore": score})
+        assert await first.rebuild() == 3
+        stored = {doc["score"]: doc["count"] async for doc in fallback_db.percentile_sketches.find({})}
+        assert stored == {40: 1, 60: 2}
+
+    asyncio.run(scenario())
@@ -0,0 +1,133 @@
+import asyncio
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.database_fallback import InMemoryDatabase
+from backend.app.services import rescoring
+
+QUESTION = {
+    "questionId": "q-1",
+    "trackId": "python_core_v1",
+    "prompt": "What does len([]) return?",
+    "questionType": "mcq",
+    "difficulty": "medium",
+    "tags": ["basics"],
+    "subskill": "algorithms",
+    "options": ["0", "1"],
+    "answerKey": "0",
+}
+
+
+def _session(session_id: str, candidate_id: str, answer: str, started_at: str) -> dict:
+    return {
+        "sessionId": session_id,
+        "candidateId": candidate_id,
+        "trackId": "python_core_v1",
+        "status": "submitted",
+        "questionIds": ["q-1"],
+        "responses": [{"questionId": "q-1", "responseType": "mcq", "answer": answer, "code": None, "timeTakenSeconds": 10}],
+        "startedAt": started_at,
+        "expiresAt": started_at,
+    }
+
+
+def _report(candidate_id: str, overall: int, **fields) -> dict:
+    return {
+        "candidateId": candidate_id,
+        "trackId": "python_core_v1",
+        "overallScore": overall,
+        "subscores": {"algorithms": overall, "data_structures": 0, "code_quality": 0},
+        "percentile": 50,
+        "strengths": [],
+        "weaknesses": [],
+        "completedAt": "2025-01-01T00:00:00+00:00",
+        **fields,
+    }
+
+
+async def _seed(db: InMemoryDatabase) -> None:
+    await db.item_bank.insert_one(dict(QUESTION))
+    # cand-a retook the track: only the newer (correct) session counts
+    await db.test_sessions.insert_one(_session("sess-a1", "cand-a", "0", "2025-01-02T00:00:00+00:00"))
+    await db.test_sessions.insert_one(_session("sess-a0", "cand-a", "1", "2025-01-01T00:00:00+00:00"))
+    await db.test_sessions.insert_one(_session("sess-b", "cand-b", "1", "2025-01-01T00:00:00+00:00"))
+    await db.test_sessions.insert_one(_session("sess-c", "cand-c", "0", "2025-01-01T00:00:00+00:00"))
+    # Stale scores from older rules; cand-a's report predates sessionId tracking
+    await db.score_reports.insert_one(_report("cand-a", 90))
+    await db.score_reports.insert_one(_report(
+        "cand-b", 0, weaknesses=["algorithms", "data_structures", "code_quality", "basics"],
+        sessionId="sess-b", sessionStartedAt="2025-01-01T00:00:00+00:00",
+    ))
+
+
+def test_dry_run_reports_diffs_without_writing(fallback_db):
+    async def scenario():
+        await _seed(fallback_db)
+        summary = await rescoring.rescore_reports(dry_run=True)
+        report = await fallback_db.score_reports.find_one({"candidateId": "cand-a"})
+        return summary, report
+
+    summary, report = asyncio.run(scenario())
+    assert summary["sessionsRead"] == 4 and summary["reportsMissing"] == 1
+    assert summary["reportsChanged"] == 1
+    [diff] = summary["diffs"]
+    assert diff["sessionId"] == "sess-a1" and diff["changes"]["overallScore"] == [90, 40]
+    assert report["overallScore"] == 90 and "sessionId" not in report
+
+
+def test_rescore_rewrites_reports_and_resumes_from_checkpoint(fallback_db):
+    rescoring.RESCORE_BATCH_SIZE, batch_size = 2, rescoring.RESCORE_BATCH_SIZE
+
+    async def scenario():
+        await _seed(fallback_db)
+        # An interrupted run already handled sess-a0 and sess-a1
+        await fallback_db.rescore_state.insert_one({"name": rescoring.CHECKPOINT_NAME, "phase": "reports", "lastSessionId": "sess-a1", "sessionsRead": 2})
+        resumed = await rescoring.rescore_reports()
+        untouched = await fallback_db.score_reports.find_one({"candidateId": "cand-a"})
+        full = await rescoring.rescore_reports()
+        rescored = await fallback_db.score_reports.find_one({"candidateId": "cand-a"})
+        state = await fallback_db.rescore_state.find_one({"name": rescoring.CHECKPOINT_NAME})
+        return resumed, untouched, full, rescored, state
+
+    try:
+        resumed, untouched, full, rescored, state = asyncio.run(scenario())
+    finally:
+        rescoring.RESCORE_BATCH_SIZE = batch_size
+    assert resumed["resumedFrom"] == "sess-a1" and resumed["sessionsRead"] == 4
+    assert untouched["overallScore"] == 90
+    assert full["resumedFrom"] is None and full["reportsChanged"] == 1
+    assert rescored["overallScore"] == 40 and rescored["sessionId"] == "sess-a1"
+    assert rescored["completedAt"] == "2025-01-01T00:00:00+00:00"
+    assert state["phase"] == "done"
+
+
+def test_retakes_split_across_batches_are_rescored_once(fallback_db, monkeypatch):
+    # One session per batch: cand-a's two sessions land in different batches
+    monkeypatch.setattr(rescoring, "RESCORE_BATCH_SIZE", 1)
+
+    async def scenario():
+        await _seed(fallback_db)
+        return await rescoring.rescore_reports(dry_run=True)
+
+    summary = asyncio.run(scenario())
+    assert summary["sessionsRead"] == 4 and summary["reportsChanged"] == 1
+    assert [diff["sessionId"] for diff in summary["diffs"]] == ["sess-a1"]
+
+
+def test_background_run_records_its_summary_under_the_job_id(fallback_db):
+    async def scenario():
+        await _seed(fallback_db)
+        job_id = await rescoring.start_rescore()
+        task = rescoring._runs[job_id]
+        running = await rescoring.get_rescore_job(job_id)
+        await task
+        return job_id, running, await rescoring.get_rescore_job(job_id), rescoring.running_rescore()
+
+    job_id, running, finished, still_running = asyncio.run(scenario())
+    assert running["status"] == "running" and running["jobId"] == job_id
+    assert finished["status"] == "done" and finished["summary"]["reportsChanged"] == 1
+    assert still_running is None
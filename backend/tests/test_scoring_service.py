@@ -0,0 +1,61 @@
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app import database
+from backend.app.models import domain
+from backend.app.models.domain import CandidateResponse, SkillTrack
+from backend.app.services import item_bank
+from backend.app.services.scoring_service import finalize_session, get_track_scores
+
+
+def test_track_scores_for_100k_candidates_come_from_one_bulk_read(fallback_db):
+    candidate_ids = [f"cand-{i}" for i in range(100_000)]
+
+    async def scenario():
+        await database._create_indexes(fallback_db)
+        await fallback_db.score_reports.insert_many([
+            {"candidateId": c, "trackId": "python_core_v1", "overallScore": i % 101} for i, c in enumerate(candidate_ids)
+        ])
+        await fallback_db.score_reports.insert_one({"candidateId": "cand-7", "trackId": "sql_core_v1", "overallScore": 55})
+        started = time.perf_counter()
+        scores = await get_track_scores(candidate_ids, ["python_core_v1", "sql_core_v1"])
+        return scores, time.perf_counter() - started
+
+    scores, elapsed = asyncio.run(scenario())
+    assert len(scores) == 100_000
+    assert scores["cand-7"] == {SkillTrack.python_core_v1: 7, SkillTrack.sql_core_v1: 55}
+    assert scores["cand-99999"] == {SkillTrack.python_core_v1: 99999 % 101}
+    assert elapsed < 3
+
+
+def test_a_late_submit_of_an_older_session_does_not_replace_a_newer_report(fallback_db, make_question):
+    async def scenario():
+        await fallback_db.item_bank.insert_one(make_question("q-1"))
+        await item_bank.refresh_item_bank()
+        for session_id, answer, started_at in (("sess-old", "1", "2025-01-01T00:00:00+00:00"), ("sess-new", "0", "2025-01-02T00:00:00+00:00")):
+            await fallback_db.test_sessions.insert_one(domain.TestSession(
+                sessionId=session_id,
+                candidateId="cand-1",
+                trackId=SkillTrack.python_core_v1,
+                status="responses_complete",
+                questionIds=["q-1"],
+                responses=[CandidateResponse(questionId="q-1", responseType="mcq", answer=answer, code=None, timeTakenSeconds=10)],
+                startedAt=started_at,
+                expiresAt=started_at,
+            ).model_dump())
+        await finalize_session("sess-new")
+        late = await finalize_session("sess-old")
+        reports = await fallback_db.score_reports.find({"candidateId": "cand-1"}).to_list(length=None)
+        return late, reports
+
+    late, reports = asyncio.run(scenario())
+    # The older session is still scored for its caller, but the stored report stays the newer one
+    assert late.sessionId == "sess-old"
+    [stored] = reports
+    assert stored["sessionId"] == "sess-new" and stored["overallScore"] > late.overallScore
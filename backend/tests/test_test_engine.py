@@ -0,0 +1,127 @@
+import asyncio
+import sys
+from pathlib import Path
+
+import pytest
+from fastapi import HTTPException
+from pymongo import ReturnDocument
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.database_fallback import InMemoryDatabase
+from backend.app.models import domain
+from backend.app.models.domain import CandidateResponse, SkillTrack
+from backend.app.services import item_bank, test_engine
+from backend.app.utils.time import minutes_from_now_iso, utc_now_iso
+
+
+async def _start_session(db: InMemoryDatabase, make_question) -> str:
+    for i, band in enumerate(["easy", "medium", "medium", "hard"]):
+        stats = {"averageScore": 0.5, "discrimination": 1.0, "difficultyEstimate": i - 1.5, "attempts": 50}
+        await db.item_bank.insert_one(make_question(f"q-{i}", band, adaptiveStats=stats))
+    await item_bank.refresh_item_bank()
+    session = domain.TestSession(
+        sessionId="sess-1",
+        candidateId="cand-1",
+        trackId=SkillTrack.python_core_v1,
+        status="in_progress",
+        startedAt=utc_now_iso(),
+        expiresAt=minutes_from_now_iso(30),
+    )
+    await db.test_sessions.insert_one(session.model_dump())
+    return session.sessionId
+
+
+def _answer(question_id: str, answer: str) -> CandidateResponse:
+    return CandidateResponse(questionId=question_id, responseType="mcq", answer=answer, code=None, timeTakenSeconds=10)
+
+
+def test_session_updates_append_questions_and_responses(fallback_db, make_question):
+    async def scenario():
+        session_id = await _start_session(fallback_db, make_question)
+        block = await test_engine.next_question(session_id)
+        for answer in ["0", "1", "0"]:
+            result = await test_engine.submit_response(session_id, _answer(block["question"]["questionId"], answer))
+            block = result["next"]
+            # The next question is assigned by the same write and served without a /next call
+            assert (await test_engine.next_question(session_id))["question"] == block["question"]
+
+        session = await test_engine.get_session(session_id)
+        assert len(session.questionIds) == len(set(session.questionIds)) == 4
+        assert [r.questionId for r in session.responses] == session.questionIds[:3]
+        assert [r.answer for r in session.responses] == ["0", "1", "0"]
+        assert session.currentQuestionId == session.questionIds[3] == block["question"]["questionId"]
+        assert "answerKey" not in block["question"]
+        assert "adaptiveStats" not in block["question"]
+
+        result = await test_engine.submit_response(session_id, _answer(block["question"]["questionId"], "0"))
+        assert result["next"] is None
+        assert (await test_engine.get_session(session_id)).status == "responses_complete"
+
+    asyncio.run(scenario())
+
+
+def test_concurrent_transitions_do_not_lose_or_duplicate_responses(fallback_db, make_question):
+    async def scenario():
+        session_id = await _start_session(fallback_db, make_question)
+        first, second = await asyncio.gather(test_engine.next_question(session_id), test_engine.next_question(session_id))
+        assert first["question"]["questionId"] == second["question"]["questionId"]
+        question_id = first["question"]["questionId"]
+
+        stale = await test_engine.get_session(session_id)
+        await test_engine.submit_response(session_id, _answer(question_id, "0"))
+        with pytest.raises(HTTPException) as exc:
+            await test_engine.submit_response(session_id, _answer(question_id, "1"))
+        assert exc.value.status_code == 409
+        # A writer holding an old version cannot overwrite the newer state
+        assert await test_engine.transition_session(stale, {}, {"$set": {"currentBand": "hard"}}) is None
+
+        session = await test_engine.get_session(session_id)
+        assert [r.answer for r in session.responses] == ["0"]
+        assert session.version == stale.version + 1
+
+    asyncio.run(scenario())
+
+
+def test_session_cache_is_write_through_and_recovers_from_other_writers(fallback_db, make_question, monkeypatch):
+    async def scenario():
+        session_id = await _start_session(fallback_db, make_question)
+        question_id = (await test_engine.next_question(session_id))["question"]["questionId"]
+        cached = test_engine.SESSION_CACHE.get(session_id)
+        assert cached.currentQuestionId == question_id
+
+        # A cache hit makes no database read
+        reads = []
+        find_one = fallback_db.test_sessions.find_one
+        monkeypatch.setattr(fallback_db.test_sessions, "find_one", lambda *a, **k: reads.append(a) or find_one(*a, **k))
+        assert await test_engine.get_session(session_id) is cached
+        assert reads == []
+
+        # Another worker records the answer and assigns the next question behind our cache
+        other = await fallback_db.test_sessions.find_one_and_update(
+            {"sessionId": session_id},
+            {
+                "$push": {"responses": _answer(question_id, "0").model_dump()},
+                "$set": {"currentQuestionId": "q-0" if question_id != "q-0" else "q-1"},
+                "$addToSet": {"questionIds": "q-0" if question_id != "q-0" else "q-1"},
+                "$inc": {"version": 1},
+            },
+            return_document=ReturnDocument.AFTER,
+        )
+        assert await test_engine.get_session(session_id) is cached
+
+        # Answering the question the other worker served reloads our stale copy and lands
+        result = await test_engine.submit_response(session_id, _answer(other["currentQuestionId"], "1"))
+        assert result["status"] == "recorded"
+        fresh = await test_engine.get_session(session_id)
+        assert [r.questionId for r in fresh.responses] == [question_id, other["currentQuestionId"]]
+        assert fresh.version == cached.version + 2
+
+        await fallback_db.test_sessions.update_one({"sessionId": session_id}, {"$set": {"status": "submitted"}})
+        test_engine.SESSION_CACHE.clear()
+        await test_engine.get_session(session_id)
+        assert session_id not in test_engine.SESSION_CACHE
+
+    asyncio.run(scenario())
@@ -0,0 +1,254 @@
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+
+from pymongo.errors import BulkWriteError
+
+ROOT = Path(__file__).resolve().parents[2]
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
+
+from backend.app.api import trace as trace_api
+from backend.app.utils import trace_logger, trace_store
+from backend.app.utils.trace_logger import TraceWriter
+from backend.app.utils.trace_sink import DUPLICATE_KEY, MongoTraceSink
+from backend.app.utils.trace_store import SegmentedLog, TraceEntry, index_keys, read_lines_reversed
+
+
+def _entry(record):
+    return TraceEntry(record["timestamp"], json.dumps(record) + "\n", index_keys(record), record)
+
+
+def test_writer_flushes_on_demand_and_on_stop(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    writer = TraceWriter([SegmentedLog(path)], batch_size=4, flush_interval=60)
+    for i in range(10):
+        writer.submit(_entry({"timestamp": f"t{i}", "n": i}))
+    writer.flush()
+    assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == list(range(10))
+    writer.submit(_entry({"timestamp": "t10", "n": 10}))
+    writer.stop()
+    assert len(path.read_text().splitlines()) == 11
+
+
+def test_drop_policy_counts_discarded_events_and_records_them(tmp_path):
+    log = SegmentedLog(tmp_path / "trace.jsonl")
+    writer = TraceWriter([log], max_buffered=1, backpressure="drop")
+    writer._thread = type("Busy", (), {"is_alive": lambda self: True})()  # writer never drains
+    writer.submit(_entry({"timestamp": "t1", "n": 1}))
+    writer.submit(_entry({"timestamp": "t2", "n": 2}))
+    assert writer.dropped == 1
+
+    # The next write carries a trace.dropped event with the count
+    writer._thread = None
+    writer.start()
+    writer.flush()
+    writer.submit(_entry({"timestamp": "t3", "n": 3}))
+    writer.stop()
+    records = [json.loads(line) for line in log.active_path.read_text().splitlines()]
+    assert [r.get("n") for r in records] == [1, None, 3]
+    assert records[1]["eventType"] == "trace.dropped" and records[1]["payload"] == {"dropped": 1}
+
+
+def test_block_policy_waits_a_bounded_time_then_overflows_without_loss(tmp_path):
+    log = SegmentedLog(tmp_path / "trace.jsonl")
+    writer = TraceWriter([log], max_buffered=1, backpressure="block", block_timeout=0.01)
+    writer._thread = type("Busy", (), {"is_alive": lambda self: True})()  # writer never drains
+    writer.submit(_entry({"timestamp": "t1", "n": 1}))
+    started = time.monotonic()
+    for n in (2, 3, 4):
+        writer.submit(_entry({"timestamp": f"t{n}", "n": n}))
+    assert time.monotonic() - started < 1
+    assert writer.dropped == 0 and writer.overflowed == 1
+
+    # Once the writer runs, the overflow is written after the queue, in submission order
+    writer._thread = None
+    writer.start()
+    writer.flush()
+    writer.stop()
+    assert [json.loads(line)["n"] for line in log.active_path.read_text().splitlines()] == [1, 2, 3, 4]
+
+
+def test_fresh_reads_include_events_still_buffered(trace_log):
+    trace_logger.log_event("test.ping", "actor-1", {})
+    events = asyncio.run(trace_api._find_events({"actorId": "actor-1"}, 10, None, None, fresh=True))
+    assert [e["eventType"] for e in events] == ["test.ping"]
+
+def test_segments_rotate_compress_and_tail_across_them(tmp_path):
+    log = SegmentedLog(tmp_path / "trace.jsonl", max_bytes=200)
+    for i in range(12):
+        timestamp = f"2026-01-01T00:00:{i:02d}"
+        log.append([_entry({"timestamp": timestamp, "n": i})] * 2)
+
+    segments = log.sealed_segments()
+    assert segments and all((tmp_path / s["file"]).exists() for s in segments)
+    assert segments[0]["firstTimestamp"] == "2026-01-01T00:00:00"
+    assert sum(s["records"] for s in segments) + len(log.read_active()) == 24
+
+    assert [r["n"] for r in log.tail(3)] == [10, 11, 11]
+    assert len(log.tail(24)) == 24
+
+
+def test_reverse_reader_handles_lines_spanning_blocks(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    lines = [json.dumps({"n": i, "pad": "x" * (i * 7)}) for i in range(50)]
+    path.write_text("\n".join(lines) + "\n")
+    assert list(read_lines_reversed(path, block_size=16)) == lines[::-1]
+
+
+def test_tail_pages_with_before_and_after_cursors(tmp_path):
+    log = SegmentedLog(tmp_path / "trace.jsonl", max_bytes=300)
+    for i in range(30):
+        timestamp = f"2026-01-01T00:00:{i:02d}"
+        log.append([_entry({"timestamp": timestamp, "n": i})])
+
+    page = log.tail(5)
+    assert [r["n"] for r in page] == [25, 26, 27, 28, 29]
+    older = log.tail(5, before=page[0]["timestamp"])
+    assert [r["n"] for r in older] == [20, 21, 22, 23, 24]
+    oldest = log.tail(100, before="2026-01-01T00:00:03")
+    assert [r["n"] for r in oldest] == [0, 1, 2]
+    newer = log.tail(100, after="2026-01-01T00:00:26")
+    assert [r["n"] for r in newer] == [27, 28, 29]
+    # A poller more than `limit` behind gets the events right after its cursor, then the next ones
+    behind = log.tail(5, after="2026-01-01T00:00:10")
+    assert [r["n"] for r in behind] == [11, 12, 13, 14, 15]
+    assert [r["n"] for r in log.tail(5, after=behind[-1]["timestamp"])] == [16, 17, 18, 19, 20]
+
+
+def test_cursors_are_bisected_in_the_active_segment_and_sealed_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace_store, "SEALED_BLOCK_RECORDS", 4)
+    def timestamp(n):
+        return f"2026-01-01T00:{n // 60:02d}:{n % 60:02d}"
+
+    log = SegmentedLog(tmp_path / "trace.jsonl", max_bytes=4000)
+    for i in range(100):
+        record = {"timestamp": timestamp(i), "n": i, "actorId": f"a{i % 2}"}
+        log.append([_entry(record)])
+    [segment] = log.sealed_segments()
+    sealed = segment["records"]
+    assert 0 < sealed < 90
+
+    read = []
+    real_read_block = trace_store._read_block
+    monkeypatch.setattr(trace_store, "_read_block", lambda fh, blocks, no: read.append(no) or real_read_block(fh, blocks, no))
+    reversed_lines = []
+    real_lines_reversed = trace_store._lines_reversed
+    monkeypatch.setattr(
+        trace_store, "_lines_reversed",
+        lambda fh, end, *args, **kw: (reversed_lines.append(1) or line for line in real_lines_reversed(fh, end, *args, **kw)),
+    )
+
+    # Deep in the active segment: only the lines before the cursor are read
+    before = log.tail(3, before="2026-01-01T00:01:35")
+    assert [r["n"] for r in before] == [92, 93, 94]
+    assert len(reversed_lines) == 3
+
+    # In the sealed segment: reading starts at the block holding the cursor
+    after = log.tail(3, after="2026-01-01T00:00:09")
+    assert [r["n"] for r in after] == [10, 11, 12]
+    assert read == [2, 3]
+    filtered = log.query({"actorId": "a1"}, 3, after="2026-01-01T00:00:09")
+    assert [r["n"] for r in filtered] == [11, 13, 15]
+    # Past the sealed segment: the active postings before the cursor are skipped
+    active_page = log.query({"actorId": "a0"}, 2, after=timestamp(sealed + 1))
+    assert [r["n"] for r in active_page] == [n for n in range(sealed + 2, 100) if n % 2 == 0][:2]
+
+
+
+def test_tail_of_a_sealed_segment_decompresses_only_its_last_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(trace_store, "SEALED_BLOCK_RECORDS", 4)
+    log = SegmentedLog(tmp_path / "trace.jsonl", max_bytes=1000)
+    log.append([_entry({"timestamp": f"2026-01-01T00:00:{i:02d}", "n": i}) for i in range(40)])
+    log.append([_entry({"timestamp": "2026-01-01T00:01:00", "n": 40})])
+    [segment] = log.sealed_segments()
+    assert segment["records"] == 40
+
+    read = []
+    real_read_block = trace_store._read_block
+    monkeypatch.setattr(trace_store, "_read_block", lambda fh, blocks, no: read.append(no) or real_read_block(fh, blocks, no))
+    assert [r["n"] for r in log.tail(6)] == [35, 36, 37, 38, 39, 40]
+    # Ten blocks of four; the five sealed records come from the last two
+    assert read == [9, 8]
+
+def test_indexed_query_filters_across_sealed_and_active_segments(tmp_path, monkeypatch):
+    monkeypatch.setattr("backend.app.utils.trace_store.SEALED_BLOCK_RECORDS", 4)
+    log = SegmentedLog(tmp_path / "trace.jsonl", max_bytes=2000)
+    for i in range(60):
+        record = {
+            "timestamp": f"2026-01-01T00:{i // 60:02d}:{i % 60:02d}",
+            "eventType": "test.response" if i % 2 else "test.start",
+            "actorId": f"cand-{i % 3}",
+            "payload": {"sessionId": f"sess-{i % 5}"},
+            "n": i,
+        }
+        log.append([_entry(record)])
+    assert log.sealed_segments() and all(s.get("index") for s in log.sealed_segments())
+
+    def expected(predicate, limit=1000):
+        return [i for i in range(60) if predicate(i)][-limit:]
+
+    by_actor = log.query({"actorId": "cand-1"}, 1000)
+    assert [r["n"] for r in by_actor] == expected(lambda i: i % 3 == 1)
+    both = log.query({"actorId": "cand-1", "eventType": "test.response"}, 1000)
+    assert [r["n"] for r in both] == expected(lambda i: i % 3 == 1 and i % 2)
+    latest = log.query({"sessionId": "sess-2"}, 3)
+    assert [r["n"] for r in latest] == expected(lambda i: i % 5 == 2, 3)
+    window = log.query({"actorId": "cand-0"}, 1000, before="2026-01-01T00:00:30", after="2026-01-01T00:00:10")
+    assert [r["n"] for r in window] == expected(lambda i: i % 3 == 0 and 10 < i < 30)
+    assert log.query({"actorId": "nobody"}, 10) == []
+    assert [r["n"] for r in log.query({}, 2)] == [58, 59]
+
+
+def test_shared_sink_takes_batches_and_files_catch_failures(tmp_path):
+    class Sink:
+        def __init__(self):
+            self.available, self.stored = True, []
+
+        def append(self, entries):
+            if not self.available:
+                return list(entries)
+            # Odd-numbered records are rejected one by one, as a partial bulk write failure would be
+            self.stored.extend(entry.record["n"] for entry in entries if entry.record["n"] % 2 == 0)
+            return [entry for entry in entries if entry.record["n"] % 2]
+
+    path = tmp_path / "trace.jsonl"
+    writer = TraceWriter([SegmentedLog(path)], flush_interval=60)
+    writer.shared_sink = sink = Sink()
+    for n in range(4):
+        writer.submit(_entry({"timestamp": f"t{n}", "n": n}))
+    writer.flush()
+    sink.available = False
+    writer.submit(_entry({"timestamp": "t4", "n": 4}))
+    writer.stop()
+    assert sink.stored == [0, 2]
+    assert [json.loads(line)["n"] for line in path.read_text().splitlines()] == [1, 3, 4]
+
+
+def test_mongo_sink_falls_back_only_for_rejected_documents():
+    class Collection:
+        def insert_many(self, documents, ordered):
+            assert not ordered
+            raise BulkWriteError({"writeErrors": [
+                {"index": 1, "code": 121, "errmsg": "Document failed validation"},
+                {"index": 2, "code": DUPLICATE_KEY, "errmsg": "E11000 duplicate key error"},
+            ]})
+
+    sink = MongoTraceSink.__new__(MongoTraceSink)
+    sink.collection = Collection()
+    entries = [_entry({"timestamp": f"t{n}", "n": n}) for n in range(4)]
+    # The duplicate is already stored, so only the invalid document needs the file fallback
+    assert sink.append(entries) == [entries[1]]
+
+
+def test_prompt_stream_is_a_view_over_the_single_log(tmp_path):
+    log = SegmentedLog(tmp_path / "trace.jsonl", max_bytes=400)
+    event_types = ["session.created", "session.question_assigned", "session.response_recorded", "session.scored"]
+    for i in range(20):
+        log.append([_entry({"timestamp": f"t{i:02d}", "eventType": event_types[i % 4], "n": i})])
+    prompt = log.query({"stream": "prompt"}, 100)
+    assert [r["n"] for r in prompt] == [i for i in range(20) if i % 4 in (1, 2)]
+    assert len(log.tail(100)) == 20
+    assert sorted(p.name for p in tmp_path.glob("*.jsonl")) == ["trace.idx.jsonl", "trace.jsonl"]
@@ -112,7 +112,7 @@ function CandidateDashboard() {
     setError('')
     
     try {
-      await fetch(`${API_BASE}/api/tests/${session.id}/responses`, {
+      const res = await fetch(`${API_BASE}/api/tests/${session.id}/responses`, {
         method: 'POST',
         headers: { 'Content-Type': 'application/json' },
         body: JSON.stringify({
@@ -128,19 +128,22 @@ function CandidateDashboard() {
       setAnswer('')
       setCode('')
       
-      // Try to fetch next question
-      try {
-        const nextRes = await fetch(`${API_BASE}/api/tests/${session.id}/next`)
-        if (nextRes.ok) {
-          const nextData = await nextRes.json()
-          setQuestionBlock(nextData.data)
-          setStatusMsg('Responses Recorded!')
-        } else {
-          // No more questions - automatically submit the test
-          setStatusMsg('All responses recorded! Calculating score...')
-          await submitSession()
+      if (!res.ok) {
+        // Already recorded (e.g. double-click) - resync with the server's current question
+        await fetchQuestion(session.id)
+        return
+      }
+      
+      // The next question comes back with the response; no separate /next call
+      const data = await res.json()
+      const next = data.data?.next
+      if (next) {
+        setQuestionBlock(next)
+        if (next.question.options?.length) {
+          setAnswer(next.question.options[0])
         }
-      } catch (nextErr) {
+        setStatusMsg('Responses Recorded!')
+      } else {
         // No more questions - automatically submit the test
         setStatusMsg('All responses recorded! Calculating score...')
         await submitSession()
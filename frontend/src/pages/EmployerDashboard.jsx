@@ -21,6 +21,8 @@ function EmployerDashboard() {
   const [jobs, setJobs] = useState([])
   const [selectedJob, setSelectedJob] = useState(null)
   const [eligible, setEligible] = useState([])
+  const [eligibleTotal, setEligibleTotal] = useState(0)
+  const [nextCursor, setNextCursor] = useState(null)
   const [loading, setLoading] = useState(false)
   const [error, setError] = useState('')
   const [statusMsg, setStatusMsg] = useState('')
@@ -72,14 +74,16 @@ function EmployerDashboard() {
     }
   }
 
-  async function loadEligible(jobId) {
+  // Without a cursor, loads the first page; with one, appends the page that follows it
+  async function loadEligible(jobId, cursor = null) {
     setLoading(true)
     setError('')
     setSelectedJob(jobId)
     
     try {
+      const query = cursor ? `?cursor=${encodeURIComponent(cursor)}` : ''
       const res = await fetch(
-        `${API_BASE}/api/employers/${employerId}/jobs/${jobId}/eligible`
+        `${API_BASE}/api/employers/${employerId}/jobs/${jobId}/eligible${query}`
       )
       
       if (!res.ok) {
@@ -93,9 +97,17 @@ function EmployerDashboard() {
         throw new Error('Invalid response from server')
       }
       
-      setEligible(data.data.eligibleCandidates ?? [])
+      const page = data.data.eligibleCandidates ?? []
+      setNextCursor(data.data.nextCursor ?? null)
+      if (cursor) {
+        // total is only counted on the first page
+        setEligible((previous) => [...previous, ...page])
+        return
+      }
+      setEligible(page)
       
-      const count = data.data.eligibleCandidates?.length ?? 0
+      const count = data.data.total ?? page.length
+      setEligibleTotal(count)
       if (count === 0) {
         setStatusMsg('No eligible candidates found. Make sure candidates have shared their scores with you.')
       } else {
@@ -317,6 +329,21 @@ function EmployerDashboard() {
                 </tbody>
               </table>
             </div>
+
+            <div style={{ display: 'flex', justifyContent: 'space-between', alignItems: 'center', marginTop: '16px' }}>
+              <p className="text-muted" style={{ fontSize: '13px' }}>
+                Showing {eligible.length} of {Math.max(eligibleTotal, eligible.length)}
+              </p>
+              {nextCursor && (
+                <button
+                  className="btn btn-secondary btn-small"
+                  disabled={loading}
+                  onClick={() => loadEligible(selectedJob, nextCursor)}
+                >
+                  {loading ? 'Loading...' : 'Load More'}
+                </button>
+              )}
+            </div>
           </div>
         )}
 